@@ -0,0 +1,44 @@
+"""Benchmarks embedding and extraction throughput of each engine mode at every LSB depth.
+
+Usage: python -m benchmarks.engine --megapixels 10 50 100
+"""
+
+from benchmarks.util import create_carrier, create_payload, measure, parser, report
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
+from stegos.core.steganography.engine import EngineMode
+
+
+def main():
+    args_parser = parser(__doc__.splitlines()[0])
+    args_parser.add_argument(
+        "--fraction",
+        type=float,
+        default=0.9,
+        help="payload size as a fraction of the carrier capacity at each depth",
+    )
+    args = args_parser.parse_args()
+
+    rows = []
+    for megapixels in args.megapixels:
+        carrier = create_carrier(megapixels)
+        for lsb_depth in range(1, 8):
+            capacity = LSBSteganography(lsb_depth)._payload_capacity(carrier.ravel())
+            payload = create_payload(int(capacity * args.fraction))
+            for engine_mode in EngineMode:
+                steg = LSBSteganography(lsb_depth, engine_mode=engine_mode)
+                embed = measure(lambda: steg.embed(carrier, payload), args.repeat)
+                extract = measure(lambda: steg.extract(carrier), args.repeat)
+                rows.append(
+                    (
+                        f"{megapixels:g}",
+                        lsb_depth,
+                        engine_mode.name,
+                        len(payload) / embed / 2**20,
+                        len(payload) / extract / 2**20,
+                    )
+                )
+    report(("MP", "depth", "engine", "embed (MiB/s)", "extract (MiB/s)"), rows)
+
+
+if __name__ == "__main__":
+    main()
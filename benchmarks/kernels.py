@@ -0,0 +1,66 @@
+"""Benchmarks the kernels of each available backend.
+
+Each kernel is run once before measuring, so JIT compilation is excluded.
+
+Usage: python -m benchmarks.kernels --megapixels 10 50 100
+"""
+
+import numpy as np
+
+from benchmarks.util import create_carrier, measure, parser, report
+from stegos.core.steganography import kernels
+from stegos.core.steganography.permutation import FeistelPermutation
+
+
+def main():
+    args_parser = parser(__doc__.splitlines()[0])
+    args_parser.add_argument(
+        "--depths", type=int, nargs="+", default=[1, 2, 4, 7], help="LSB depths"
+    )
+    args = args_parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    rows = []
+    for megapixels in args.megapixels:
+        carrier = create_carrier(megapixels).ravel()
+        indices = FeistelPermutation(1, carrier.size).take(0, carrier.size // 2)
+        for lsb_depth in args.depths:
+            planes = tuple(
+                rng.integers(0, 2, len(indices), dtype=np.uint8)
+                for _ in range(lsb_depth)
+            )
+            symbols = rng.integers(0, 1 << lsb_depth, len(indices), dtype=np.uint8)
+            for name in kernels.available_backends():
+                backend = kernels.backend(name)
+                out_planes = tuple(np.empty_like(bits) for bits in planes)
+                out_symbols = np.empty_like(symbols)
+                runs = {
+                    "embed_planes": lambda: backend.embed_planes(
+                        carrier, indices, planes
+                    ),
+                    "extract_planes": lambda: backend.extract_planes(
+                        carrier, indices, out_planes
+                    ),
+                    "embed_symbols": lambda: backend.embed_symbols(
+                        carrier, indices, symbols, lsb_depth
+                    ),
+                    "extract_symbols": lambda: backend.extract_symbols(
+                        carrier, indices, out_symbols, lsb_depth
+                    ),
+                }
+                for kernel, run in runs.items():
+                    run()  # warm up
+                    rows.append(
+                        (
+                            f"{megapixels:g}",
+                            lsb_depth,
+                            name,
+                            kernel,
+                            len(indices) / measure(run, args.repeat) / 10**6,
+                        )
+                    )
+    report(("MP", "depth", "backend", "kernel", "positions (M/s)"), rows)
+
+
+if __name__ == "__main__":
+    main()
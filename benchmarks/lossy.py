@@ -0,0 +1,81 @@
+"""Benchmarks lossy embedding through eligible positions against copying and writing back the eligible coefficients.
+
+Coefficients are synthetic, with one coefficient per pixel, as in the luminance component of a JPEG.
+
+Usage: python -m benchmarks.lossy --megapixels 24 50
+"""
+
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.util import create_payload, measure, parser, report
+from benchmarks.workers import create_coefficients
+from stegos.core.steganography import bitops
+from stegos.core.steganography.algorithms.lossy import LossyLSBSteganography
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
+
+
+def masked_embed(coefs: np.ndarray, payload: bytes) -> None:
+    """
+    Embeds a payload by copying the eligible coefficients, and writing every one of them back.
+    :param coefs: Coefficients to embed the payload in.
+    :param payload: Payload to embed.
+    """
+    coefs = coefs.ravel()
+    mask = bitops.has_msbs_set(coefs, LSBSteganography.SAFE_DEPTH)
+    masked = coefs[mask]
+    LSBSteganography().embed(masked, payload)
+    coefs[mask] = masked
+
+
+def peak_memory(func) -> float:
+    """
+    Measures the peak memory allocated by a function.
+    :param func: Function to measure.
+    :return: Peak memory in MiB.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    args_parser = parser(__doc__.splitlines()[0])
+    args_parser.set_defaults(megapixels=[24, 50])
+    args_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1024, 2**20],
+        help="payload sizes in bytes",
+    )
+    args = args_parser.parse_args()
+
+    rows = []
+    for megapixels in args.megapixels:
+        coefs = create_coefficients(int(megapixels * 10**6))
+        steg = LossyLSBSteganography()
+        for size in args.sizes:
+            payload = create_payload(size)
+            for name, embed in [
+                ("masked", lambda: masked_embed(coefs, payload)),
+                ("positions", lambda: steg.embed(coefs, payload)),
+            ]:
+                rows.append(
+                    (
+                        f"{megapixels:g}",
+                        size,
+                        name,
+                        measure(embed, args.repeat),
+                        peak_memory(embed),
+                    )
+                )
+    report(("MP", "payload (B)", "method", "embed (s)", "peak (MiB)"), rows)
+
+
+if __name__ == "__main__":
+    main()
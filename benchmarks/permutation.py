@@ -0,0 +1,80 @@
+"""Benchmarks embedding and extraction for each index mode.
+
+Also benchmarks taking the indices of a payload, in the chunks the engine takes them, with the original shuffle
+against the Philox mode per number of threads. Both generate every index of the carrier on the first take.
+
+Usage: python -m benchmarks.permutation --megapixels 10 50 100 --workers 1 2 4 8
+"""
+
+from benchmarks.util import create_carrier, create_payload, measure, parser, report
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
+from stegos.core.steganography.engine import BaseEngine
+from stegos.core.steganography.permutation import (
+    IndexMode,
+    IndexPermutation,
+    PhiloxPermutation,
+    ShuffledPermutation,
+)
+
+
+def take(permutation: IndexPermutation, stop: int) -> None:
+    """
+    Takes the leading indices of a permutation, in the chunks the engine takes them.
+    :param permutation: Permutation to take the indices of.
+    :param stop: Number of indices to take.
+    """
+    for start in range(0, stop, BaseEngine.CHUNK_SIZE):
+        permutation.take(start, min(start + BaseEngine.CHUNK_SIZE, stop))
+
+
+def main():
+    args_parser = parser(__doc__.splitlines()[0])
+    args_parser.add_argument(
+        "--fraction",
+        type=float,
+        default=0.25,
+        help="payload size as a fraction of the carrier capacity",
+    )
+    args_parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="thread counts used to generate Philox permutations",
+    )
+    args = args_parser.parse_args()
+
+    rows = []
+    for megapixels in args.megapixels:
+        carrier = create_carrier(megapixels)
+        capacity = LSBSteganography()._payload_capacity(carrier.ravel())
+        payload = create_payload(int(capacity * args.fraction))
+        for index_mode in IndexMode:
+            steg = LSBSteganography(index_mode=index_mode)
+            embed = measure(lambda: steg.embed(carrier, payload), args.repeat)
+            extract = measure(lambda: steg.extract(carrier), args.repeat)
+            rows.append(
+                (f"{megapixels:g}", index_mode.name, len(payload), embed, extract)
+            )
+    report(("MP", "index mode", "payload (B)", "embed (s)", "extract (s)"), rows)
+    print()
+
+    rows = []
+    for megapixels in args.megapixels:
+        size = create_carrier(megapixels).size
+        stop = int(size * args.fraction)  # positions of the payload fraction at depth 1
+        shuffle = measure(lambda: take(ShuffledPermutation(1, size), stop), args.repeat)
+        rows.append((f"{megapixels:g}", "SHUFFLE", 1, stop, shuffle, 1.0))
+        for workers in args.workers:
+            philox = measure(
+                lambda: take(PhiloxPermutation(1, size, workers=workers), stop),
+                args.repeat,
+            )
+            rows.append(
+                (f"{megapixels:g}", "PHILOX", workers, stop, philox, shuffle / philox)
+            )
+    report(("MP", "index mode", "workers", "indices", "take (s)", "speedup"), rows)
+
+
+if __name__ == "__main__":
+    main()
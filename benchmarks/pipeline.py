@@ -0,0 +1,65 @@
+"""Benchmarks the stage-parallel service embedding against the sum of its stages.
+
+Each stage (key derivation, cover decoding and payload compression) is timed on its own, then the whole embedding is
+timed through the service, which runs the stages concurrently. On a machine with enough cores, the embedding should
+approach the slowest stage rather than the sum.
+
+Usage: python -m benchmarks.pipeline --megapixels 10 50 --payload 1000000
+"""
+
+import os
+import tempfile
+
+from PIL import Image
+
+from benchmarks.util import create_carrier, create_payload, measure, parser, report
+from stegos.core.constants import ImageCompressionType
+from stegos.core.image import LosslessImage
+from stegos.core.service import LSBSteganographyService
+from stegos.core.steganography.builder import SteganographyStrategyBuilder
+
+
+def main():
+    args_parser = parser(__doc__.splitlines()[0])
+    args_parser.set_defaults(megapixels=[10, 50], repeat=1)
+    args_parser.add_argument(
+        "--payload", type=int, default=10**6, help="payload size in bytes"
+    )
+    args = args_parser.parse_args()
+
+    service = LSBSteganographyService()
+    strategy = (
+        SteganographyStrategyBuilder(ImageCompressionType.LOSSLESS)
+        .encryption(b"password")
+        .build()
+    )
+    payload = create_payload(args.payload)
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for megapixels in args.megapixels:
+            path = os.path.join(directory, f"{megapixels:g}.png")
+            Image.fromarray(create_carrier(megapixels)).save(path)
+            stages = [
+                measure(strategy.new_key, args.repeat),
+                measure(lambda: LosslessImage.open(Image.open(path)), args.repeat),
+                measure(lambda: service._compress_payload(payload), args.repeat),
+            ]
+            embed = measure(
+                lambda: service.embed(path, payload, b"password"), args.repeat
+            )
+            rows.append((f"{megapixels:g}", *stages, sum(stages), embed))
+    report(
+        (
+            "MP",
+            "kdf (s)",
+            "decode (s)",
+            "compress (s)",
+            "sum (s)",
+            "embed (s)",
+        ),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
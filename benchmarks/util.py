@@ -0,0 +1,76 @@
+"""This module provides utilities shared by the benchmarks."""
+
+import argparse
+import time
+from typing import Callable, Iterable
+
+import numpy as np
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    """
+    Creates an argument parser with the options shared by the benchmarks.
+    :param description: Description of the benchmark.
+    :return: Argument parser.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--megapixels",
+        type=float,
+        nargs="+",
+        default=[10, 50, 100],
+        help="sizes of the RGB carriers to benchmark",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="number of runs per measurement"
+    )
+    return parser
+
+
+def create_carrier(megapixels: float) -> np.ndarray:
+    """
+    Creates a random RGB carrier.
+    :param megapixels: Size of the carrier in megapixels.
+    :return: NumPy array representing an image.
+    """
+    side = int((megapixels * 10**6) ** 0.5)
+    return np.random.default_rng(1).integers(
+        0, 256, size=(side, side, 3), dtype=np.uint8
+    )
+
+
+def create_payload(size: int) -> bytes:
+    """
+    Creates a random payload.
+    :param size: Size of the payload in bytes.
+    :return: Payload as bytes.
+    """
+    return np.random.default_rng(2).bytes(size)
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """
+    Measures the wall time of a function.
+    :param func: Function to measure.
+    :param repeat: Number of runs.
+    :return: Best wall time in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def report(headers: Iterable[str], rows: Iterable[Iterable[object]]) -> None:
+    """
+    Prints the results of a benchmark as a table.
+    :param headers: Column names.
+    :param rows: Values of each row.
+    """
+    headers = list(headers)
+    rows = [[f"{v:.3f}" if isinstance(v, float) else str(v) for v in r] for r in rows]
+    widths = [max(len(c) for c in column) for column in zip(headers, *rows)]
+    for row in [headers, *rows]:
+        print("  ".join(c.rjust(w) for c, w in zip(row, widths)))
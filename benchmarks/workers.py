@@ -0,0 +1,81 @@
+"""Benchmarks scaling of chunked embedding and extraction over the number of threads.
+
+Lossy embedding is benchmarked on synthetic DCT coefficients with the same number of elements as the carrier.
+
+Usage: python -m benchmarks.workers --megapixels 10 50 100 --workers 1 2 4 8
+"""
+
+import numpy as np
+
+from benchmarks.util import create_carrier, create_payload, measure, parser, report
+from stegos.core.steganography import bitops
+from stegos.core.steganography.algorithms.lossy import LossyLSBSteganography
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
+from stegos.core.steganography.engine import EngineMode
+
+
+def create_coefficients(size: int) -> np.ndarray:
+    """
+    Creates synthetic DCT coefficients, most of which are zero or small.
+    :param size: Number of coefficients.
+    :return: NumPy array of coefficients.
+    """
+    rng = np.random.default_rng(1)
+    return np.round(rng.laplace(scale=4, size=size)).astype(np.int32)
+
+
+def main():
+    args_parser = parser(__doc__.splitlines()[0])
+    args_parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="thread counts to benchmark",
+    )
+    args_parser.add_argument(
+        "--fraction",
+        type=float,
+        default=0.5,
+        help="payload size as a fraction of the carrier capacity",
+    )
+    args = args_parser.parse_args()
+
+    rows = []
+    for megapixels in args.megapixels:
+        carriers = {LSBSteganography: create_carrier(megapixels)}
+        carriers[LossyLSBSteganography] = create_coefficients(
+            carriers[LSBSteganography].size
+        )
+        for strategy, carrier in carriers.items():
+            steg = strategy()
+            capacity = steg._payload_capacity(carrier.ravel())
+            if strategy is LossyLSBSteganography:  # only eligible coefficients
+                capacity = int(
+                    capacity * np.mean(bitops.has_msbs_set(carrier, steg.lsb_depth))
+                )
+            payload = create_payload(int(capacity * args.fraction))
+            serial = None
+            for workers in args.workers:
+                steg = strategy(engine_mode=EngineMode.SYMBOLS, workers=workers)
+                embed = measure(lambda: steg.embed(carrier, payload), args.repeat)
+                extract = measure(lambda: steg.extract(carrier), args.repeat)
+                serial = serial or embed + extract
+                rows.append(
+                    (
+                        f"{megapixels:g}",
+                        strategy.__name__,
+                        workers,
+                        embed,
+                        extract,
+                        serial / (embed + extract),
+                    )
+                )
+    report(
+        ("MP", "strategy", "workers", "embed (s)", "extract (s)", "speedup"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""This module provides the command line interface, for operations that do not need the GUI.
+
+Run as a module from the repository root, e.g. extracting every image in a directory.
+
+    python -m stegos extract-batch images/ --output extracted/
+"""
+
+import argparse
+import getpass
+import sys
+import time
+
+from stegos.core.batch import BatchReport, extract_batch
+from stegos.core.probe import probe_images
+
+
+def _extract_batch(args: argparse.Namespace) -> int:
+    """
+    Extracts the payloads of many images, printing each result as it finishes and the throughput at the end.
+    :param args: Parsed arguments of the command.
+    :return: Exit status, 1 if any image failed.
+    """
+    password = getpass.getpass().encode()
+    report, start = BatchReport(), time.perf_counter()
+    for result in extract_batch(
+        args.images, password, args.output, args.workers, args.raw, args.overwrite
+    ):
+        report.add(result)
+        if result.error is None:
+            print(f"{result.image}: {len(result.paths)} file(s), {result.size} bytes")
+        else:
+            print(f"{result.image}: {result.error!r}", file=sys.stderr)
+    report.seconds = time.perf_counter() - start
+    print(
+        f"{report.images} image(s), {report.failures} failed, {report.size} bytes in {report.seconds:.2f} s "
+        f"({report.images_per_second:.2f} images/s, {report.bytes_per_second / 2**20:.2f} MiB/s)"
+    )
+    return 1 if report.failures else 0
+
+
+def _probe(args: argparse.Namespace) -> int:
+    """
+    Probes many images for payloads, printing each candidate as it is found and the throughput at the end.
+    :param args: Parsed arguments of the command.
+    :return: Exit status.
+    """
+    images, candidates, start = 0, 0, time.perf_counter()
+    for result in probe_images(args.images, args.workers):
+        images += 1
+        candidates += result.candidate
+        if result.candidate:
+            print(f"{result.image}: candidate, {result.probe.payload_size} bytes")
+        elif args.all:
+            print(f"{result.image}: {result.reason}")
+    seconds = time.perf_counter() - start
+    print(
+        f"{candidates} candidate(s) of {images} image(s) in {seconds:.2f} s "
+        f"({images / seconds if seconds else 0:.2f} images/s)"
+    )
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    """
+    Creates the argument parser of the command line interface.
+    :return: Argument parser.
+    """
+    parser = argparse.ArgumentParser(prog="stegos", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(required=True)
+
+    batch = commands.add_parser(
+        "extract-batch", help="extract the payloads of many images in parallel"
+    )
+    batch.add_argument("images", help="directory of images, or a glob pattern")
+    batch.add_argument(
+        "--output", "-o", default=".", help="directory to extract each image to"
+    )
+    batch.add_argument(
+        "--workers", type=int, help="maximum number of processes (default: CPUs)"
+    )
+    batch.add_argument(
+        "--raw",
+        action="store_true",
+        help="write the decrypted payloads without decompressing them",
+    )
+    batch.add_argument(
+        "--overwrite", action="store_true", help="overwrite existing files"
+    )
+    batch.set_defaults(command=_extract_batch)
+
+    probe = commands.add_parser(
+        "probe",
+        help="find the images that probably carry a payload, without a password",
+    )
+    probe.add_argument("images", help="directory of images, or a glob pattern")
+    probe.add_argument(
+        "--workers", type=int, help="number of processes (default: CPUs)"
+    )
+    probe.add_argument(
+        "--all", action="store_true", help="also print why images were rejected"
+    )
+    probe.set_defaults(command=_probe)
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    """
+    Runs the command line interface.
+    :param argv: Arguments of the command. Defaults to the arguments of the process.
+    :return: Exit status.
+    """
+    args = parser().parse_args(argv)
+    return args.command(args)
@@ -0,0 +1,132 @@
+"""This module provides an asyncio facade over the steganography service.
+
+Each stage of an operation runs on an executor, so the event loop is never blocked, and cancelling an operation stops
+it at the next stage. Work already running on an executor is not interrupted, but its result is discarded.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import AsyncGenerator, Callable, Iterable, TypeVar
+
+from stegos.core.image import Image
+from stegos.core.service import ExtractedItem, LSBSteganographyService
+
+T = TypeVar("T")
+
+
+class AsyncSteganographyService:
+    """Asyncio facade for LSB steganography operations.
+
+    Decoding, compression, embedding and extraction run on a thread executor, as their NumPy, Numba and codec work
+    releases the GIL. Key derivation runs on a process executor if one is given, as it dominates the time of an
+    operation and can then run on another core regardless of the GIL.
+    """
+
+    def __init__(
+        self,
+        service: LSBSteganographyService = None,
+        executor: Executor = None,
+        kdf_executor: Executor = None,
+    ):
+        """
+        Creates an instance of AsyncSteganographyService.
+        :param service: Service whose stages are run. Defaults to a service with the default compressor.
+        :param executor: Executor used for the stages of an operation. Defaults to the default executor of the loop.
+        :param kdf_executor: Executor used for key derivation, such as a process pool. Defaults to executor.
+        """
+        self._service = service or LSBSteganographyService()
+        self._executor = executor
+        self._kdf_executor = kdf_executor or executor
+
+    async def _run(self, func: Callable[..., T], *args, executor: Executor = None) -> T:
+        """
+        Runs a stage of an operation on an executor.
+        :param func: Function of the stage.
+        :param args: Arguments of the function.
+        :param executor: Executor to run the stage on. Defaults to the executor of the service.
+        :return: Result of the function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor or self._executor, func, *args)
+
+    async def embed(
+        self, cover_image: str, payload: bytes | Iterable[str], password: bytes
+    ) -> Image:
+        """
+        Embeds a payload into an image, without blocking the event loop.
+
+        The cover image is decoded while the payload is compressed, and the key is derived while the payload is
+        compressed if a bound of its size fits the image header, otherwise once the encrypted payload is known to fit,
+        as in LSBSteganographyService.embed.
+        :param cover_image: Cover image used as the carrier of the payload.
+        :param payload: Payload to embed inside the cover image. Should be bytes or a list of file paths.
+        :param password: Password used to encrypt the payload. A key is derived from the password.
+        :return: Image with the embedded payload.
+        """
+        service = self._service
+        opened = await self._run(service.open_image, cover_image, password)
+        decoding = asyncio.ensure_future(self._run(service.decode, opened))
+        deriving = None
+        try:
+            bound = service.sealed_bound(payload)
+            if bound is not None and service.fits(opened, bound):
+                deriving = asyncio.ensure_future(
+                    self._run(opened.strategy.new_key, executor=self._kdf_executor)
+                )
+            pending = await self._run(service.compress, payload)
+            carrier = None if opened.validates_from_header else (await decoding)[1]
+            await self._run(service.validate, opened, pending.size, carrier)
+
+            key = await (
+                deriving
+                or self._run(opened.strategy.new_key, executor=self._kdf_executor)
+            )
+            decoded, carrier = await decoding
+        finally:
+            decoding.cancel()  # if cancelled, or the payload does not fit
+            if deriving is not None:
+                deriving.cancel()
+        await self._run(service.embed_payload, opened, carrier, pending, key)
+        return decoded
+
+    async def extract_items(
+        self, stego_image: str, password: bytes
+    ) -> AsyncGenerator[ExtractedItem, None]:
+        """
+        Extracts a payload from an image, without blocking the event loop.
+
+        The key is derived as soon as the salt is read, while the rest of the payload is read, as in
+        EncryptionDecorator.decrypt.
+        :param stego_image: Stego image that contains a hidden payload.
+        :param password: Password used to decrypt the payload.
+        :return: Yields extracted items which can be files or bytes, each decompressed on the executor.
+        """
+        service = self._service
+        opened = await self._run(service.open_image, stego_image, password)
+        decoded, carrier = await self._run(service.decode, opened)
+        embedded = await self._run(service.open_payload, opened, carrier)
+        deriving = asyncio.ensure_future(
+            self._run(
+                opened.strategy.new_key, embedded.salt, executor=self._kdf_executor
+            )
+        )
+        try:
+            embedded = await self._run(service.read_payload, embedded)
+            key = await deriving
+        finally:
+            deriving.cancel()  # if cancelled, or the payload can not be read
+        extracted = await self._run(service.unseal, opened, embedded, key, decoded)
+        del decoded, carrier, embedded  # kept alive by an indexed container
+
+        items, done = service.items(extracted), object()
+        while (item := await self._run(next, items, done)) is not done:
+            yield item
+
+    async def extract(self, stego_image: str, password: bytes) -> list[ExtractedItem]:
+        """
+        Extracts a payload from an image, without blocking the event loop.
+        :param stego_image: Stego image that contains a hidden payload.
+        :param password: Password used to decrypt the payload.
+        :return: Extracted items which can be files or bytes.
+        """
+        return [item async for item in self.extract_items(stego_image, password)]
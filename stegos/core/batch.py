@@ -0,0 +1,163 @@
+"""This module provides parallel extraction of payloads from many stego images.
+
+Images are extracted in a process pool, as key derivation and extraction hold the GIL for much of their time. The
+pool is sized to the number of CPUs, and to the physical memory needed by the key derivation of each image.
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Generator
+
+from PIL import Image as PILImage
+
+from stegos.core.compression.file import unique_name
+from stegos.core.service import LSBSteganographyService
+from stegos.core.steganography.decorators.encryption import ARGON2_MEMORY_COST
+
+
+@dataclass
+class BatchResult:
+    """Result of extracting the payload of one image of a batch."""
+
+    image: Path
+    paths: list[Path] = field(default_factory=list)  # written files
+    size: int = 0  # bytes written
+    error: Exception = None
+    seconds: float = 0
+
+
+@dataclass
+class BatchReport:
+    """Aggregate throughput of a batch."""
+
+    images: int = 0
+    failures: int = 0
+    size: int = 0  # bytes written
+    seconds: float = 0  # wall time
+
+    def add(self, result: BatchResult) -> None:
+        """
+        Adds the result of an image to the report.
+        :param result: Result of extracting an image.
+        """
+        self.images += 1
+        self.failures += result.error is not None
+        self.size += result.size
+
+    @property
+    def images_per_second(self) -> float:
+        """
+        Gets the number of images extracted per second.
+        :return: Images per second of wall time.
+        """
+        return self.images / self.seconds if self.seconds else 0
+
+    @property
+    def bytes_per_second(self) -> float:
+        """
+        Gets the number of bytes written per second.
+        :return: Bytes per second of wall time.
+        """
+        return self.size / self.seconds if self.seconds else 0
+
+
+def batch_images(images: str | os.PathLike[str]) -> list[Path]:
+    """
+    Finds the images of a batch.
+    :param images: Directory of images, or a glob pattern. Only files with image extensions are taken from a
+    directory.
+    :return: Paths of the images, sorted.
+    """
+    if os.path.isdir(images):
+        extensions = PILImage.registered_extensions()
+        paths = (path for path in Path(images).iterdir() if path.is_file())
+        return sorted(path for path in paths if path.suffix.lower() in extensions)
+    return sorted(Path(path) for path in glob.glob(str(images)) if os.path.isfile(path))
+
+
+def batch_workers(workers: int = None) -> int:
+    """
+    Gets the number of processes used to extract a batch.
+    :param workers: Maximum number of processes. Defaults to the number of CPUs.
+    :return: Number of processes whose key derivations fit in the memory currently available, at least 1.
+    """
+    workers = workers or os.cpu_count() or 1
+    try:
+        available = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):  # not available on every platform
+        return workers
+    return max(1, min(workers, available // (ARGON2_MEMORY_COST * 2**10)))
+
+
+def _extract(
+    service: LSBSteganographyService,
+    image: Path,
+    password: bytes,
+    directory: Path,
+    raw: bool,
+    overwrite: bool,
+) -> BatchResult:
+    """
+    Extracts the payload of one image of a batch. Runs in a worker process.
+    :param service: Service used to extract the image.
+    :param image: Path of the image.
+    :param password: Password used to decrypt the payload.
+    :param directory: Directory to write the extracted files to. Created if it does not exist.
+    :param raw: Whether to write the decrypted payload without decompressing it.
+    :param overwrite: Whether to overwrite existing files.
+    :return: Result of the extraction, holding any exception raised.
+    """
+    start = time.perf_counter()
+    result = BatchResult(image)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        # files are streamed one at a time, as images are already extracted in parallel
+        result.paths = service.extract_to(
+            str(image), password, directory, raw, workers=1, overwrite=overwrite
+        )
+        result.size = sum(path.stat().st_size for path in result.paths)
+    except Exception as e:
+        result.error = e
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def extract_batch(
+    images: str | os.PathLike[str],
+    password: bytes,
+    output: str | os.PathLike[str],
+    workers: int = None,
+    raw: bool = False,
+    overwrite: bool = False,
+    service: LSBSteganographyService = None,
+) -> Generator[BatchResult, None, None]:
+    """
+    Extracts the payloads of many images in parallel, each to its own directory named after the image.
+
+    Results are yielded as each image finishes, so failures do not stop the batch.
+    :param images: Directory of images, or a glob pattern.
+    :param password: Password used to decrypt the payloads.
+    :param output: Directory to create the directory of each image in.
+    :param workers: Maximum number of processes. Defaults to the number of CPUs.
+    :param raw: Whether to write the decrypted payloads without decompressing them.
+    :param overwrite: Whether to overwrite existing files.
+    :param service: Service used to extract each image. Must be picklable.
+    :return: Yields the result of each image, in the order they finish.
+    """
+    service = service or LSBSteganographyService()
+    paths = batch_images(images)
+    used = set()
+    directories = [Path(output, unique_name(path.stem, used)) for path in paths]
+    with ProcessPoolExecutor(batch_workers(workers)) as executor:
+        futures = [
+            executor.submit(
+                _extract, service, path, password, directory, raw, overwrite
+            )
+            for path, directory in zip(paths, directories)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,4 @@
+class DecompressionLimitException(Exception):
+    """Exception raised when decompressing a payload would exceed its decompressed size or ratio limits."""
+
+    pass
@@ -1,8 +1,118 @@
 import io
 import os
+import threading
 import zipfile
 from abc import ABC, abstractmethod
-from typing import Iterable, Generator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Generator
+
+from stegos.core.compression.exception import DecompressionLimitException
+
+CHUNK_SIZE = 2**20
+
+
+@dataclass(frozen=True)
+class DecompressionLimits:
+    """Limits on the size of decompressed payloads, guarding against decompression bombs.
+
+    Sizes are checked against the sizes declared by the archive before anything is written, and against the number
+    of bytes actually decompressed while writing.
+    """
+
+    max_size: int | None = 2**32  # total decompressed bytes
+    max_ratio: float | None = None  # total decompressed bytes per compressed byte
+
+    def check(self, size: int, compressed_size: int) -> None:
+        """
+        Checks a decompressed size against the limits.
+        :param size: Decompressed size in bytes.
+        :param compressed_size: Compressed size in bytes.
+        """
+        if self.max_size is not None and size > self.max_size:
+            raise DecompressionLimitException(
+                f"decompressed size of {size} bytes exceeds limit of {self.max_size} bytes"
+            )
+        if self.max_ratio is not None and size > self.max_ratio * max(
+            compressed_size, 1
+        ):
+            raise DecompressionLimitException(
+                f"decompression ratio of {size / max(compressed_size, 1):.1f} exceeds limit of {self.max_ratio}"
+            )
+
+
+def unique_name(name: str, used: set[str]) -> str:
+    """
+    Makes a file name unique, by numbering it if it has already been used.
+    :param name: File name.
+    :param used: File names already used. The unique name is added to it.
+    :return: Unique file name.
+    """
+    if name in ("", ".", ".."):
+        raise ValueError(f"invalid file name {name!r}")
+    path, number = Path(name), 1
+    while name in used:
+        name = f"{path.stem} ({number}){path.suffix}"
+        number += 1
+    used.add(name)
+    return name
+
+
+class SizeCounter:
+    """Thread-safe count of decompressed bytes, checked against decompression limits."""
+
+    def __init__(self, limits: DecompressionLimits, compressed_size: int):
+        """
+        Creates an instance of SizeCounter.
+        :param limits: Limits to check the count against.
+        :param compressed_size: Compressed size in bytes.
+        """
+        self._limits = limits
+        self._compressed_size = compressed_size
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def add(self, size: int) -> None:
+        """
+        Adds to the count of decompressed bytes.
+        :param size: Number of bytes decompressed.
+        """
+        with self._lock:
+            self._size += size
+            self._limits.check(self._size, self._compressed_size)
+
+
+def copy_limited(
+    source: BinaryIO,
+    path: Path,
+    counter: SizeCounter,
+    limit: int = None,
+    overwrite: bool = False,
+) -> None:
+    """
+    Copies a stream to a file in chunks, removing the file if a limit is exceeded.
+    :param source: Stream to read from.
+    :param path: Path of the file to write.
+    :param counter: Counter of the bytes decompressed across every file.
+    :param limit: Maximum number of bytes to copy, such as the size the file declares. Defaults to no limit.
+    :param overwrite: Whether to overwrite an existing file.
+    """
+    with open(path, "wb" if overwrite else "xb") as file:
+        try:
+            written = 0
+            while chunk := source.read(CHUNK_SIZE):
+                written += len(chunk)
+                if limit is not None and written > limit:
+                    raise DecompressionLimitException(
+                        f"{path.name} is larger than the {limit} bytes it declares"
+                    )
+                counter.add(len(chunk))
+                file.write(chunk)
+        except BaseException:
+            file.close()
+            path.unlink()
+            raise
 
 
 class FileCompressor(ABC):
@@ -26,6 +136,30 @@ class FileCompressor(ABC):
         """
         pass
 
+    def decompress_to(
+        self,
+        archive: bytes,
+        directory: str | os.PathLike[str],
+        limits: DecompressionLimits = DecompressionLimits(),
+        workers: int = None,
+        overwrite: bool = False,
+    ) -> list[Path]:
+        """
+        Decompresses files straight to a directory. Repeated names are numbered, so no file is overwritten twice.
+        :param archive: Bytes archive of compressed files.
+        :param directory: Directory to write the files to.
+        :param limits: Limits on the decompressed size of the files.
+        :param workers: Number of threads used to write files. Ignored by compressors that write files in order.
+        :param overwrite: Whether to overwrite existing files.
+        :return: Paths of the written files.
+        """
+        counter, used, paths = SizeCounter(limits, len(archive)), set(), []
+        for name, content in self.decompress(archive):
+            path = Path(directory, unique_name(os.path.basename(name), used))
+            copy_limited(io.BytesIO(content), path, counter, overwrite=overwrite)
+            paths.append(path)
+        return paths
+
 
 class ZipCompressor(FileCompressor):
     """Compressor for compressing and decompressing files using the ZIP format."""
@@ -33,6 +167,15 @@ class ZipCompressor(FileCompressor):
     def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
         self._compression = compression
 
+    @staticmethod
+    def _members(zf: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+        """
+        Gets the files of an archive, excluding directories.
+        :param zf: Archive to get the files of.
+        :return: Files, in the order they were compressed.
+        """
+        return [info for info in zf.infolist() if not info.is_dir()]
+
     def compress(self, files):
         if isinstance(files, (str, os.PathLike)):
             files = [files]
@@ -51,3 +194,41 @@ class ZipCompressor(FileCompressor):
             ) in zf.infolist():  # allows files to be gotten that have duplicate names
                 with zf.open(file) as f:
                     yield file.filename, f.read()
+
+    def decompress_to(
+        self,
+        archive,
+        directory,
+        limits=DecompressionLimits(),
+        workers=None,
+        overwrite=False,
+    ):
+        """
+        Decompresses files straight to a directory, streaming each file in bounded chunks. Files are written on a
+        thread pool, each reading its own view of the archive.
+
+        Declared sizes are checked before anything is written. Files are written under their basenames, so no file is
+        written outside the directory.
+        """
+        with zipfile.ZipFile(io.BytesIO(archive), "r") as zf:
+            members = self._members(zf)
+        limits.check(sum(info.file_size for info in members), len(archive))
+        used = set()
+        paths = [
+            Path(directory, unique_name(os.path.basename(info.filename), used))
+            for info in members
+        ]
+        counter = SizeCounter(limits, len(archive))
+
+        def write(info: zipfile.ZipInfo, path: Path) -> None:
+            # ZipFile seeks a shared file, so each thread reads its own (zero-copy) view
+            with zipfile.ZipFile(io.BytesIO(archive), "r") as zf, zf.open(info) as f:
+                copy_limited(f, path, counter, info.file_size, overwrite)
+
+        workers = min(workers or os.cpu_count(), max(len(members), 1))
+        if workers <= 1:
+            list(map(write, members, paths))
+        else:
+            with ThreadPoolExecutor(workers) as executor:
+                list(executor.map(write, members, paths))  # raises the first exception
+        return paths
@@ -1,7 +1,10 @@
 from enum import StrEnum, auto
+from pathlib import Path
 
 from PIL import Image
 
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+
 
 class ImageCompressionType(StrEnum):
     """Image compression types."""
@@ -49,3 +52,13 @@ def compression_type(image: Image) -> ImageCompressionType:
     elif frmt in MixedFormat:
         return ImageCompressionType.MIXED
     return ImageCompressionType.LOSSLESS
+
+
+def is_jpeg(path: str | Path) -> bool:
+    """
+    Checks whether an image is a JPEG from its leading bytes, without decoding it.
+    :param path: Path of the image.
+    :return: True if the image is a JPEG, otherwise False.
+    """
+    with open(path, "rb") as file:
+        return file.read(len(JPEG_SIGNATURE)) == JPEG_SIGNATURE
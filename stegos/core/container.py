@@ -0,0 +1,453 @@
+"""This module provides an indexed container, which holds many files in one embedded payload.
+
+The payload starts with a salt and a plain header, followed by an encrypted table of contents and the encrypted chunks
+of every member:
+
+    salt | magic, version, TOC capacity, TOC length | TOC token, random padding | chunk tokens of each member
+
+Each token is a Fernet token under the key derived from the salt, so the table of contents can be read without reading
+any member, and a member can be read without reading any other member. Members are compressed with LZMA, then split
+into chunks that are encrypted independently, so a member is decrypted and decompressed one chunk at a time. Each chunk
+is encrypted behind its offset, which is checked when it is read, so chunks can not be swapped, reordered or replayed
+within or across members. The table
+of contents is padded with random bytes to its capacity, so it can be rewritten in place as members are added after
+the last chunk.
+"""
+
+import io
+import json
+import lzma
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Generator, Iterable, Iterator
+
+from cryptography.fernet import Fernet
+
+from stegos.core.compression.file import (
+    DecompressionLimits,
+    SizeCounter,
+    copy_limited,
+    unique_name,
+)
+from stegos.core.exception import InvalidContainerException
+from stegos.core.image import Image
+from stegos.core.steganography.base import PayloadReader
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+
+MAGIC = b"STGX"
+VERSION = 1
+HEADER_FORMAT = ">4sBII"  # magic, version, TOC capacity, TOC length
+PREFIX_BYTES = EncryptionDecorator.SALT_LENGTH + struct.calcsize(HEADER_FORMAT)
+CHUNK_SIZE = 2**20  # compressed bytes per encrypted chunk
+TOC_RESERVE = 2**10  # bytes reserved beyond the table of contents
+CHUNK_HEADER_FORMAT = ">Q"  # offset of the chunk, after the table of contents
+CHUNK_HEADER_BYTES = struct.calcsize(CHUNK_HEADER_FORMAT)
+
+
+@dataclass(frozen=True)
+class ContainerMember:
+    """File held by an indexed container."""
+
+    name: str
+    size: int  # decompressed bytes
+    offset: int  # position of the first chunk, after the table of contents
+    chunks: tuple[int, ...]  # size of each encrypted chunk in bytes
+
+    @property
+    def stored_size(self) -> int:
+        """
+        Gets the size of the member as embedded.
+        :return: Size of the encrypted chunks in bytes.
+        """
+        return sum(self.chunks)
+
+
+@dataclass(frozen=True)
+class PackedMember:
+    """File compressed for an indexed container, before encryption."""
+
+    name: str
+    size: int  # decompressed bytes
+    chunks: list[bytes]  # compressed chunks
+
+
+def token_size(size: int) -> int:
+    """
+    Gets the exact size of the Fernet token of some data.
+    :param size: Size of the data in bytes.
+    :return: Size of the token in bytes.
+    """
+    return EncryptionDecorator.encrypted_size(size) - EncryptionDecorator.SALT_LENGTH
+
+
+def is_container(prefix: bytes) -> bool:
+    """
+    Checks whether an embedded payload is an indexed container, without decrypting it.
+    :param prefix: Leading bytes of the embedded payload.
+    :return: True if the payload starts with a salt and a container header, otherwise False.
+    """
+    start = EncryptionDecorator.SALT_LENGTH
+    return prefix[start : start + len(MAGIC)] == MAGIC
+
+
+def compress_member(path: str | os.PathLike[str], name: str = None) -> PackedMember:
+    """
+    Compresses a file into chunks, reading it in bounded blocks.
+    :param path: Path of the file.
+    :param name: Name of the member. Defaults to the basename of the file.
+    :return: Compressed file.
+    """
+    compressor, buffer, chunks, size = lzma.LZMACompressor(), bytearray(), [], 0
+    with open(path, "rb") as file:
+        while data := file.read(CHUNK_SIZE):
+            size += len(data)
+            buffer += compressor.compress(data)
+            while len(buffer) >= CHUNK_SIZE:
+                chunks.append(bytes(buffer[:CHUNK_SIZE]))
+                del buffer[:CHUNK_SIZE]
+    buffer += compressor.flush()
+    chunks += [
+        bytes(buffer[i : i + CHUNK_SIZE]) for i in range(0, len(buffer), CHUNK_SIZE)
+    ]
+    return PackedMember(name or os.path.basename(path), size, chunks)
+
+
+def compress_members(
+    files: str | os.PathLike[str] | Iterable[str], used: set[str] = None
+) -> list[PackedMember]:
+    """
+    Compresses files into chunks, naming each after its basename.
+    :param files: Path of a file, or paths of many files.
+    :param used: Member names already used. Repeated names are numbered.
+    :return: Compressed files, in order.
+    """
+    if isinstance(files, (str, os.PathLike)):
+        files = [files]
+    used = set() if used is None else used
+    return [
+        compress_member(file, unique_name(os.path.basename(file), used))
+        for file in files
+    ]
+
+
+def layout(members: Iterable[PackedMember], offset: int = 0) -> list[ContainerMember]:
+    """
+    Lays out the encrypted chunks of members one after another.
+    :param members: Compressed files, in order.
+    :param offset: Position of the first chunk, after the table of contents.
+    :return: Entry of each member in the table of contents.
+    """
+    entries = []
+    for member in members:
+        chunks = tuple(
+            token_size(CHUNK_HEADER_BYTES + len(chunk)) for chunk in member.chunks
+        )
+        entries.append(ContainerMember(member.name, member.size, offset, chunks))
+        offset += sum(chunks)
+    return entries
+
+
+def seal_chunks(
+    fernet: Fernet, members: Iterable[PackedMember], entries: Iterable[ContainerMember]
+) -> Generator[bytes, None, None]:
+    """
+    Encrypts the chunks of members, each behind its offset.
+    :param fernet: Fernet instance holding the key of the container.
+    :param members: Compressed files, in order.
+    :param entries: Entry of each member, as given by layout.
+    :return: Yields the token of each chunk, in order.
+    """
+    for member, entry in zip(members, entries):
+        offset = entry.offset
+        for chunk, size in zip(member.chunks, entry.chunks):
+            yield fernet.encrypt(struct.pack(CHUNK_HEADER_FORMAT, offset) + chunk)
+            offset += size
+
+
+def toc_bytes(entries: Iterable[ContainerMember]) -> bytes:
+    """
+    Encodes a table of contents, before encryption.
+    :param entries: Entry of each member.
+    :return: Table of contents as bytes.
+    """
+    toc = [[m.name, m.size, m.offset, list(m.chunks)] for m in entries]
+    return json.dumps(toc, separators=(",", ":")).encode()
+
+
+def packed_size(members: list[PackedMember], toc_reserve: int = TOC_RESERVE) -> int:
+    """
+    Gets the exact size of a container once packed, without encrypting it.
+    :param members: Compressed files, in order.
+    :param toc_reserve: Bytes reserved beyond the table of contents.
+    :return: Size of the container in bytes.
+    """
+    entries = layout(members)
+    toc = token_size(len(toc_bytes(entries)))
+    return PREFIX_BYTES + toc + toc_reserve + sum(m.stored_size for m in entries)
+
+
+def pack(
+    members: list[PackedMember],
+    key: tuple[bytes, bytes],
+    toc_reserve: int = TOC_RESERVE,
+) -> bytes:
+    """
+    Encrypts compressed files into a container.
+    :param members: Compressed files, in order.
+    :param key: Salt and key returned by EncryptionDecorator.new_key.
+    :param toc_reserve: Bytes reserved beyond the table of contents.
+    :return: Container, to be embedded without further encryption.
+    """
+    salt, key = key
+    fernet = Fernet(key)
+    entries = layout(members)
+    toc = fernet.encrypt(toc_bytes(entries))
+    header = struct.pack(
+        HEADER_FORMAT, MAGIC, VERSION, len(toc) + toc_reserve, len(toc)
+    )
+    chunks = seal_chunks(fernet, members, entries)
+    return b"".join([salt, header, toc, os.urandom(toc_reserve), *chunks])
+
+
+class _MemberStream(io.RawIOBase):
+    """Readable stream of a member, decrypting and decompressing one chunk at a time."""
+
+    def __init__(self, member: ContainerMember, chunks: Iterator[bytes]):
+        """
+        Creates an instance of _MemberStream.
+        :param member: Entry of the member.
+        :param chunks: Decrypted chunks of the member, in order.
+        """
+        self._member = member
+        self._chunks = chunks
+        self._decompressor = lzma.LZMADecompressor()
+        self._size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._decompressor.eof:
+            data = b""
+            if self._decompressor.needs_input:
+                data = next(self._chunks, None)
+                if data is None:
+                    raise InvalidContainerException(f"{self._member.name} is truncated")
+            decompressed = self._decompressor.decompress(data, len(buffer))
+            if decompressed:
+                self._size += len(decompressed)
+                if self._size > self._member.size:
+                    raise InvalidContainerException(
+                        f"{self._member.name} is larger than the {self._member.size} bytes it declares"
+                    )
+                buffer[: len(decompressed)] = decompressed
+                return len(decompressed)
+        return 0
+
+
+class IndexedContainer:
+    """Indexed container read from an embedded payload.
+
+    Only the table of contents is decrypted when the container is opened. Reading a member only gathers and decrypts
+    the ranges of the payload that hold its chunks. Members added by update are listed at once, but are read by opening
+    the container again, as the reader is bounded by the payload size it was opened with.
+    """
+
+    def __init__(
+        self,
+        reader: PayloadReader,
+        fernet: Fernet,
+        toc_capacity: int,
+        members: list[ContainerMember],
+        image: Image = None,
+    ):
+        """
+        Creates an instance of IndexedContainer. Use open to read a container from a payload.
+        :param reader: Reader of the embedded payload.
+        :param fernet: Fernet instance holding the key of the container.
+        :param toc_capacity: Bytes reserved for the encrypted table of contents.
+        :param members: Entry of each member.
+        :param image: Decoded image that owns the memory of the carrier, kept alive while the container is read.
+        """
+        self._reader = reader
+        self._fernet = fernet
+        self._toc_capacity = toc_capacity
+        self._members = {member.name: member for member in members}
+        self._image = image
+        self._end = reader.size - PREFIX_BYTES - toc_capacity  # end of the chunks
+
+    @classmethod
+    def open(
+        cls,
+        reader: PayloadReader,
+        new_key: Callable[[bytes], tuple[bytes, bytes]],
+        image: Image = None,
+        prefix: bytes = None,
+    ) -> "IndexedContainer":
+        """
+        Opens a container, decrypting only its table of contents.
+        :param reader: Reader of the embedded payload.
+        :param new_key: Function deriving the key of a salt, such as EncryptionDecorator.new_key.
+        :param image: Decoded image that owns the memory of the carrier, kept alive while the container is read.
+        :param prefix: First PREFIX_BYTES bytes of the payload, if already read. Defaults to reading them.
+        :return: Opened container.
+        """
+        if prefix is None:
+            prefix = reader.read(0, PREFIX_BYTES)
+        if len(prefix) < PREFIX_BYTES or not is_container(prefix):
+            raise InvalidContainerException("payload is not an indexed container")
+        salt = prefix[: EncryptionDecorator.SALT_LENGTH]
+        _, version, capacity, length = struct.unpack_from(
+            HEADER_FORMAT, prefix, EncryptionDecorator.SALT_LENGTH
+        )
+        if version != VERSION:
+            raise InvalidContainerException(f"unsupported container version {version}")
+        if length > capacity or PREFIX_BYTES + capacity > reader.size:
+            raise InvalidContainerException("table of contents exceeds the payload")
+
+        _, key = new_key(salt)
+        fernet = Fernet(key)
+        toc = fernet.decrypt(reader.read(PREFIX_BYTES, PREFIX_BYTES + length))
+        try:
+            members = [
+                ContainerMember(name, size, offset, tuple(chunks))
+                for name, size, offset, chunks in json.loads(toc)
+            ]
+        except (ValueError, TypeError) as e:
+            raise InvalidContainerException("malformed table of contents") from e
+        return cls(reader, fernet, capacity, members, image)
+
+    @property
+    def members(self) -> list[ContainerMember]:
+        """
+        Gets the entry of each member.
+        :return: Entries, in the order the members were added.
+        """
+        return list(self._members.values())
+
+    def member(self, name: str) -> ContainerMember:
+        """
+        Gets the entry of a member.
+        :param name: Name of the member.
+        :return: Entry of the member.
+        """
+        try:
+            return self._members[name]
+        except KeyError:
+            raise KeyError(f"no member named {name!r}") from None
+
+    def _chunks(self, member: ContainerMember) -> Generator[bytes, None, None]:
+        """
+        Gathers and decrypts the chunks of a member, one at a time, checking that each was encrypted at its offset.
+        :param member: Entry of the member.
+        :return: Yields the decrypted chunks, in order.
+        """
+        data_start, offset = PREFIX_BYTES + self._toc_capacity, member.offset
+        for size in member.chunks:
+            start = data_start + offset
+            token = self._reader.read(start, start + size)
+            if len(token) < size:
+                raise InvalidContainerException(f"{member.name} exceeds the payload")
+            chunk = self._fernet.decrypt(token)
+            if struct.unpack_from(CHUNK_HEADER_FORMAT, chunk) != (offset,):
+                raise InvalidContainerException(
+                    f"{member.name} holds a chunk encrypted at another offset"
+                )
+            yield chunk[CHUNK_HEADER_BYTES:]
+            offset += size
+
+    def open_member(self, name: str) -> BinaryIO:
+        """
+        Opens a member for reading, decrypting and decompressing it one chunk at a time.
+        :param name: Name of the member.
+        :return: Readable binary stream of the member.
+        """
+        member = self.member(name)
+        return io.BufferedReader(
+            _MemberStream(member, self._chunks(member)), CHUNK_SIZE
+        )
+
+    def read(self, name: str) -> bytes:
+        """
+        Reads a member whole.
+        :param name: Name of the member.
+        :return: Decompressed member.
+        """
+        with self.open_member(name) as file:
+            return b"".join(iter(lambda: file.read(CHUNK_SIZE), b""))
+
+    def update(
+        self, members: list[PackedMember], write: Callable[[int, bytes], None]
+    ) -> list[ContainerMember]:
+        """
+        Adds members in place, replacing members of the same name.
+
+        Only the chunks of the new members are encrypted and written, after the end of the payload, then the header
+        and table of contents are rewritten in place. Chunks of replaced members are left in place, unreferenced, and
+        never reclaimed. The table of contents is encrypted first, so nothing is written if it outgrows its capacity,
+        which is fixed by the reserve the container was packed with: every added member takes 50 to 100 bytes of it.
+        :param members: Compressed files to add.
+        :param write: Function that overwrites the embedded payload from a position, extending it if needed, such as
+        BaseLSBSteganography.write on the carrier.
+        :return: Entry of each added member.
+        """
+        entries = layout(members, self._end)
+        updated = self._members | {entry.name: entry for entry in entries}
+        toc = self._fernet.encrypt(toc_bytes(updated.values()))
+        if len(toc) > self._toc_capacity:
+            raise InvalidContainerException(
+                f"table of contents of {len(toc)} bytes exceeds its capacity of {self._toc_capacity} bytes"
+            )
+
+        chunks = seal_chunks(self._fernet, members, entries)
+        write(PREFIX_BYTES + self._toc_capacity + self._end, b"".join(chunks))
+        header = struct.pack(
+            HEADER_FORMAT, MAGIC, VERSION, self._toc_capacity, len(toc)
+        )
+        write(EncryptionDecorator.SALT_LENGTH, header + toc)
+        self._members = updated
+        self._end += sum(entry.stored_size for entry in entries)
+        return entries
+
+    def extract_to(
+        self,
+        directory: str | Path,
+        limits: DecompressionLimits = DecompressionLimits(),
+        workers: int = None,
+        overwrite: bool = False,
+    ) -> list[Path]:
+        """
+        Extracts every member straight to a directory, streaming each member in bounded chunks, on a thread pool.
+
+        Declared sizes are checked before anything is written. Members are written under their basenames, so no file
+        is written outside the directory.
+        :param directory: Directory to write the members to.
+        :param limits: Limits on the decompressed size of the members.
+        :param workers: Number of threads used to write members. Defaults to the number of CPUs.
+        :param overwrite: Whether to overwrite existing files.
+        :return: Paths of the written files.
+        """
+        members = self.members
+        stored_size = sum(member.stored_size for member in members)
+        limits.check(sum(member.size for member in members), stored_size)
+        used = set()
+        paths = [
+            Path(directory, unique_name(os.path.basename(member.name), used))
+            for member in members
+        ]
+        counter = SizeCounter(limits, stored_size)
+
+        def write(member: ContainerMember, path: Path) -> None:
+            with self.open_member(member.name) as file:
+                copy_limited(file, path, counter, member.size, overwrite)
+
+        workers = min(workers or os.cpu_count(), max(len(members), 1))
+        if workers <= 1:
+            list(map(write, members, paths))
+        else:
+            with ThreadPoolExecutor(workers) as executor:
+                list(executor.map(write, members, paths))  # raises the first exception
+        return paths
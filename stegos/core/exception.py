@@ -2,3 +2,15 @@ class UnsupportedImageFormatException(Exception):
     """Exception raised when an unsupported image format is encountered."""
 
     pass
+
+
+class InvalidShardException(Exception):
+    """Exception raised when the shards of a payload can not be reassembled."""
+
+    pass
+
+
+class InvalidContainerException(Exception):
+    """Exception raised when an indexed container can not be read."""
+
+    pass
@@ -3,6 +3,8 @@ from pathlib import Path
 from typing import Protocol
 
 import jpegio as jio
+import numpy as np
+from PIL import Image as PILImage
 
 
 class Image(Protocol):
@@ -27,5 +29,78 @@ class JPEGImage(Image):
         """
         self._image = image
 
+    @property
+    def coef_arrays(self) -> list[np.ndarray]:
+        """
+        Gets the DCT coefficients of each component. The image owns their memory, so must outlive them.
+        :return: List of writable NumPy arrays of coefficients.
+        """
+        return self._image.coef_arrays
+
     def save(self, path: str | Path) -> None:
         jio.write(self._image, str(path))
+
+
+class LosslessImage(Image):
+    """Lossless image for LSB steganography operations, backed by a NumPy array of its decoded pixels.
+
+    Pixels are decoded once into a writable array, which is embedded in place and encoded directly when saved.
+    """
+
+    STRIP_BYTES = 2**18
+
+    def __init__(self, pixels: np.ndarray):
+        """
+        Creates an instance of LosslessImage.
+        :param pixels: NumPy array of the decoded pixels.
+        """
+        self._pixels = pixels
+
+    @staticmethod
+    def size(image: PILImage.Image) -> int:
+        """
+        Gets the number of elements of the decoded pixels from the header of an image, without decoding it.
+        :param image: Image opened with PIL.
+        :return: Number of elements of the decoded pixels.
+        """
+        width, height = image.size
+        return width * height * len(image.getbands())
+
+    @classmethod
+    def open(cls, image: PILImage.Image) -> "LosslessImage":
+        """
+        Decodes an image into a writable array.
+
+        Pixels are converted in strips of rows, so the image is never held as an intermediate bytes copy. PIL still
+        decodes the whole image into its own buffer, of 4 bytes per pixel for RGB, which is closed once every strip is
+        converted.
+        :param image: Image opened with PIL.
+        :return: Decoded image.
+        """
+        width, height = image.size
+        row = np.asarray(image.crop((0, 0, width, 1)))
+        pixels = np.empty((height, *row.shape[1:]), dtype=row.dtype)
+        rows = max(cls.STRIP_BYTES // max(row.nbytes, 1), 1)
+        for top in range(0, height, rows):
+            bottom = min(top + rows, height)
+            pixels[top:bottom] = np.asarray(image.crop((0, top, width, bottom)))
+        image.close()
+        return cls(pixels)
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """
+        Gets the decoded pixels.
+        :return: Writable NumPy array of pixels.
+        """
+        return self._pixels
+
+    def save(self, path: str | Path) -> None:
+        """
+        Saves the image, encoding its pixels directly.
+
+        PIL shares the memory of modes it stores as they are, such as L and RGBA. RGB pixels are copied into the 4 byte
+        per pixel layout of PIL before encoding, which is unavoidable as PIL encodes from its own buffer.
+        :param path: Filename to save the image as.
+        """
+        PILImage.fromarray(self._pixels).save(path)
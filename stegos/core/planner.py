@@ -0,0 +1,266 @@
+"""This module provides a planner that predicts the capacity and cost of embedding in an image, without embedding.
+
+Lossless images are planned from their header only. JPEGs are decoded once, to count their eligible coefficients.
+"""
+
+import lzma
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import jpegio as jio
+import numpy as np
+from PIL import Image as PILImage
+from PIL import ImageMode
+
+from stegos.core.constants import ImageCompressionType, compression_type, is_jpeg
+from stegos.core.image import LosslessImage
+from stegos.core.steganography.algorithms.lossy import ComponentLossyLSBSteganography
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
+from stegos.core.steganography.builder import SteganographyStrategyBuilder
+from stegos.core.steganography.decorators.encryption import (
+    ARGON2_MEMORY_COST,
+    KDF,
+    EncryptionDecorator,
+)
+from stegos.core.steganography.engine import BaseEngine
+
+DEPTHS = range(1, 8)
+
+
+@dataclass(frozen=True)
+class StageCost:
+    """Predicted cost of a stage of embedding."""
+
+    memory: int  # peak bytes
+    time: float  # seconds
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """Per-unit costs used to predict the cost of each stage of embedding.
+
+    The defaults were measured on a single core. Use calibrate to measure them on the local machine.
+    """
+
+    decode_seconds: float = 1.1e-8  # per lossless element
+    encode_seconds: float = 8.0e-8  # per lossless element
+    jpeg_decode_seconds: float = 5.6e-8  # per coefficient
+    jpeg_encode_seconds: float = 3.3e-8  # per coefficient
+    eligible_seconds: float = 8.6e-9  # per coefficient
+    compress_seconds: float = 5.0e-7  # per payload byte
+    kdf_seconds: float = 4.3  # per key
+    embed_seconds: float = 1.6e-7  # per embedded bit
+
+    @classmethod
+    def calibrate(cls, megapixels: float = 1, kdf: KDF = None) -> "CostModel":
+        """
+        Measures the per-unit costs on the local machine, using a random carrier and payload.
+        :param megapixels: Size of the carrier in megapixels.
+        :param kdf: Key derivation function to measure. Defaults to the key derivation function used for embedding.
+        :return: Calibrated cost model.
+        """
+        side = int((megapixels * 10**6) ** 0.5)
+        rng = np.random.default_rng()
+        pixels = rng.integers(0, 256, size=(side, side, 3), dtype=np.uint8)
+        payload = rng.bytes(min(pixels.size // 16, 2**20))  # fits at the default depth
+
+        def measure(func: Callable[[], object]) -> float:
+            start = time.perf_counter()
+            func()
+            return time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as directory:
+            png, jpeg = Path(directory, "cover.png"), Path(directory, "cover.jpg")
+            PILImage.fromarray(pixels).save(png)
+            PILImage.fromarray(pixels).save(jpeg)
+            decode = measure(lambda: LosslessImage.open(PILImage.open(png)))
+            encode = measure(lambda: LosslessImage(pixels).save(png))
+            coefs = jio.read(str(jpeg))
+            count = sum(c.size for c in coefs.coef_arrays)
+            jpeg_decode = measure(lambda: jio.read(str(jpeg)))
+            jpeg_encode = measure(lambda: jio.write(coefs, str(jpeg)))
+            eligible = measure(
+                lambda: [
+                    ComponentLossyLSBSteganography().eligible_count(c)
+                    for c in coefs.coef_arrays
+                ]
+            )
+        compress = measure(lambda: lzma.compress(payload))
+        steg = LSBSteganography()
+        kdf_seconds = measure(EncryptionDecorator(steg, b"", kdf).new_key)
+        steg.embed(pixels[:16], b"E")  # load the kernels beforehand
+        embed = measure(lambda: steg.embed(pixels, payload))
+        return cls(
+            decode / pixels.size,
+            encode / pixels.size,
+            jpeg_decode / count,
+            jpeg_encode / count,
+            eligible / count,
+            compress / len(payload),
+            kdf_seconds,
+            embed / (len(payload) * 8),
+        )
+
+
+@dataclass(frozen=True)
+class Plan:
+    """Predicted capacity and cost of embedding in an image.
+
+    Stages are decode, compress, kdf, embed and encode. Decoding overlaps compression and, for lossless images, key
+    derivation.
+    """
+
+    compression_type: ImageCompressionType
+    elements: int  # decoded pixel elements, or DCT coefficients
+    # largest payload in bytes per LSB depth the service can embed at, after compression and before encryption
+    capacities: dict[int, int]
+    lsb_depth: int  # largest depth the service embeds at
+    stages: dict[str, StageCost]
+
+    @property
+    def capacity(self) -> int:
+        """
+        Gets the largest payload the service can embed.
+        :return: Payload capacity in bytes, after compression and before encryption.
+        """
+        return self.capacities[self.lsb_depth]
+
+    def fits(self, payload_size: int) -> bool:
+        """
+        Checks whether a payload fits, assuming compression does not change its size. Compression usually shrinks
+        the payload, but an incompressible payload grows by 3 bytes per 64 KiB and up to 140 bytes of framing, so
+        the result is not conservative for payloads close to the capacity.
+        :param payload_size: Size of the payload in bytes.
+        :return: True if the payload fits, otherwise False.
+        """
+        return 0 < payload_size <= self.capacity
+
+    @property
+    def time(self) -> float:
+        """
+        Gets the predicted wall time of embedding.
+        :return: Wall time in seconds.
+        """
+        decode, compress, kdf, embed, encode = (
+            self.stages[stage].time
+            for stage in ("decode", "compress", "kdf", "embed", "encode")
+        )
+        if self.compression_type == ImageCompressionType.LOSSY:
+            return max(decode, compress) + kdf + embed + encode
+        return max(decode, compress + kdf) + embed + encode
+
+    @property
+    def memory(self) -> int:
+        """
+        Gets the predicted peak memory of embedding. The decoded image is held throughout.
+        :return: Peak memory in bytes.
+        """
+        decode = self.stages["decode"].memory
+        return decode + max(
+            stage.memory for name, stage in self.stages.items() if name != "decode"
+        )
+
+
+def _lossless_plan(
+    image: PILImage.Image, cost_model: CostModel
+) -> tuple[int, dict[int, int], dict[str, StageCost]]:
+    """
+    Plans embedding in a lossless image, from its header only.
+    :param image: Image opened with PIL.
+    :param cost_model: Per-unit costs of each stage.
+    :return: Number of elements, payload capacity per depth, and the decode and encode costs.
+    """
+    elements = LosslessImage.size(image)
+    itemsize = np.dtype(ImageMode.getmode(image.mode).typestr).itemsize
+    width, height = image.size
+    # PIL stores multi-band pixels in 4 bytes
+    internal = width * height * (4 if len(image.getbands()) > 1 else itemsize)
+    steg = LSBSteganography()
+    capacities = {depth: steg.capacity(elements, depth) for depth in DEPTHS}
+    stages = {
+        "decode": StageCost(
+            elements * itemsize + internal, elements * cost_model.decode_seconds
+        ),
+        "encode": StageCost(internal, elements * cost_model.encode_seconds),
+    }
+    return elements, capacities, stages
+
+
+def _jpeg_plan(
+    path: str | Path, cost_model: CostModel, steg: ComponentLossyLSBSteganography
+) -> tuple[int, dict[int, int], dict[str, StageCost]]:
+    """
+    Plans embedding in a JPEG, decoding it once to count its eligible coefficients.
+
+    Eligibility depends on the depth, so coefficients are only counted at the fixed depth of the strategy.
+    :param path: Path of the JPEG.
+    :param cost_model: Per-unit costs of each stage.
+    :param steg: Strategy the service embeds with.
+    :return: Number of coefficients, payload capacity at the depth of the strategy, and the decode and encode costs.
+    """
+    jpeg = jio.read(str(path))  # owns the memory of its coefficients
+    coef_arrays = jpeg.coef_arrays
+    elements = sum(coefs.size for coefs in coef_arrays)
+    capacities = {
+        steg.lsb_depth: steg.combined_capacity(
+            [steg.capacity(steg.eligible_count(coefs)) for coefs in coef_arrays]
+        )
+    }
+    coefs_bytes = sum(coefs.nbytes for coefs in coef_arrays)
+    stages = {
+        "decode": StageCost(
+            coefs_bytes * 3 // 2,  # jpegio keeps the 16-bit coefficients of libjpeg
+            elements
+            * (cost_model.jpeg_decode_seconds + 2 * cost_model.eligible_seconds),
+        ),
+        "encode": StageCost(
+            coefs_bytes // 2, elements * cost_model.jpeg_encode_seconds
+        ),
+    }
+    return elements, capacities, stages
+
+
+def plan(path: str | Path, payload_size: int = 0, cost_model: CostModel = None) -> Plan:
+    """
+    Predicts the capacity and cost of embedding a payload in an image, as done by the steganography service.
+    :param path: Path of the image.
+    :param payload_size: Size of the payload in bytes. Compression is assumed not to change its size.
+    :param cost_model: Per-unit costs of each stage. Defaults to the costs measured on a single core.
+    :return: Predicted capacity and cost.
+    """
+    cost_model = cost_model or CostModel()
+    if is_jpeg(path):
+        comp_type = ImageCompressionType.LOSSY
+        steg = SteganographyStrategyBuilder(comp_type).build()
+        elements, capacities, stages = _jpeg_plan(path, cost_model, steg)
+    else:
+        with PILImage.open(path) as image:
+            comp_type = compression_type(image)
+            steg = SteganographyStrategyBuilder(comp_type, image).build()
+            elements, capacities, stages = _lossless_plan(image, cost_model)
+    lsb_depth = steg.max_lsb_depth or steg.lsb_depth
+
+    capacities = {
+        depth: max(EncryptionDecorator.max_payload_size(capacity), 0)
+        for depth, capacity in capacities.items()
+    }
+    encrypted_size = EncryptionDecorator.encrypted_size(payload_size)
+    # chunks of indices and permuted values, plus the encrypted payload
+    chunk_bytes = min(encrypted_size * 8, BaseEngine.CHUNK_SIZE) * 48
+    stages = {
+        "decode": stages["decode"],
+        "compress": StageCost(
+            2 * payload_size + 94 * 2**20,  # lzma preset 6 dictionary
+            payload_size * cost_model.compress_seconds,
+        ),
+        "kdf": StageCost(ARGON2_MEMORY_COST * 2**10, cost_model.kdf_seconds),
+        "embed": StageCost(
+            2 * encrypted_size + chunk_bytes,
+            encrypted_size * 8 * cost_model.embed_seconds,
+        ),
+        "encode": stages["encode"],
+    }
+    return Plan(comp_type, elements, capacities, lsb_depth, stages)
@@ -0,0 +1,98 @@
+"""This module provides a scanner that triages which images probably carry a payload, without deriving a key.
+
+Each image is decoded whole, and the eligible coefficients of the first component of a JPEG are found, but only the
+seed, header, payload size and the leading bytes of the payload are extracted. An image is a candidate if its header is
+valid, its payload size fits its capacity and matches the size of an encrypted payload, and its payload
+starts with a salt and a Fernet token with a plausible timestamp, or with a salt and the header of an indexed
+container.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Generator
+
+from stegos.core import container
+from stegos.core.batch import batch_images
+from stegos.core.service import LSBSteganographyService
+from stegos.core.steganography.base import PayloadProbe
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+
+MIN_TIMESTAMP = 1420070400  # 2015-01-01, before any payload was encrypted
+MAX_CLOCK_SKEW = 24 * 60 * 60  # seconds
+
+
+@dataclass
+class ProbeResult:
+    """Result of probing one image."""
+
+    image: Path
+    candidate: bool = False
+    reason: str = None  # why the image is not a candidate
+    probe: PayloadProbe = None
+    error: Exception = None
+    seconds: float = 0
+
+
+def _implausible(probe: PayloadProbe, now: float) -> str | None:
+    """
+    Checks the plausibility of a probed payload.
+    :param probe: Probe of the embedded payload.
+    :param now: Current time, in seconds since the epoch.
+    :return: Why the payload is implausible, or None if it is plausible.
+    """
+    if probe.header is None:
+        return "no header"
+    if probe.payload_bits == 0 or probe.payload_bits % 8:
+        return f"payload size of {probe.payload_bits} bits is not whole bytes"
+    if probe.payload_size > probe.capacity:
+        return f"payload size of {probe.payload_size} bytes exceeds capacity of {probe.capacity} bytes"
+    if container.is_container(probe.prefix):
+        return None
+    single = probe.header.components in (0, 1)  # otherwise only a segment is probed
+    if single and not EncryptionDecorator.is_encrypted_size(probe.payload_size):
+        return f"payload size of {probe.payload_size} bytes is not an encrypted size"
+    timestamp = EncryptionDecorator.token_timestamp(probe.prefix)
+    if timestamp is None:
+        return "payload does not start with a salt and token"
+    if not MIN_TIMESTAMP <= timestamp <= now + MAX_CLOCK_SKEW:
+        return f"token timestamp {timestamp} is implausible"
+    return None
+
+
+def probe(image: str | os.PathLike[str]) -> ProbeResult:
+    """
+    Probes an image for a payload, without deriving a key.
+    :param image: Path of the image.
+    :return: Result of the probe, holding any exception raised.
+    """
+    start = time.perf_counter()
+    result = ProbeResult(Path(image))
+    try:
+        service = LSBSteganographyService()
+        opened = service.open_image(str(image))  # no password, as no key is derived
+        decoded, carrier = service.decode(opened)
+        result.probe = opened.strategy.probe(carrier, EncryptionDecorator.PREFIX_BYTES)
+        result.reason = _implausible(result.probe, time.time())
+        result.candidate = result.reason is None
+    except Exception as e:
+        result.error, result.reason = e, "image could not be probed"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def probe_images(
+    images: str | os.PathLike[str], workers: int = None
+) -> Generator[ProbeResult, None, None]:
+    """
+    Probes many images for payloads in parallel.
+    :param images: Directory of images, or a glob pattern.
+    :param workers: Number of processes. Defaults to the number of CPUs.
+    :return: Yields the result of each image, in the order they finish.
+    """
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(probe, path) for path in batch_images(images)]
+        for future in as_completed(futures):
+            yield future.result()
@@ -1,20 +1,40 @@
 import io
 import lzma
 import zipfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Iterable, Generator
+from pathlib import Path
+from typing import Callable, Iterable, Generator
 
 import jpegio as jio
 import numpy as np
 from PIL import Image as PILImage
 
-from stegos.core.compression.file import FileCompressor, ZipCompressor
+from stegos.core.compression.file import (
+    DecompressionLimits,
+    FileCompressor,
+    SizeCounter,
+    ZipCompressor,
+    copy_limited,
+    unique_name,
+)
+from stegos.core import container
 from stegos.core.constants import (
     compression_type,
+    is_jpeg,
     ImageCompressionType,
 )
-from stegos.core.image import JPEGImage, Image
+from stegos.core.container import ContainerMember, IndexedContainer
+from stegos.core.exception import InvalidShardException
+from stegos.core.image import JPEGImage, Image, LosslessImage
+from stegos.core.planner import plan
+from stegos.core.shard import ShardHeader, join, split, split_sizes
+from stegos.core.steganography.algorithms.lossy import EligibleCoefficients
+from stegos.core.steganography.base import BaseLSBSteganography, PayloadReader
 from stegos.core.steganography.builder import SteganographyStrategyBuilder
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+from stegos.core.steganography.exception import InsufficientCapacityException
 
 
 @dataclass
@@ -26,18 +46,80 @@ class ExtractedItem:
     name: str = None
 
 
+@dataclass
+class OpenedImage:
+    """Image opened for a steganography operation, with only its header read.
+
+    Returned by LSBSteganographyService.open_image, and passed to the later stages of the operation.
+    """
+
+    path: str
+    compression_type: ImageCompressionType
+    image: PILImage.Image | None  # None for JPEGs, which are decoded by jpegio
+    strategy: EncryptionDecorator
+    elements: int | None  # of the decoded pixels, read from the header. None for JPEGs
+
+    @property
+    def validates_from_header(self) -> bool:
+        """
+        Gets whether a payload can be validated from the header of the image, without decoding it.
+        :return: True if the number of elements is known and the strategy validates from it, otherwise False.
+        """
+        return self.elements is not None and self.strategy.validates_elements
+
+    def close(self) -> None:
+        """
+        Closes the image, if it is not needed again, such as after validating it.
+        """
+        if self.image is not None:
+            self.image.close()
+
+
+@dataclass(frozen=True)
+class PendingPayload:
+    """Payload compressed for embedding, waiting for a key to seal it with.
+
+    The size of the sealed payload is known before the key is derived, so the payload can be validated first.
+    """
+
+    size: int  # bytes, once sealed
+    seal: Callable[[EncryptionDecorator, tuple[bytes, bytes]], bytes]
+
+
+@dataclass(frozen=True)
+class EmbeddedPayload:
+    """Payload of a stego image opened for reading, with its leading bytes read."""
+
+    reader: PayloadReader
+    prefix: bytes  # salt, then the header of an indexed container or the start of a Fernet token
+
+    @property
+    def salt(self) -> bytes:
+        """
+        Gets the salt of the key the payload was sealed with.
+        :return: Salt as bytes.
+        """
+        return self.prefix[: EncryptionDecorator.SALT_LENGTH]
+
+
 class LSBSteganographyService:
     """Service/facade for LSB steganography operations.
 
     Coordinates compression, encryption + key derivation, and steganography operations for files and arbitrary bytes.
     """
 
-    def __init__(self, file_compressor: FileCompressor = None):
+    def __init__(
+        self,
+        file_compressor: FileCompressor = None,
+        limits: DecompressionLimits = DecompressionLimits(),
+    ):
         """
         Creates an instance of LSBSteganographyService.
         :param file_compressor: Compressor used to compress and decompress hidden files.
+        :param limits: Limits on the decompressed size of payloads extracted to a directory.
         """
         self._file_compressor = file_compressor or ZipCompressor()
+        self._limits = limits
 
     def _compress_payload(self, payload) -> bytes:
         """
@@ -49,31 +131,511 @@ class LSBSteganographyService:
             return lzma.compress(payload)
         return self._file_compressor.compress(payload)
 
+    @staticmethod
+    def _pending(compressed: bytes) -> PendingPayload:
+        """
+        Wraps a compressed payload, to be encrypted as a single Fernet token.
+        :param compressed: Compressed payload.
+        :return: Payload waiting for a key.
+        """
+        return PendingPayload(
+            EncryptionDecorator.encrypted_size(len(compressed)),
+            lambda strategy, key: strategy.seal(compressed, key),
+        )
+
+    @staticmethod
+    def sealed_bound(payload: bytes | Iterable[str]) -> int | None:
+        """
+        Gets an upper bound of the size of a payload once compressed and sealed, without compressing it.
+
+        LZMA stores incompressible data in chunks of 64 KiB with a 3 byte header, so compression grows a payload by a
+        few bytes per chunk and the framing of the stream at most. The bound is generous, as it only decides whether
+        the key can be derived while the payload is compressed.
+        :param payload: Payload to embed. Should be bytes or a list of file paths.
+        :return: Upper bound in bytes, or None for files, whose archive is not bounded ahead.
+        """
+        if not isinstance(payload, bytes):
+            return None
+        compressed = len(payload) + len(payload) // 2**12 + 2**10
+        return EncryptionDecorator.encrypted_size(compressed)
+
+    def compress(self, payload: bytes | Iterable[str]) -> PendingPayload:
+        """
+        Compresses a payload for embedding. A stage of embed.
+        :param payload: Payload to compress. Should be bytes or a list of file paths.
+        :return: Payload waiting for a key.
+        """
+        return self._pending(self._compress_payload(payload))
+
+    @staticmethod
+    def compress_indexed(
+        files: str | Iterable[str], toc_reserve: int = container.TOC_RESERVE
+    ) -> PendingPayload:
+        """
+        Compresses files for embedding as an indexed container. A stage of embed_indexed.
+        :param files: Path of a file, or paths of many files. Repeated names are numbered.
+        :param toc_reserve: Bytes reserved beyond the table of contents, for the entries of files added by updates.
+        :return: Container waiting for a key.
+        """
+        members = container.compress_members(files)
+        return PendingPayload(
+            container.packed_size(members, toc_reserve),
+            lambda strategy, key: container.pack(members, key, toc_reserve),
+        )
+
+    @staticmethod
+    def _open(path: str) -> tuple[ImageCompressionType, PILImage.Image | None]:
+        """
+        Gets the compression type of an image without decoding it.
+
+        JPEGs are detected from their leading bytes, so they are only decoded once, by jpegio. Other images are opened
+        lazily with PIL, which only reads their header.
+        :param path: Path of the image.
+        :return: Compression type of the image, and the image opened with PIL, or None for JPEGs.
+        """
+        if is_jpeg(path):
+            return ImageCompressionType.LOSSY, None
+        image = PILImage.open(path)
+        return compression_type(image), image
+
+    @staticmethod
+    def _decode(
+        path: str,
+        comp_type: ImageCompressionType,
+        image: PILImage.Image | None,
+        strategy: BaseLSBSteganography = None,
+    ) -> tuple[Image, np.ndarray | list[np.ndarray]]:
+        """
+        Decodes an image once, into a carrier that can be embedded in place.
+        :param path: Path of the image.
+        :param comp_type: Compression type of the image.
+        :param image: Image opened with PIL, or None for JPEGs.
+        :param strategy: Strategy that prepares the carrier for its operations, so it is scanned once across them.
+        :return: Decoded image, which owns the memory of the carrier, and the carrier.
+        """
+        if comp_type == ImageCompressionType.LOSSY:
+            decoded = JPEGImage(jio.read(str(path)))
+            carrier = decoded.coef_arrays
+        else:
+            decoded = LosslessImage.open(image)
+            carrier = decoded.pixels
+        return decoded, carrier if strategy is None else strategy.prepare(carrier)
+
+    @staticmethod
+    def _strategy(
+        comp_type: ImageCompressionType, image: PILImage.Image | None, password: bytes
+    ) -> EncryptionDecorator:
+        """
+        Builds the strategy used to embed in, or extract from, an image.
+        :param comp_type: Compression type of the image.
+        :param image: Image opened with PIL, or None for JPEGs.
+        :param password: Password used to encrypt the payload.
+        :return: Strategy encrypting the payload.
+        """
+        return (
+            SteganographyStrategyBuilder(comp_type, image).encryption(password).build()
+        )
+
+    def open_image(self, path: str, password: bytes = None) -> OpenedImage:
+        """
+        Opens an image for a steganography operation, reading only its header. The first stage of every operation.
+        :param path: Path of the image.
+        :param password: Password used to encrypt or decrypt the payload. No key is derived yet. Only optional for
+        operations that derive no key, such as probing.
+        :return: Opened image, with the strategy used to embed in, or extract from, it.
+        """
+        comp_type, image = self._open(path)
+        return OpenedImage(
+            str(path),
+            comp_type,
+            image,
+            self._strategy(comp_type, image, password),
+            LosslessImage.size(image) if image is not None else None,
+        )
+
+    def decode(
+        self, opened: OpenedImage
+    ) -> tuple[Image, np.ndarray | EligibleCoefficients]:
+        """
+        Decodes an opened image once, into a carrier prepared for the operations of its strategy.
+        :param opened: Opened image.
+        :return: Decoded image, which owns the memory of the carrier, and the carrier.
+        """
+        return self._decode(
+            opened.path, opened.compression_type, opened.image, opened.strategy
+        )
+
+    @staticmethod
+    def validate(
+        opened: OpenedImage,
+        size: int,
+        carrier: np.ndarray | EligibleCoefficients = None,
+    ) -> None:
+        """
+        Validates that a payload fits in an image once sealed, before a key is derived.
+        :param opened: Opened image.
+        :param size: Size of the sealed payload in bytes, such as PendingPayload.size.
+        :param carrier: Carrier returned by decode. Only needed if the image does not validate from its header.
+        """
+        if opened.validates_from_header:
+            opened.strategy.validate_sealed_elements(opened.elements, size)
+        else:
+            opened.strategy.validate_sealed(carrier, size)
+
+    @staticmethod
+    def fits(opened: OpenedImage, size: int) -> bool:
+        """
+        Checks whether a sealed payload fits in an image from its header, without decoding it.
+        :param opened: Opened image.
+        :param size: Size of the sealed payload in bytes, such as an upper bound given by sealed_bound.
+        :return: True if the payload is known to fit, False if it does not fit or the image must be decoded first.
+        """
+        if not opened.validates_from_header:
+            return False
+        try:
+            opened.strategy.validate_sealed_elements(opened.elements, size)
+        except InsufficientCapacityException:
+            return False
+        return True
+
+    @staticmethod
+    def embed_payload(
+        opened: OpenedImage,
+        carrier: np.ndarray | EligibleCoefficients,
+        payload: PendingPayload,
+        key: tuple[bytes, bytes],
+    ) -> None:
+        """
+        Seals a payload with a key, then embeds it in the carrier of an image in place.
+        :param opened: Opened image.
+        :param carrier: Carrier returned by decode.
+        :param payload: Payload waiting for a key.
+        :param key: Salt and key returned by the new_key method of the strategy of the image.
+        """
+        opened.strategy.embed_sealed(carrier, payload.seal(opened.strategy, key))
+
+    def _embed(
+        self,
+        cover_image: str,
+        password: bytes,
+        compress: Callable[[], PendingPayload],
+        bound: int = None,
+    ) -> Image:
+        """
+        Runs the stages of embedding a payload into an image.
+
+        The cover image is decoded on another thread while the payload is compressed. If an upper bound of the sealed
+        payload fits the image header, the key is derived on a third thread at the same time, otherwise once the
+        sealed payload is known to fit.
+        :param cover_image: Cover image used as the carrier of the payload.
+        :param password: Password used to encrypt the payload. A key is derived from the password.
+        :param compress: Function that compresses the payload.
+        :param bound: Upper bound of the size of the sealed payload, as given by sealed_bound. Defaults to unknown.
+        :return: Image with the embedded payload.
+        """
+        opened = self.open_image(cover_image, password)
+        with ThreadPoolExecutor(2) as executor:
+            decoding = executor.submit(self.decode, opened)
+            key = None
+            if bound is not None and self.fits(opened, bound):
+                key = executor.submit(opened.strategy.new_key)  # while compressing
+            payload = compress()
+            carrier = None if opened.validates_from_header else decoding.result()[1]
+            self.validate(opened, payload.size, carrier)  # before deriving a key
+
+            key = key or executor.submit(opened.strategy.new_key)
+            decoded, carrier = decoding.result()
+            self.embed_payload(opened, carrier, payload, key.result())
+        return decoded  # embedded in place, and saved as is
+
     def embed(
         self, cover_image: str, payload: bytes | Iterable[str], password: bytes
     ) -> Image:
         """
         Embeds a payload into an image.
 
-        Compresses and encrypts the payload before embedding it.
+        Compresses and encrypts the payload before embedding it. The cover image is decoded on another thread while
+        the payload is compressed. For lossless images, whose capacity is read from the header, the key is derived
+        while the payload is compressed if a bound of its compressed size fits. Otherwise the key is derived once the
+        encrypted payload is known to fit, still overlapping the decoding of lossless images.
         :param cover_image: Cover image used as the carrier of the payload.
         :param payload: Payload to embed inside the cover image. Should be bytes or a list of file paths.
         :param password: Password used to encrypt the payload. A key is derived from the password.
         :return: Image with the embedded payload.
         """
-        image = PILImage.open(cover_image)
-        comp_type = compression_type(image)
-        strategy = (
-            SteganographyStrategyBuilder(comp_type, image).encryption(password).build()
+        return self._embed(
+            cover_image,
+            password,
+            lambda: self.compress(payload),
+            self.sealed_bound(payload),
         )
-        compressed = self._compress_payload(payload)
-        if comp_type == ImageCompressionType.LOSSY:
-            image = jio.read(str(cover_image))
-            strategy.embed(image.coef_arrays[0], compressed)
-            return JPEGImage(image)
-        img_arr = np.array(image)
-        strategy.embed(img_arr, compressed)
-        return PILImage.fromarray(img_arr)
+
+    def embed_indexed(
+        self,
+        cover_image: str,
+        files: str | Iterable[str],
+        password: bytes,
+        toc_reserve: int = container.TOC_RESERVE,
+    ) -> Image:
+        """
+        Embeds files into an image as an indexed container, so they can be listed, and extracted one at a time.
+
+        Each file is compressed and split into chunks, which are encrypted independently, behind an encrypted table of
+        contents. As in embed, the cover image is decoded while the files are compressed, and the key is derived once
+        the container is known to fit.
+        :param cover_image: Cover image used as the carrier of the files.
+        :param files: Path of a file, or paths of many files. Repeated names are numbered.
+        :param password: Password used to encrypt the container. A key is derived from the password.
+        :param toc_reserve: Bytes reserved beyond the table of contents, which bound the updates of the container.
+        Each entry takes 50 to 100 bytes, so the default of 1 KiB holds about 10 to 20 added files.
+        :return: Image with the embedded container.
+        """
+        return self._embed(
+            cover_image, password, lambda: self.compress_indexed(files, toc_reserve)
+        )
+
+    def _open_container(self, stego_image: str, password: bytes) -> IndexedContainer:
+        """
+        Opens the indexed container of an image, decrypting only its table of contents.
+        :param stego_image: Stego image that contains an indexed container.
+        :param password: Password used to decrypt the container.
+        :return: Opened container.
+        """
+        opened = self.open_image(stego_image, password)
+        decoded, carrier = self.decode(opened)
+        embedded = self.open_payload(opened, carrier)
+        return IndexedContainer.open(
+            embedded.reader, opened.strategy.new_key, decoded, embedded.prefix
+        )
+
+    def update_indexed(
+        self, stego_image: str, files: str | Iterable[str], password: bytes
+    ) -> Image:
+        """
+        Adds files to the indexed container of an image in place, replacing files of the same name.
+
+        Only the chunks of the new files are encrypted and written, into the embedding positions after the end of the
+        payload, and the header and table of contents are rewritten in place, so the cost is proportional to the
+        change rather than to the container. The files are compressed while the image is decoded and the key derived.
+        The chunks of replaced files are never reclaimed, and the table of contents can not outgrow the reserve chosen
+        when the container was embedded, after which an InvalidContainerException is raised and the container must be
+        embedded again.
+        :param stego_image: Stego image that contains an indexed container.
+        :param files: Path of a file, or paths of many files. Repeated names are numbered.
+        :param password: Password used to decrypt the container.
+        :return: Image with the updated container.
+        """
+        opened = self.open_image(stego_image, password)
+        strategy = opened.strategy
+        with ThreadPoolExecutor(1) as executor:
+            compressing = executor.submit(container.compress_members, files)
+            decoded, carrier = self.decode(opened)
+            indexed = IndexedContainer.open(strategy.reader(carrier), strategy.new_key)
+            members = compressing.result()
+        indexed.update(
+            members, lambda start, data: strategy.write(carrier, start, data)
+        )
+        return decoded
+
+    def list_members(self, stego_image: str, password: bytes) -> list[ContainerMember]:
+        """
+        Lists the files of an indexed container, without reading any of them.
+        :param stego_image: Stego image that contains an indexed container.
+        :param password: Password used to decrypt the table of contents.
+        :return: Entry of each file, in the order they were added.
+        """
+        return self._open_container(stego_image, password).members
+
+    def extract_member(
+        self, stego_image: str, password: bytes, name: str
+    ) -> ExtractedItem:
+        """
+        Extracts one file of an indexed container, gathering only the ranges of the payload that hold it.
+        :param stego_image: Stego image that contains an indexed container.
+        :param password: Password used to decrypt the container.
+        :param name: Name of the file, as listed by list_members.
+        :return: Extracted file.
+        """
+        opened = self._open_container(stego_image, password)
+        member = opened.member(name)
+        self._limits.check(member.size, member.stored_size)
+        return ExtractedItem(opened.read(name), is_file=True, name=name)
+
+    def _validate_cover(self, cover_image: str, password: bytes, size: int) -> None:
+        """
+        Validates that a sealed payload fits in a cover image. Lossless capacity is read from the image header; JPEGs
+        are decoded to count their eligible coefficients.
+        :param cover_image: Cover image used as the carrier of the payload.
+        :param password: Password used to encrypt the payload.
+        :param size: Size of the sealed payload in bytes.
+        """
+        opened = self.open_image(cover_image, password)
+        try:
+            carrier = None if opened.validates_from_header else self.decode(opened)[1]
+            self.validate(opened, size, carrier)
+        finally:
+            opened.close()
+
+    @staticmethod
+    def _output_paths(cover_images: list[str], output: str | Path) -> list[Path]:
+        """
+        Gets the paths to save stego images to, named after their cover images.
+        :param cover_images: Cover images used as the carriers of the payload.
+        :param output: Directory to save the stego images in. Repeated names are numbered.
+        :return: Path of each stego image.
+        """
+        used = set()
+        outputs = [
+            Path(output, unique_name(Path(cover_image).name, used))
+            for cover_image in cover_images
+        ]
+        for cover_image, path in zip(cover_images, outputs):
+            if path.resolve() == Path(cover_image).resolve():
+                raise ValueError(f"stego image would overwrite cover image {path}")
+        return outputs
+
+    def embed_broadcast(
+        self,
+        cover_images: Iterable[str],
+        payload: bytes | Iterable[str],
+        password: bytes,
+        output: str | Path,
+        workers: int = None,
+    ) -> list[Path]:
+        """
+        Embeds the same payload into many images, saving each to a directory under its own name.
+
+        The payload is compressed once and a single key is derived, so the cost is one key derivation plus one embed
+        per image. Each image is encrypted with its own random IV under the shared key and salt, so no two images
+        carry the same ciphertext. Every cover image is validated before the key is derived. Images are validated,
+        then embedded, on a thread pool, as the embedding kernels release the GIL.
+        :param cover_images: Cover images used as the carriers of the payload.
+        :param payload: Payload to embed inside every cover image. Should be bytes or a list of file paths.
+        :param password: Password used to encrypt the payload. A key is derived from the password once.
+        :param output: Directory to save the stego images in. Repeated names are numbered.
+        :param workers: Number of threads used to process images. Defaults to the number of CPUs.
+        :return: Paths of the stego images, in the order of the cover images.
+        """
+        cover_images = [str(cover_image) for cover_image in cover_images]
+        outputs = self._output_paths(cover_images, output)
+        if not cover_images:
+            return []
+        pending = self.compress(payload)
+        with ThreadPoolExecutor(workers) as executor:
+            list(
+                executor.map(
+                    lambda cover_image: self._validate_cover(
+                        cover_image, password, pending.size
+                    ),
+                    cover_images,
+                )
+            )
+            opened = self.open_image(cover_images[0], password)
+            opened.close()
+            key = opened.strategy.new_key()  # the same password derives the same key
+
+            def embed(cover_image: str, path: Path) -> None:
+                opened = self.open_image(cover_image, password)
+                decoded, carrier = self.decode(opened)
+                self.embed_payload(opened, carrier, pending, key)
+                decoded.save(path)
+
+            list(executor.map(embed, cover_images, outputs))
+        return outputs
+
+    def embed_sharded(
+        self,
+        cover_images: Iterable[str],
+        payload: bytes | Iterable[str],
+        password: bytes,
+        output: str | Path,
+        workers: int = None,
+    ) -> list[Path]:
+        """
+        Embeds a payload too large for one image by splitting it into shards across many images, saving each to a
+        directory under its own name.
+
+        Shards are sized in proportion to the capacity of each image, which is planned from the image header. JPEGs
+        are decoded once to plan their capacity, and decoded again when embedding. Images too small to hold a shard
+        header are skipped, and not saved. Each shard records its index and the number of shards, so the images can
+        be extracted in any order. A single key is derived, and the shards are embedded on a thread pool, as the
+        embedding kernels release the GIL.
+        :param cover_images: Cover images used as the carriers of the payload, in order.
+        :param payload: Payload to split across the cover images. Should be bytes or a list of file paths.
+        :param password: Password used to encrypt the shards. A key is derived from the password once.
+        :param output: Directory to save the stego images in. Repeated names are numbered.
+        :param workers: Number of threads used to process images. Defaults to the number of CPUs.
+        :return: Paths of the saved stego images, in the order of the cover images.
+        """
+        cover_images = [str(cover_image) for cover_image in cover_images]
+        if not cover_images:
+            raise ValueError("at least one cover image is required")
+        outputs = self._output_paths(cover_images, output)
+        with ThreadPoolExecutor(workers) as executor:
+            plans = list(executor.map(plan, cover_images))
+            compressed = self._compress_payload(payload)
+            # images without room beyond the shard header carry no shard
+            kept = [
+                i for i, p in enumerate(plans) if p.capacity > ShardHeader.SIZE_BYTES
+            ]
+            cover_images = [cover_images[i] for i in kept]
+            outputs = [outputs[i] for i in kept]
+            capacities = [plans[i].capacity - ShardHeader.SIZE_BYTES for i in kept]
+            capacity = sum(capacities)
+            if capacity < len(compressed):  # before deriving a key
+                raise InsufficientCapacityException(len(compressed), capacity)
+            shards = split(compressed, split_sizes(len(compressed), capacities))
+            opened = self.open_image(cover_images[0], password)
+            opened.close()
+            key = opened.strategy.new_key()
+
+            def embed(cover_image: str, shard: bytes, path: Path) -> None:
+                opened = self.open_image(cover_image, password)
+                decoded, carrier = self.decode(opened)
+                self.embed_payload(opened, carrier, self._pending(shard), key)
+                decoded.save(path)
+
+            list(executor.map(embed, cover_images, shards, outputs))
+        return outputs
+
+    def extract_sharded(
+        self, stego_images: Iterable[str], password: bytes, workers: int = None
+    ) -> Generator[ExtractedItem, None, None]:
+        """
+        Extracts a payload split into shards across many images, given in any order.
+
+        Images are extracted on a thread pool. A key is derived once per distinct salt, so images embedded together
+        share a single key derivation.
+        :param stego_images: Every stego image holding a shard of the payload.
+        :param password: Password used to decrypt the shards.
+        :param workers: Number of threads used to process images. Defaults to the number of CPUs.
+        :return: Yields extracted items which can be files or bytes.
+        """
+        keys: dict[bytes, Future] = {}
+        lock = threading.Lock()
+
+        def derive(strategy: EncryptionDecorator, salt: bytes) -> tuple[bytes, bytes]:
+            with lock:
+                future, owner = keys.get(salt), salt not in keys
+                if owner:
+                    future = keys[salt] = Future()
+            if owner:  # other threads with the same salt wait for this key
+                try:
+                    future.set_result(strategy.new_key(salt))
+                except Exception as e:
+                    future.set_exception(e)
+            return future.result()
+
+        def extract(stego_image: str) -> bytes:
+            opened = self.open_image(stego_image, password)
+            decoded, carrier = self.decode(opened)
+            embedded = self.open_payload(opened, carrier)
+            key = derive(opened.strategy, embedded.salt)
+            return opened.strategy.decrypt(embedded.reader, key)
+
+        with ThreadPoolExecutor(workers) as executor:
+            shards = list(executor.map(extract, map(str, stego_images)))
+        yield from self.items(join(shards))
 
     def extract(
         self, stego_image: str, password: bytes
@@ -82,19 +644,159 @@ class LSBSteganographyService:
         Extracts a payload from an image.
 
         :param stego_image: Stego image that contains a hidden payload.
-        :param password: Password used to decrypt the payload. A key is derived from the password.
+        :param password: Password used to decrypt the payload. A key is derived from the password, as soon as its salt
+        is extracted.
         :return: Yields extracted items which can be files or bytes.
         """
-        image = PILImage.open(stego_image)
-        comp_type = compression_type(image)
-        strategy = (
-            SteganographyStrategyBuilder(comp_type, image).encryption(password).build()
-        )
-        if comp_type == ImageCompressionType.LOSSY:
-            image = jio.read(str(stego_image)).coef_arrays[0]
-        extracted = strategy.extract(np.array(image))
-        if zipfile.is_zipfile(io.BytesIO(extracted)):
+        yield from self.items(self._extract_payload(stego_image, password))
+
+    def open_payload(
+        self, opened: OpenedImage, carrier: np.ndarray | EligibleCoefficients
+    ) -> EmbeddedPayload:
+        """
+        Opens the payload of a decoded image for reading, reading its seed and header once, and its salt and leading
+        bytes. A stage of extract.
+        :param opened: Opened image.
+        :param carrier: Carrier returned by decode. Must outlive the payload.
+        :return: Embedded payload.
+        """
+        reader = opened.strategy.reader(carrier)
+        return EmbeddedPayload(reader, reader.read(0, container.PREFIX_BYTES))
+
+    def read_payload(self, embedded: EmbeddedPayload) -> EmbeddedPayload:
+        """
+        Reads the rest of an embedded payload from its carrier, so it can be unsealed without gathering it, e.g. while
+        a key is derived from its salt. A stage of extract.
+
+        Indexed containers are returned unchanged, as they read each token when it is opened.
+        :param embedded: Payload returned by open_payload.
+        :return: Embedded payload read into memory.
+        """
+        if container.is_container(embedded.prefix):
+            return embedded
+        salt = embedded.salt
+        ciphertext = embedded.reader.read(len(salt), embedded.reader.size)
+
+        def read(start: int, stop: int) -> bytes:
+            if start >= len(salt):  # the whole ciphertext is returned without a copy
+                return ciphertext[start - len(salt) : stop - len(salt)]
+            return (salt + ciphertext[: stop - len(salt)])[start:stop]
+
+        reader = PayloadReader(embedded.reader.size, read)
+        return EmbeddedPayload(reader, embedded.prefix)
+
+    def unseal(
+        self,
+        opened: OpenedImage,
+        embedded: EmbeddedPayload,
+        key: tuple[bytes, bytes] = None,
+        image: Image = None,
+    ) -> bytes | IndexedContainer:
+        """
+        Decrypts an embedded payload, without decompressing it. A stage of extract.
+        :param opened: Opened image.
+        :param embedded: Payload returned by open_payload.
+        :param key: Salt and key derived from the salt of the payload. Defaults to deriving a key, while the rest of
+        the payload is read.
+        :param image: Decoded image that owns the memory of the carrier, kept alive by an indexed container.
+        :return: Compressed payload, or the opened container if the image holds an indexed container.
+        """
+        strategy = opened.strategy
+        if not container.is_container(embedded.prefix):
+            return self._check_payload(strategy.decrypt(embedded.reader, key))
+
+        def new_key(salt: bytes) -> tuple[bytes, bytes]:
+            return key if key is not None and key[0] == salt else strategy.new_key(salt)
+
+        return IndexedContainer.open(embedded.reader, new_key, image, embedded.prefix)
+
+    def items(
+        self, extracted: bytes | IndexedContainer
+    ) -> Generator[ExtractedItem, None, None]:
+        """
+        Decompresses an extracted payload. The last stage of extract.
+        :param extracted: Compressed payload, or opened container, returned by unseal.
+        :return: Yields extracted items which can be files or bytes.
+        """
+        if isinstance(extracted, IndexedContainer):
+            for member in extracted.members:
+                content = extracted.read(member.name)
+                yield ExtractedItem(content, is_file=True, name=member.name)
+        elif zipfile.is_zipfile(io.BytesIO(extracted)):
             for name, content in self._file_compressor.decompress(extracted):
                 yield ExtractedItem(content, is_file=True, name=name)
         else:
             yield ExtractedItem(lzma.decompress(extracted), is_file=False)
+
+    def _extract_payload(
+        self, stego_image: str, password: bytes
+    ) -> bytes | IndexedContainer:
+        """
+        Extracts and decrypts a payload from an image, without decompressing it.
+        :param stego_image: Stego image that contains a hidden payload.
+        :param password: Password used to decrypt the payload.
+        :return: Compressed payload, or the opened container if the image holds an indexed container.
+        """
+        opened = self.open_image(stego_image, password)
+        decoded, carrier = self.decode(opened)
+        return self.unseal(opened, self.open_payload(opened, carrier), image=decoded)
+
+    @staticmethod
+    def _check_payload(extracted: bytes) -> bytes:
+        """
+        Checks that an extracted payload is whole, rather than one shard of a payload.
+        :param extracted: Compressed payload.
+        :return: Compressed payload.
+        """
+        if ShardHeader.is_shard(extracted):
+            header = ShardHeader.from_bytes(extracted)
+            raise InvalidShardException(
+                f"image holds shard {header.index + 1} of {header.count}, extract every shard together"
+            )
+        return extracted
+
+    def extract_to(
+        self,
+        stego_image: str,
+        password: bytes,
+        directory: str | Path,
+        raw: bool = False,
+        workers: int = None,
+        overwrite: bool = False,
+    ) -> list[Path]:
+        """
+        Extracts a payload from an image straight to a directory.
+
+        Files are streamed to the directory in bounded chunks, on a thread pool, and never held in memory whole. A
+        message is written to a text file named after the image, and the members of an indexed container are written
+        one chunk at a time. Decompressed sizes are checked against the limits of the service.
+        :param stego_image: Stego image that contains a hidden payload.
+        :param password: Password used to decrypt the payload.
+        :param directory: Directory to write the extracted files to.
+        :param raw: Whether to write the decrypted payload without decompressing it, as a .zip archive of files or a
+        .xz message. Not supported for indexed containers, whose members are encrypted independently.
+        :param workers: Number of threads used to write files. Defaults to the number of CPUs.
+        :param overwrite: Whether to overwrite existing files.
+        :return: Paths of the written files.
+        """
+        extracted = self._extract_payload(stego_image, password)
+        if isinstance(extracted, IndexedContainer):
+            if raw:
+                raise ValueError("indexed containers can not be extracted raw")
+            return extracted.extract_to(directory, self._limits, workers, overwrite)
+        is_archive = zipfile.is_zipfile(io.BytesIO(extracted))
+        stem = Path(stego_image).stem
+        if raw:
+            path = Path(directory, stem + (".zip" if is_archive else ".xz"))
+            with open(path, "wb" if overwrite else "xb") as file:
+                file.write(extracted)
+            return [path]
+        if is_archive:
+            return self._file_compressor.decompress_to(
+                extracted, directory, self._limits, workers, overwrite
+            )
+        path = Path(directory, stem + ".txt")
+        with lzma.LZMAFile(io.BytesIO(extracted)) as message:
+            counter = SizeCounter(self._limits, len(extracted))
+            copy_limited(message, path, counter, overwrite=overwrite)
+        return [path]
@@ -0,0 +1,122 @@
+"""This module provides the header used to split a payload into shards across multiple images.
+
+Each image carries one shard, prefixed with a header recording the set it belongs to, its index and the number of
+shards in the set. The header is encrypted along with the shard, so it is not visible in the image.
+"""
+
+import itertools
+import os
+import struct
+from dataclasses import dataclass
+from typing import Iterable
+
+from stegos.core.exception import InvalidShardException
+
+
+@dataclass(frozen=True)
+class ShardHeader:
+    """Header identifying a shard of a payload."""
+
+    MAGIC = b"STGSHARD"
+    FORMAT = ">8s8sII"  # magic, set id, index, count
+    SIZE_BYTES = struct.calcsize(FORMAT)
+    SET_ID_BYTES = 8
+
+    index: int
+    count: int
+    set_id: bytes  # shared by the shards of a payload
+
+    def to_bytes(self) -> bytes:
+        """
+        Converts the header to bytes.
+        :return: Header as bytes.
+        """
+        return struct.pack(self.FORMAT, self.MAGIC, self.set_id, self.index, self.count)
+
+    @classmethod
+    def is_shard(cls, payload: bytes) -> bool:
+        """
+        Checks whether a payload is a shard.
+        :param payload: Decrypted payload.
+        :return: True if the payload starts with a shard header, otherwise False.
+        """
+        return payload[: len(cls.MAGIC)] == cls.MAGIC
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "ShardHeader":
+        """
+        Reads the header of a shard.
+        :param payload: Decrypted payload.
+        :return: Header of the shard.
+        """
+        if len(payload) < cls.SIZE_BYTES or not cls.is_shard(payload):
+            raise InvalidShardException("payload is not a shard")
+        _, set_id, index, count = struct.unpack_from(cls.FORMAT, payload)
+        if not index < count:
+            raise InvalidShardException(f"invalid shard {index} of {count}")
+        return cls(index, count, set_id)
+
+
+def split_sizes(payload_size: int, capacities: list[int]) -> list[int]:
+    """
+    Splits a payload into shards in proportion to the capacity of each image, so each image embeds at a similar
+    density.
+    :param payload_size: Size of the payload in bytes.
+    :param capacities: Capacity of each image for shard data in bytes.
+    :return: Size of the shard of each image in bytes.
+    """
+    capacities = [max(capacity, 0) for capacity in capacities]
+    total = sum(capacities)
+    if total == 0:
+        return [payload_size] + [0] * (len(capacities) - 1)  # left to fail validation
+    bounds = [0] + [
+        -(-payload_size * end // total) for end in itertools.accumulate(capacities)
+    ]
+    return [stop - start for start, stop in itertools.pairwise(bounds)]
+
+
+def split(payload: bytes, sizes: list[int]) -> list[bytes]:
+    """
+    Splits a payload into shards, each prefixed with its header.
+    :param payload: Payload to split.
+    :param sizes: Size of each shard in bytes, as given by split_sizes.
+    :return: Shards, in order.
+    """
+    set_id = os.urandom(ShardHeader.SET_ID_BYTES)
+    starts = itertools.accumulate(sizes, initial=0)
+    return [
+        ShardHeader(index, len(sizes), set_id).to_bytes()
+        + payload[start : start + size]
+        for index, (start, size) in enumerate(zip(starts, sizes))
+    ]
+
+
+def join(shards: Iterable[bytes]) -> bytes:
+    """
+    Reassembles a payload from its shards, given in any order.
+    :param shards: Every shard of the payload, each prefixed with its header.
+    :return: Reassembled payload.
+    """
+    headers = {}
+    for shard in shards:
+        header = ShardHeader.from_bytes(shard)
+        if header.index in headers:
+            raise InvalidShardException(f"shard {header.index} given more than once")
+        headers[header.index] = (header, shard)
+    if not headers:
+        raise InvalidShardException("no shards given")
+
+    first, _ = next(iter(headers.values()))
+    if any(
+        (header.set_id, header.count) != (first.set_id, first.count)
+        for header, _ in headers.values()
+    ):
+        raise InvalidShardException("shards belong to different payloads")
+    missing = sorted(set(range(first.count)) - set(headers))
+    if missing:
+        raise InvalidShardException(
+            f"missing {len(missing)} of {first.count} shards {missing}"
+        )
+    return b"".join(
+        headers[index][1][ShardHeader.SIZE_BYTES :] for index in range(first.count)
+    )
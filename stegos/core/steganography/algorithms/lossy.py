@@ -1,20 +1,440 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Sequence
+
 import numpy as np
 
 from stegos.core.steganography import bitops
 from stegos.core.steganography.algorithms.lsb import LSBSteganography
+from stegos.core.steganography.base import PayloadReader
+from stegos.core.steganography.engine import EngineMode
+from stegos.core.steganography.exception import (
+    InvalidCoverImageException,
+    UnsupportedOperationException,
+)
+from stegos.core.steganography.permutation import IndexMode, index_dtype
+
+
+class EligibleCoefficients:
+    """Flattened coefficients of each component of an image, with the positions of the coefficients eligible for
+    embedding at a depth, each found the first time it is needed and kept.
+
+    Returned by the prepare method of lossy strategies, and accepted by their operations in place of the coefficients,
+    so validating, then embedding in, an image scans each component once. Embedding only writes to the bits up to the
+    depth, so eligible coefficients stay eligible, and the positions stay valid.
+    """
+
+    def __init__(
+        self,
+        coefs: list[np.ndarray],
+        find_positions: Callable[[np.ndarray], np.ndarray],
+        lsb_depth: int,
+    ):
+        """
+        Creates an instance of the EligibleCoefficients class.
+        :param coefs: Flattened coefficients of each component.
+        :param find_positions: Function that finds the positions of the eligible coefficients of a component.
+        :param lsb_depth: Depth the positions are eligible at.
+        """
+        self._coefs = coefs
+        self._find_positions = find_positions
+        self._positions: list[np.ndarray | None] = [None] * len(coefs)
+        self._lsb_depth = lsb_depth
+
+    @property
+    def coefs(self) -> list[np.ndarray]:
+        """
+        Gets the flattened coefficients of each component.
+        :return: List of NumPy arrays of coefficients, which share the memory of the image.
+        """
+        return self._coefs
+
+    @property
+    def lsb_depth(self) -> int:
+        """
+        Gets the depth the positions are eligible at.
+        :return: LSB depth value.
+        """
+        return self._lsb_depth
+
+    def positions(self, component: int) -> np.ndarray:
+        """
+        Gets the positions of the eligible coefficients of a component, finding them if they are not known yet.
+        :param component: Index of the component.
+        :return: NumPy array of positions.
+        """
+        if self._positions[component] is None:
+            self._positions[component] = self._find_positions(self._coefs[component])
+        return self._positions[component]
 
 
 class LossyLSBSteganography(LSBSteganography):
-    """Lossy LSB steganography algorithm that embeds in the non-zero coefficients of an image."""
+    """Lossy LSB steganography algorithm that embeds in the non-zero coefficients of an image.
+
+    The depth is fixed, as the coefficients eligible for embedding depend on it, and must be known before the header
+    can be read.
+
+    Eligible coefficients are embedded in place, through an array of their positions, so only the coefficients that
+    change are written to.
+    """
+
+    VARIABLE_DEPTH = False
+    CHUNK_SIZE = 2**20
+
+    def _eligible(self, coefs: np.ndarray) -> np.ndarray:
+        """
+        Finds the coefficients eligible for embedding, which have bits set above the LSB depth.
+        :param coefs: NumPy array of coefficients.
+        :return: NumPy array of booleans, True where a coefficient is eligible.
+        """
+        return bitops.has_msbs_set(coefs, self.lsb_depth)
+
+    def _eligible_counts(self, coefs: np.ndarray) -> list[int]:
+        """
+        Counts the coefficients eligible for embedding in each chunk.
+        :param coefs: Flattened coefficients of the image.
+        :return: Number of eligible coefficients per chunk.
+        """
+        return [
+            np.count_nonzero(self._eligible(coefs[start : start + self.CHUNK_SIZE]))
+            for start in range(0, coefs.size, self.CHUNK_SIZE)
+        ]
+
+    def eligible_count(self, coefs: np.ndarray) -> int:
+        """
+        Counts the coefficients eligible for embedding, without finding their positions.
+        :param coefs: Coefficients of the image.
+        :return: Number of eligible coefficients.
+        """
+        return sum(self._eligible_counts(coefs.ravel()))
+
+    def _eligible_positions(self, coefs: np.ndarray) -> np.ndarray:
+        """
+        Gets the positions of the coefficients eligible for embedding.
+
+        Positions are counted, then found, in chunks, so no full-size mask or 64-bit index array is created.
+        :param coefs: Flattened coefficients of the image.
+        :return: NumPy array of positions, in the narrowest data type that can hold every position.
+        """
+        starts = range(0, coefs.size, self.CHUNK_SIZE)
+        counts = self._eligible_counts(coefs)
+        positions = np.empty(sum(counts), dtype=index_dtype(coefs.size))
+        end = 0
+        for start, count in zip(starts, counts):
+            chunk = positions[end : end + count]
+            chunk[:] = np.flatnonzero(
+                self._eligible(coefs[start : start + self.CHUNK_SIZE])
+            )
+            chunk += start
+            end += count
+        return positions
+
+    def _carrier(self, cover_image) -> EligibleCoefficients:
+        """
+        Gets the coefficients of an image with the positions of those eligible for embedding.
+        :param cover_image: Coefficients of the image, or coefficients returned by prepare.
+        :return: Coefficients returned by prepare, if they are eligible at the depth of the algorithm, otherwise
+        coefficients whose positions are not found yet.
+        """
+        if isinstance(cover_image, EligibleCoefficients):
+            if cover_image.lsb_depth == self.lsb_depth:
+                return cover_image
+            coefs = cover_image.coefs
+        else:
+            coefs = [cover_image.ravel()]
+        return EligibleCoefficients(coefs, self._eligible_positions, self.lsb_depth)
+
+    def prepare(self, cover_image):
+        """
+        Prepares the coefficients of an image for several operations, so the eligible coefficients are found once.
+        :param cover_image: Coefficients of the image.
+        :return: Coefficients of the image, with the positions of those eligible for embedding.
+        """
+        return self._carrier(cover_image)
+
+    def embed(self, cover_image, payload):
+        carrier = self._carrier(cover_image)
+        self._embed(carrier.coefs[0], payload, carrier.positions(0))
+
+    def extract(self, stego_image):
+        carrier = self._carrier(stego_image)
+        return self._extract(carrier.coefs[0], carrier.positions(0))
+
+    def extract_prefix(self, stego_image, size):
+        carrier = self._carrier(stego_image)
+        return self._extract(carrier.coefs[0], carrier.positions(0), size)
+
+    def probe(self, stego_image, size):
+        carrier = self._carrier(stego_image)
+        return self._probe(carrier.coefs[0], carrier.positions(0), size)
+
+    def reader(self, stego_image):
+        carrier = self._carrier(stego_image)
+        return self._reader(carrier.coefs[0], carrier.positions(0))
+
+    def write(self, stego_image, start, data):
+        """
+        Overwrites a range of the payload of a stego image in place, extending the payload if the range ends after it.
+
+        Coefficients stay eligible, as only the bits up to the depth are written to.
+        """
+        carrier = self._carrier(stego_image)
+        self._write(carrier.coefs[0], start, data, carrier.positions(0))
+
+    def validate(self, cover_image, payload_size):
+        positions = self._carrier(cover_image).positions(0)
+        self._validate_capacity(self._payload_capacity(positions), payload_size)
+
+    @property
+    def validates_elements(self):
+        """
+        Gets whether the strategy supports validate_elements, which it does not, as the eligible coefficients depend
+        on their values, not only on their number.
+        :return: False.
+        """
+        return False
+
+    def validate_elements(self, elements, payload_size):
+        raise UnsupportedOperationException(
+            f"{type(self).__name__} capacity depends on the values of the coefficients"
+        )
+
+
+class ComponentLossyLSBSteganography(LossyLSBSteganography):
+    """Lossy LSB steganography algorithm that embeds across the coefficients of every component of an image.
+
+    The payload is split into contiguous segments in proportion to the capacity of each component, and each segment
+    is embedded in its component with its own seed and header. The header of the first component records which
+    components carry a segment, so extraction can join the segments in order. Components are processed on a thread
+    pool.
+    """
+
+    MAX_COMPONENTS = 8
+
+    def __init__(
+        self,
+        lsb_depth: int = LSBSteganography.SAFE_DEPTH,
+        index_mode: IndexMode = IndexMode.FEISTEL,
+        engine_mode: EngineMode = EngineMode.PLANES,
+        workers: int = 1,
+        backend: str = None,
+        component_workers: int = None,
+    ):
+        """
+        Creates an instance of the ComponentLossyLSBSteganography class.
+        :param lsb_depth: Least significant bit embedding depth of the algorithm.
+        :param index_mode: Method of generating randomised embedding positions.
+        :param engine_mode: Layout of the payload across embedding positions.
+        :param workers: Number of threads used to embed and extract chunks of each segment of the payload.
+        :param backend: Name of the kernel backend. Defaults to the fastest available backend.
+        :param component_workers: Number of threads used to process components. Defaults to one per component.
+        """
+        super().__init__(lsb_depth, index_mode, engine_mode, workers, backend)
+        if component_workers is not None and component_workers < 1:
+            raise ValueError(
+                f"invalid component_workers (expected at least 1, got {component_workers})"
+            )
+        self._component_workers = component_workers
+
+    def _map(self, func: Callable, *iterables: Iterable) -> list:
+        """
+        Applies a function to each component on a thread pool.
+        :param func: Function to apply.
+        :param iterables: Arguments of the function, one item per component.
+        :return: Results, in the order of the components.
+        """
+        iterables = [list(iterable) for iterable in iterables]
+        workers = self._component_workers or len(iterables[0])
+        if workers <= 1 or len(iterables[0]) <= 1:
+            return list(map(func, *iterables))
+        with ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(func, *iterables))  # raises the first exception
+
+    def _flatten(self, cover_image: Sequence[np.ndarray]) -> list[np.ndarray]:
+        """
+        Flattens the coefficients of each component of an image.
+        :param cover_image: Coefficient arrays of the components of the image.
+        :return: Flattened coefficients of each component.
+        """
+        if not 1 <= len(cover_image) <= self.MAX_COMPONENTS:
+            raise InvalidCoverImageException(
+                f"invalid number of components (expected 1 to {self.MAX_COMPONENTS}, got {len(cover_image)})"
+            )
+        return [coefs.ravel() for coefs in cover_image]
+
+    def _carrier(self, cover_image) -> EligibleCoefficients:
+        """
+        Gets the coefficients of each component of an image with the positions of those eligible for embedding.
+        :param cover_image: Coefficient arrays of the components of the image, or coefficients returned by prepare.
+        :return: Coefficients returned by prepare, if they are eligible at the depth of the algorithm, otherwise
+        coefficients whose positions are not found yet.
+        """
+        if isinstance(cover_image, EligibleCoefficients):
+            return super()._carrier(cover_image)
+        return EligibleCoefficients(
+            self._flatten(cover_image), self._eligible_positions, self.lsb_depth
+        )
+
+    def _all_positions(self, carrier: EligibleCoefficients) -> list[np.ndarray]:
+        """
+        Gets the positions of the eligible coefficients of every component, finding them on the thread pool.
+        :param carrier: Coefficients of the image.
+        :return: NumPy array of positions of each component.
+        """
+        return self._map(carrier.positions, range(len(carrier.coefs)))
+
+    @staticmethod
+    def _segment_sizes(payload_size: int, capacities: list[int]) -> list[int]:
+        """
+        Splits a payload into segments in proportion to the capacity of each component.
+
+        The first component receives a segment whenever it has capacity, so its header can be read.
+        :param payload_size: Size of the payload in bytes.
+        :param capacities: Payload capacity of each component in bytes.
+        :return: Size of the segment of each component in bytes.
+        """
+        capacities = [max(capacity, 0) for capacity in capacities]
+        total = sum(capacities)
+        bounds = [0] + [
+            -(-payload_size * end // total) for end in itertools.accumulate(capacities)
+        ]
+        return [stop - start for start, stop in itertools.pairwise(bounds)]
+
+    @staticmethod
+    def combined_capacity(capacities: list[int]) -> int:
+        """
+        Gets the payload capacity of an image from the payload capacity of each of its components.
+        :param capacities: Payload capacity of each component in bytes.
+        :return: Payload capacity in bytes. Not positive if the first component cannot hold a header.
+        """
+        if capacities[0] <= 0:  # the first component must hold a header
+            return capacities[0]
+        return sum(c for c in capacities if c > 0)
+
+    def _validate_components(self, capacities: list[int], payload_size: int) -> None:
+        """
+        Validates the capacity of the components of an image, to ensure the payload can be embedded.
+        :param capacities: Payload capacity of each component in bytes.
+        :param payload_size: Size of the payload in bytes.
+        """
+        # the first component holds the header
+        self._validate_capacity(capacities[0], 1)
+        self._validate_capacity(self.combined_capacity(capacities), payload_size)
+
+    def validate(self, cover_image, payload_size):
+        positions = self._all_positions(self._carrier(cover_image))
+        self._validate_components(
+            [self._payload_capacity(p) for p in positions], payload_size
+        )
 
     def embed(self, cover_image, payload):
-        coefs: np.ndarray = cover_image.ravel()
-        mask = bitops.has_msbs_set(coefs, self.lsb_depth)
-        masked = coefs[mask]  # copy, must be written back
-        super().embed(masked, payload)
-        coefs[mask] = masked
+        payload_size = len(payload)
+        if payload_size == 0:
+            raise ValueError("payload must not be empty")
+
+        carrier = self._carrier(cover_image)
+        coefs, positions = carrier.coefs, self._all_positions(carrier)
+        capacities = [self._payload_capacity(p) for p in positions]
+        self._validate_components(capacities, payload_size)
+
+        sizes = self._segment_sizes(payload_size, capacities)
+        components = sum(1 << i for i, size in enumerate(sizes) if size)
+        starts = itertools.accumulate(sizes, initial=0)
+        segments = [
+            (i, memoryview(payload)[start : start + size])
+            for i, (start, size) in enumerate(zip(starts, sizes))
+            if size
+        ]
+
+        def embed_segment(i: int, segment: memoryview) -> None:
+            self._embed(coefs[i], segment, positions[i], components if i == 0 else 0)
+
+        self._map(embed_segment, *zip(*segments))
+
+    def _segments(self, carrier: EligibleCoefficients) -> list[int] | None:
+        """
+        Reads which components of a stego image carry a segment of the payload.
+        :param carrier: Coefficients of the image.
+        :return: Indices of the components carrying a segment, in order, or None if the payload is not split.
+        """
+        _, header = self._read_header(carrier.coefs[0], carrier.positions(0))
+        if header is None or not header.components:
+            return None
+
+        indices = [i for i in range(self.MAX_COMPONENTS) if header.components >> i & 1]
+        if indices[-1] >= len(carrier.coefs):
+            raise InvalidCoverImageException(
+                f"payload embedded in {indices[-1] + 1} components, but the image has {len(carrier.coefs)}"
+            )
+        return indices
 
     def extract(self, stego_image):
-        coefs: np.ndarray = stego_image.ravel()
-        mask = bitops.has_msbs_set(coefs, self.lsb_depth)
-        return super().extract(coefs[mask])
+        carrier = self._carrier(stego_image)
+        indices = self._segments(carrier)
+        if indices is None:
+            return self._extract(carrier.coefs[0], carrier.positions(0))
+
+        def extract_segment(i: int) -> bytes:
+            return self._extract(carrier.coefs[i], carrier.positions(i))
+
+        return b"".join(self._map(extract_segment, indices))
+
+    def reader(self, stego_image):
+        """
+        Opens the payload of a stego image for reading ranges of it, reading the header and segment size of every
+        component carrying a segment once. Ranges spanning several segments are read on the component thread pool.
+        """
+        carrier = self._carrier(stego_image)
+        indices = self._segments(carrier)
+        if indices is None:
+            return self._reader(carrier.coefs[0], carrier.positions(0))
+
+        def segment_reader(i: int) -> PayloadReader:
+            return self._reader(carrier.coefs[i], carrier.positions(i))
+
+        return PayloadReader.join(self._map(segment_reader, indices), self._map)
+
+    def write(self, stego_image, start, data):
+        """
+        Overwrites a range of the payload of a stego image in place, extending the payload if the range ends after it.
+
+        The range is written to the segment of each component it overlaps. The payload is extended at the end of the
+        last segment, so it can only grow by the spare capacity of the last component carrying a segment.
+        """
+        carrier = self._carrier(stego_image)
+        coefs = carrier.coefs
+        indices = self._segments(carrier)
+        if indices is None:
+            return self._write(coefs[0], start, data, carrier.positions(0))
+
+        positions = self._map(carrier.positions, indices)
+        sizes = [self._reader(coefs[i], p).size for i, p in zip(indices, positions)]
+        if not 0 <= start <= sum(sizes):
+            raise ValueError(f"invalid start (expected 0 to {sum(sizes)}, got {start})")
+        stop = start + len(data)
+        firsts = itertools.accumulate(sizes, initial=0)
+        for n, (i, first, size) in enumerate(zip(indices, firsts, sizes)):
+            last = first + size if n < len(indices) - 1 else max(first + size, stop)
+            low, high = max(start, first), min(stop, last)
+            if low < high:
+                self._write(
+                    coefs[i],
+                    low - first,
+                    data[low - start : high - start],
+                    positions[n],
+                )
+
+    def probe(self, stego_image, size):
+        """
+        Reads the header, segment size and leading bytes of the first component of a stego image, which holds the
+        start of the payload.
+        """
+        carrier = self._carrier(stego_image)
+        return self._probe(carrier.coefs[0], carrier.positions(0), size)
+
+    def extract_prefix(self, stego_image, size):
+        carrier = self._carrier(stego_image)
+        prefix = self._extract(carrier.coefs[0], carrier.positions(0), size)
+        if len(prefix) < size:  # spans multiple segments
+            return self.extract(carrier)[:size]
+        return prefix
@@ -1,33 +1,125 @@
 import secrets
+import dataclasses
 
 import numpy as np
 
-from stegos.core.steganography import bitops
+from stegos.core.steganography import bitops, kernels
 from stegos.core.steganography.bitops import BITS_PER_BYTE
 from stegos.core.steganography.exception import (
     InsufficientCapacityException,
     InvalidCoverImageException,
 )
-from stegos.core.steganography.base import SeededSteganography
+from stegos.core.steganography.base import (
+    PayloadProbe,
+    PayloadReader,
+    SeededContext,
+    SeededSteganography,
+)
+from stegos.core.steganography.engine import EngineMode, engine
+from stegos.core.steganography.header import Header
+from stegos.core.steganography.permutation import IndexMode
 
 
 class LSBSteganography(SeededSteganography):
     """LSB steganography algorithm that embeds directly in an image's pixels.
 
     This algorithm should only be used for lossless file formats. Otherwise, embedded data may be lost during lossy compression.
+
+    If a maximum depth is given, each payload is embedded at the smallest depth from 1 that fits it, so small payloads
+    only modify the least significant bit plane. The depth is recorded in the header, and read back on extraction. The
+    depth of the algorithm is then only used to read images whose header records no depth.
     """
 
-    PAYLOAD_SIZE_BYTES = 4
+    VARIABLE_DEPTH = (
+        True  # False if the depth must be known before the header can be read
+    )
+    PAYLOAD_SIZE_BYTES = Header.PAYLOAD_SIZE_BYTES[Header.VERSION]
+    ORIGINAL_PAYLOAD_SIZE_BYTES = 4
     SAFE_DEPTH = 2
+    MAX_SAFE_DEPTH = 4
+
+    def __init__(
+        self,
+        lsb_depth: int = SAFE_DEPTH,
+        index_mode: IndexMode = IndexMode.FEISTEL,
+        engine_mode: EngineMode = EngineMode.PLANES,
+        workers: int = 1,
+        backend: str = None,
+        max_lsb_depth: int = None,
+    ):
+        """
+        Creates an instance of the LSBSteganography class.
+        :param lsb_depth: Least significant bit embedding depth of the algorithm. Only used to embed if max_lsb_depth is
+        None, and to extract from images whose header records no depth.
+        :param index_mode: Method of generating randomised embedding positions.
+        :param engine_mode: Layout of the payload across embedding positions.
+        :param workers: Number of threads used to embed and extract chunks of the payload.
+        :param backend: Name of the kernel backend. Defaults to the fastest available backend.
+        :param max_lsb_depth: Maximum depth used when selecting the smallest depth from 1 that fits the payload, whatever
+        lsb_depth is. If None, every payload is embedded at lsb_depth. Not supported if the depth is fixed.
+        """
+        super().__init__(lsb_depth, index_mode)
+        self._engine_mode = EngineMode(engine_mode)
+        if workers < 1:
+            raise ValueError(f"invalid workers (expected at least 1, got {workers})")
+        self._workers = workers
+        self._kernels = kernels.backend(backend)
+        if max_lsb_depth is not None:
+            if not self.VARIABLE_DEPTH:
+                raise ValueError(
+                    f"{type(self).__name__} embeds at a fixed depth, so max_lsb_depth is not supported"
+                )
+            if not (1 <= max_lsb_depth <= 7):
+                raise ValueError(
+                    f"invalid max_lsb_depth (expected 1 to 7, got {max_lsb_depth})"
+                )
+        self._max_lsb_depth = max_lsb_depth
+
+    @property
+    def engine_mode(self) -> EngineMode:
+        """
+        Gets the layout of the payload across embedding positions.
+        :return: Engine mode of the algorithm.
+        """
+        return self._engine_mode
+
+    @property
+    def max_lsb_depth(self) -> int | None:
+        """
+        Gets the maximum depth used when selecting the smallest depth that fits the payload.
+        :return: Maximum LSB depth value, or None if every payload is embedded at lsb_depth.
+        """
+        return self._max_lsb_depth
 
-    def __init__(self, lsb_depth: int = SAFE_DEPTH):
-        super().__init__(lsb_depth)
+    @property
+    def _header_offset(self) -> int:
+        """
+        Gets the number of leading elements reserved for the seed and header.
+        :return: Number of reserved elements.
+        """
+        return (self.SEED_SIZE_BYTES + Header.SIZE_BYTES) * BITS_PER_BYTE
 
-    def _payload_capacity(self, cover_image):
-        capacity = len(cover_image) - (self.PAYLOAD_SIZE_BYTES * BITS_PER_BYTE)
-        capacity -= self.SEED_SIZE_BYTES * BITS_PER_BYTE
-        capacity *= self.lsb_depth
-        return capacity // 8
+    def capacity(self, size: int, lsb_depth: int = None) -> int:
+        """
+        Gets the number of payload bytes that can be embedded in a number of eligible elements.
+        :param size: Number of elements eligible for embedding.
+        :param lsb_depth: Depth to embed at. Defaults to the largest depth the algorithm embeds at.
+        :return: Payload capacity in bytes. Not positive if the elements cannot hold the headers.
+        """
+        if lsb_depth is None:
+            lsb_depth = self.max_lsb_depth or self.lsb_depth
+        capacity = (size - self._header_offset) * lsb_depth
+        capacity -= self.PAYLOAD_SIZE_BYTES * BITS_PER_BYTE
+        return capacity // BITS_PER_BYTE
+
+    def _payload_capacity(self, cover_image, lsb_depth: int = None):
+        """
+        Gets the number of payload bytes that can be embedded in a cover image.
+        :param cover_image: Cover image, or positions of its elements eligible for embedding. Only its size is used.
+        :param lsb_depth: Depth to embed at. Defaults to the largest depth the algorithm embeds at.
+        :return: Payload capacity in bytes.
+        """
+        return self.capacity(cover_image.size, lsb_depth)
 
     def _validate_capacity(self, capacity: int, payload_size: int):
         """
@@ -42,73 +134,385 @@ class LSBSteganography(SeededSteganography):
         elif capacity < payload_size:
             raise InsufficientCapacityException(payload_size, capacity)
 
+    def _select_depth(self, pixels: np.ndarray, payload_size: int) -> int:
+        """
+        Selects the depth to embed a payload at.
+        :param pixels: Flattened cover image.
+        :param payload_size: Size of the payload in bytes.
+        :return: Smallest depth from 1, up to the maximum depth, that fits the payload. lsb_depth if there is no maximum
+        depth.
+        """
+        if self.max_lsb_depth is None:
+            return self.lsb_depth
+        for lsb_depth in range(1, self.max_lsb_depth):
+            if self._payload_capacity(pixels, lsb_depth) >= payload_size:
+                return lsb_depth
+        return self.max_lsb_depth
+
+    @staticmethod
+    def _leading(positions: np.ndarray | None, stop: int) -> slice | np.ndarray:
+        """
+        Gets the leading elements eligible for embedding.
+        :param positions: Positions of the elements eligible for embedding, or None if every element is eligible.
+        :param stop: Number of leading elements.
+        :return: Slice or NumPy array of positions that indexes the leading elements.
+        """
+        return slice(stop) if positions is None else positions[:stop]
+
+    def _create_context(
+        self,
+        pixels: np.ndarray,
+        lsb_depth: int,
+        positions: np.ndarray = None,
+        components: int = 0,
+    ) -> SeededContext:
+        """
+        Creates the context of an embedding, and writes its seed and header to the cover image.
+        :param pixels: Flattened cover image.
+        :param lsb_depth: Depth to embed at.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        :param components: Bit mask of the components carrying a segment of the payload. 0 for a single component.
+        :return: Context with a new seed.
+        """
+        seed = secrets.randbits(self.SEED_SIZE_BYTES * BITS_PER_BYTE)
+        header = Header(
+            self.index_mode, self.engine_mode, lsb_depth, components=components
+        )
+        header_bits = np.concatenate(
+            [
+                bitops.int_to_bits(seed, self.SEED_SIZE_BYTES),
+                bitops.bytes_to_bits(header.to_bytes(seed)),
+            ]
+        )
+        leading = self._leading(positions, len(header_bits))
+        pixels[leading] = bitops.embed_bits(pixels[leading], header_bits, 0)
+        return SeededContext(
+            seed,
+            self._random_indices(
+                seed, pixels, self._header_offset, positions=positions
+            ),
+            engine(self.engine_mode, lsb_depth, self._workers, self._kernels),
+            header.payload_size_bytes,
+        )
+
+    def _read_header(
+        self, pixels: np.ndarray, positions: np.ndarray = None
+    ) -> tuple[int, Header | None]:
+        """
+        Reads the seed and header of a stego image.
+        :param pixels: Flattened stego image.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        :return: Seed, and header or None if the image uses the original format.
+        """
+        seed_size = self.SEED_SIZE_BYTES * BITS_PER_BYTE
+        leading = bitops.get_bit(pixels[self._leading(positions, self._header_offset)])
+        seed = bitops.bits_to_int(leading[:seed_size])
+        return seed, Header.from_bytes(bitops.bits_to_bytes(leading[seed_size:]), seed)
+
+    def _read_context(
+        self, pixels: np.ndarray, positions: np.ndarray = None
+    ) -> SeededContext:
+        """
+        Reads the seed and header of a stego image, and recreates the context of its embedding.
+
+        Images without a header are assumed to use the original format, where every index is shuffled.
+        :param pixels: Flattened stego image.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        :return: Context used to embed the payload.
+        """
+        seed_size = self.SEED_SIZE_BYTES * BITS_PER_BYTE
+        seed, header = self._read_header(pixels, positions)
+        if header is None:
+            return SeededContext(
+                seed,
+                self._random_indices(
+                    seed, pixels, seed_size, IndexMode.SHUFFLE, positions
+                ),
+                engine(EngineMode.PLANES, self.lsb_depth, self._workers, self._kernels),
+                self.ORIGINAL_PAYLOAD_SIZE_BYTES,
+            )
+        return SeededContext(
+            seed,
+            self._random_indices(
+                seed, pixels, self._header_offset, header.index_mode, positions
+            ),
+            engine(
+                header.engine_mode,
+                header.lsb_depth or self.lsb_depth,
+                self._workers,
+                self._kernels,
+            ),
+            header.payload_size_bytes,
+        )
+
+    def _read_size(
+        self, pixels: np.ndarray, context: SeededContext
+    ) -> tuple[bytearray, int]:
+        """
+        Reads the payload size of a stego image, and checks the image can hold a payload of that size.
+        :param pixels: Flattened stego image.
+        :param context: Context used to embed the payload.
+        :return: Encoded payload size, and payload size in bits.
+        :raises InvalidCoverImageException: If the payload size exceeds the capacity of the image, as it does for
+        images that do not hold a payload.
+        """
+        size = bytearray(context.payload_size_bytes)
+        context.engine.extract(pixels, context.permutation, bitops.BitStream(size))
+        payload_bits = int.from_bytes(size, byteorder="big")
+        capacity = context.engine.capacity(len(context.permutation))
+        capacity -= len(size) * BITS_PER_BYTE
+        if payload_bits > capacity:
+            raise InvalidCoverImageException(
+                f"payload of {-(-payload_bits // BITS_PER_BYTE)} bytes exceeds stego image capacity of "
+                f"{max(capacity, 0) // BITS_PER_BYTE} bytes"
+            )
+        return size, payload_bits
+
+    def probe(self, stego_image: np.ndarray, size: int) -> PayloadProbe:
+        """
+        Reads the header, payload size and leading bytes of a stego image, without extracting the payload.
+
+        Only the leading elements and the elements holding the prefix are read. Images without a header are not
+        probed, as the original format shuffles every index of the image.
+        :param stego_image: Image used as the carrier for hidden data.
+        :param size: Maximum number of leading bytes of the payload to read.
+        :return: Probe of the embedded payload.
+        """
+        return self._probe(stego_image.ravel(), size=size)
+
+    def _probe(
+        self, pixels: np.ndarray, positions: np.ndarray = None, size: int = 0
+    ) -> PayloadProbe:
+        """
+        Reads the header, payload size and leading bytes of a flattened stego image.
+        :param pixels: Flattened stego image.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        :param size: Maximum number of leading bytes of the payload to read.
+        :return: Probe of the embedded payload.
+        """
+        eligible = pixels if positions is None else positions
+        if eligible.size < self._header_offset:
+            return PayloadProbe(None)
+        _, header = self._read_header(pixels, positions)
+        if header is None:
+            return PayloadProbe(None)
+
+        context = self._read_context(pixels, positions)
+        payload_size = bytearray(context.payload_size_bytes)
+        stream = bitops.BitStream(payload_size)
+        context.engine.extract(pixels, context.permutation, stream)
+        probe = PayloadProbe(
+            header,
+            int.from_bytes(payload_size, byteorder="big"),
+            self.capacity(eligible.size, header.lsb_depth or self.lsb_depth),
+        )
+        if not 0 < probe.payload_size <= probe.capacity:
+            return probe
+
+        prefix = bytearray(min(size, probe.payload_size))
+        stream = bitops.BitStream(payload_size, prefix)
+        context.engine.extract(pixels, context.permutation, stream)
+        return dataclasses.replace(probe, prefix=bytes(prefix))
+
     def embed(self, cover_image, payload):
+        self._embed(cover_image.ravel(), payload)
+
+    def extract(self, stego_image):
+        return self._extract(stego_image.ravel())
+
+    def extract_prefix(self, stego_image, size):
+        return self._extract(stego_image.ravel(), limit=size)
+
+    def reader(self, stego_image):
+        return self._reader(stego_image.ravel())
+
+    def write(self, stego_image, start, data):
+        self._write(stego_image.ravel(), start, data)
+
+    def validate(self, cover_image, payload_size):
+        self._validate_capacity(self._payload_capacity(cover_image), payload_size)
+
+    @property
+    def validates_elements(self):
+        return True
+
+    def validate_elements(self, elements, payload_size):
+        self._validate_capacity(self.capacity(elements), payload_size)
+
+    def _embed(
+        self,
+        pixels: np.ndarray,
+        payload: bytes,
+        positions: np.ndarray = None,
+        components: int = 0,
+    ) -> None:
+        """
+        Embeds a payload in the eligible elements of a flattened cover image.
+
+        Only the elements that are changed are written to.
+        :param pixels: Flattened cover image.
+        :param payload: Binary data to hide in the cover image.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        :param components: Bit mask of the components carrying a segment of the payload. 0 for a single component.
+        """
         payload_size = len(payload)
         if payload_size == 0:
             raise ValueError("payload must not be empty")
 
-        pixels: np.ndarray = cover_image.ravel()
-
-        payload_capacity = self._payload_capacity(pixels)
+        eligible = pixels if positions is None else positions
+        payload_capacity = self._payload_capacity(eligible)
         self._validate_capacity(payload_capacity, payload_size)
 
-        self._seed = secrets.randbits(self.SEED_SIZE_BYTES * BITS_PER_BYTE)
-        seed_bits = bitops.int_to_bits(self._seed, self.SEED_SIZE_BYTES)
-        pixels[: len(seed_bits)] = bitops.embed_bits(
-            pixels[: len(seed_bits)], seed_bits, 0
+        context = self._create_context(
+            pixels, self._select_depth(eligible, payload_size), positions, components
+        )
+        size = (payload_size * BITS_PER_BYTE).to_bytes(
+            context.payload_size_bytes, byteorder="big"
+        )
+        context.engine.embed(
+            pixels, context.permutation, bitops.BitStream(size, payload)
         )
 
-        random_indices = self._random_indices(pixels)
-        random_indices = random_indices[random_indices >= len(seed_bits)]
+    def _extract(
+        self, pixels: np.ndarray, positions: np.ndarray = None, limit: int = None
+    ) -> bytes:
+        """
+        Extracts a payload from the eligible elements of a flattened stego image.
+        :param pixels: Flattened stego image.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        :param limit: Maximum number of leading bytes to extract. Defaults to the whole payload.
+        :return: Extracted payload as bytes.
+        """
+        context = self._read_context(pixels, positions)
+        size, payload_bits = self._read_size(pixels, context)
 
-        payload_bits = bitops.bytes_to_bits(payload)
-        size_bits = bitops.int_to_bits(len(payload_bits), self.PAYLOAD_SIZE_BYTES)
-        payload_bits = np.concatenate([size_bits, bitops.bytes_to_bits(payload)])
+        payload_size = -(-payload_bits // BITS_PER_BYTE)
+        payload = bytearray(payload_size if limit is None else min(limit, payload_size))
+        context.engine.extract(
+            pixels, context.permutation, bitops.BitStream(size, payload)
+        )
+        return bytes(payload)
 
-        bits_written = 0
-        for bit_index in range(self.lsb_depth):
-            if bits_written >= len(payload_bits):
-                break
+    def _reader(
+        self, pixels: np.ndarray, positions: np.ndarray = None
+    ) -> PayloadReader:
+        """
+        Opens the payload of a flattened stego image for reading ranges of it.
 
-            remaining = len(payload_bits) - bits_written
-            bits_to_write = min(len(random_indices), remaining)
+        The seed, header and payload size are read once. Each range then only gathers the elements that hold it, except
+        ranges that start near the beginning of the payload, which are extracted with the leading bytes in chunks.
+        :param pixels: Flattened stego image.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        :return: Reader of the payload.
+        """
+        context = self._read_context(pixels, positions)
+        size, payload_bits = self._read_size(pixels, context)
+        payload_size = -(-payload_bits // BITS_PER_BYTE)
 
-            write_indices = random_indices[:bits_to_write]
-            pixels[write_indices] = bitops.embed_bits(
-                pixels[write_indices],
-                payload_bits[bits_written : bits_written + bits_to_write],
-                bit_index,
+        def read(start: int, stop: int) -> bytes:
+            if start <= stop - start:  # cheaper to extract the leading bytes too
+                data = bytearray(stop)
+                stream = bitops.BitStream(bytearray(len(size)), data)
+                context.engine.extract(pixels, context.permutation, stream)
+                return bytes(data[start:])
+
+            data = bytearray(stop - start)
+            context.engine.extract_range(
+                pixels,
+                context.permutation,
+                bitops.BitStream(data),
+                (len(size) + start) * BITS_PER_BYTE,
             )
+            return bytes(data)
 
-            bits_written += bits_to_write
+        return PayloadReader(payload_size, read)
 
-    def extract(self, stego_image):
-        pixels: np.ndarray = stego_image.ravel()
-
-        seed_bits = bitops.get_bit(pixels[: self.SEED_SIZE_BYTES * BITS_PER_BYTE])
-        self._seed = bitops.bits_to_int(seed_bits)
-        random_indices = self._random_indices(pixels)
-        random_indices = random_indices[random_indices >= len(seed_bits)]
+    def _growth_depths(self, header: Header | None) -> range:
+        """
+        Gets the larger depths a payload that outgrows the recorded depth of a stego image can be given.
 
-        payload_size_bits = self.PAYLOAD_SIZE_BYTES * BITS_PER_BYTE
-        size_bits = bitops.get_bit(
-            pixels[random_indices[:payload_size_bits]], bit_index=0
-        )
-        payload_size = bitops.bits_to_int(size_bits)
+        Only payloads laid out by the plane engine can grow, as their bits do not move between depths.
+        :param header: Header of the stego image, or None if it uses the original format.
+        :return: Larger depths, up to the maximum depth, in increasing order. Empty if the payload can not grow.
+        """
+        if (
+            header is None
+            or header.engine_mode != EngineMode.PLANES
+            or not header.lsb_depth
+        ):
+            return range(0)
+        return range(header.lsb_depth + 1, (self.max_lsb_depth or 0) + 1)
 
-        bits_read = 0
-        payload = np.empty(payload_size_bits + payload_size, dtype=np.uint8)
-        for bit_index in range(self.lsb_depth):
-            if bits_read >= payload_size:
-                break
+    def _write_header(
+        self,
+        pixels: np.ndarray,
+        positions: np.ndarray | None,
+        seed: int,
+        header: Header,
+    ) -> None:
+        """
+        Rewrites the header of a stego image, keeping its seed.
+        :param pixels: Flattened stego image.
+        :param positions: Positions of the elements eligible for embedding, or None if every element is eligible.
+        :param seed: Seed of the stego image.
+        :param header: Header to write.
+        """
+        seed_size = self.SEED_SIZE_BYTES * BITS_PER_BYTE
+        if positions is None:
+            leading = slice(seed_size, self._header_offset)
+        else:
+            leading = positions[seed_size : self._header_offset]
+        header_bits = bitops.bytes_to_bits(header.to_bytes(seed))
+        pixels[leading] = bitops.embed_bits(pixels[leading], header_bits, 0)
 
-            remaining = len(payload) - bits_read
-            bits_to_read = min(len(random_indices), remaining)
+    def _write(
+        self,
+        pixels: np.ndarray,
+        start: int,
+        data: bytes,
+        positions: np.ndarray = None,
+    ) -> None:
+        """
+        Overwrites a range of the payload of a flattened stego image in place, extending the payload if the range ends
+        after it.
 
-            read_indices = random_indices[:bits_to_read]
-            bits = bitops.get_bit(pixels[read_indices], bit_index)
+        Only the elements holding the range, and the payload size if it changes, are written to. A payload that
+        outgrows its recorded depth is given a larger depth, up to the maximum depth, if the plane engine laid it out.
+        :param pixels: Flattened stego image.
+        :param start: Position of the first byte to overwrite. At most the size of the payload.
+        :param data: Bytes to write.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        """
+        eligible = pixels if positions is None else positions
+        seed, header = self._read_header(pixels, positions)
+        context = self._read_context(pixels, positions)
+        size, payload_bits = self._read_size(pixels, context)
+        current = -(-payload_bits // BITS_PER_BYTE)
+        if not 0 <= start <= current:
+            raise ValueError(f"invalid start (expected 0 to {current}, got {start})")
 
-            payload[bits_read : bits_read + bits_to_read] = bits
-            bits_read += bits_to_read
+        payload_size = max(current, start + len(data))
+        lsb_depth = (header.lsb_depth if header else 0) or self.lsb_depth
+        capacity = self._payload_capacity(eligible, lsb_depth)
+        if capacity < payload_size:
+            depths = self._growth_depths(header)
+            capacities = {d: self._payload_capacity(eligible, d) for d in depths}
+            lsb_depth = next((d for d in depths if capacities[d] >= payload_size), None)
+            if lsb_depth is None:
+                capacity = capacities[depths[-1]] if depths else capacity
+                raise InsufficientCapacityException(payload_size, capacity)
+            header = dataclasses.replace(header, lsb_depth=lsb_depth)
+            self._write_header(pixels, positions, seed, header)
+            context = self._read_context(pixels, positions)
 
-        return bitops.bits_to_bytes(payload[payload_size_bits:])
+        context.engine.embed_range(
+            pixels,
+            context.permutation,
+            bitops.BitStream(data),
+            (len(size) + start) * BITS_PER_BYTE,
+        )
+        if payload_size * BITS_PER_BYTE != payload_bits:
+            size = (payload_size * BITS_PER_BYTE).to_bytes(len(size), byteorder="big")
+            context.engine.embed_range(
+                pixels, context.permutation, bitops.BitStream(size), 0
+            )
@@ -1,6 +1,98 @@
+import itertools
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
 import numpy as np
 
+from stegos.core.steganography.bitops import BITS_PER_BYTE
+from stegos.core.steganography.engine import BaseEngine
+from stegos.core.steganography.exception import UnsupportedOperationException
+from stegos.core.steganography.header import Header
+from stegos.core.steganography.permutation import (
+    IndexMode,
+    IndexPermutation,
+    MappedPermutation,
+    permutation,
+)
+
+
+@dataclass(frozen=True)
+class PayloadProbe:
+    """Header, size and leading bytes of an embedded payload, read without extracting the payload."""
+
+    header: Header | None  # None if the image has no header
+    payload_bits: int = 0  # as recorded by the payload size header
+    capacity: int = 0  # bytes, at the recorded depth
+    prefix: bytes = b""  # empty if the payload does not fit the capacity
+
+    @property
+    def payload_size(self) -> int:
+        """
+        Gets the recorded size of the payload.
+        :return: Payload size in bytes, rounded up.
+        """
+        return -(-self.payload_bits // BITS_PER_BYTE)
+
+
+class PayloadReader:
+    """Reads ranges of an embedded payload, gathering only the elements that hold each range."""
+
+    def __init__(self, size: int, read: Callable[[int, int], bytes]):
+        """
+        Creates an instance of the PayloadReader class.
+        :param size: Size of the payload in bytes.
+        :param read: Function that reads the bytes from a start position up to a stop position, within the payload.
+        """
+        self._size = size
+        self._read = read
+
+    @property
+    def size(self) -> int:
+        """
+        Gets the size of the payload.
+        :return: Payload size in bytes.
+        """
+        return self._size
+
+    def read(self, start: int, stop: int) -> bytes:
+        """
+        Reads a range of the payload.
+        :param start: Position of the first byte.
+        :param stop: Position after the last byte.
+        :return: Bytes of the range, clipped to the payload.
+        """
+        start, stop = max(start, 0), min(stop, self.size)
+        return self._read(start, stop) if start < stop else b""
+
+    @classmethod
+    def join(
+        cls, readers: Sequence["PayloadReader"], mapper: Callable = map
+    ) -> "PayloadReader":
+        """
+        Joins the readers of consecutive segments of a payload.
+        :param readers: Reader of each segment, in order.
+        :param mapper: Function that applies a function to each item of iterables, in order, e.g. on a thread pool.
+        Defaults to map.
+        :return: Reader of the whole payload.
+        """
+        starts = list(itertools.accumulate((r.size for r in readers), initial=0))
+
+        def read(start: int, stop: int) -> bytes:
+            overlapping = [
+                (reader, first)
+                for reader, first in zip(readers, starts)
+                if first < stop and first + reader.size > start
+            ]
+            return b"".join(
+                mapper(
+                    lambda reader, first: reader.read(start - first, stop - first),
+                    *zip(*overlapping),
+                )
+            )
+
+        return cls(starts[-1], read)
+
 
 class BaseLSBSteganography(ABC):
     """Abstract class defining an image steganography algorithm."""
@@ -42,24 +134,162 @@ class BaseLSBSteganography(ABC):
         """
         pass
 
+    def validate(self, cover_image: np.ndarray, payload_size: int) -> None:
+        """
+        Validates that a payload can be embedded in a cover image, without embedding it.
+
+        Lets callers reject a payload before expensive work, such as key derivation. Strategies that know their
+        capacity override this.
+        :param cover_image: Image used as the carrier for hidden data.
+        :param payload_size: Size of the payload in bytes.
+        """
+        pass
+
+    @property
+    def validates_elements(self) -> bool:
+        """
+        Gets whether the strategy supports validate_elements, as its capacity depends on the number of elements alone.
+        :return: True if a payload can be validated from the number of elements, otherwise False.
+        """
+        return False
+
+    def validate_elements(self, elements: int, payload_size: int) -> None:
+        """
+        Validates that a payload can be embedded in a cover image with a number of elements, without the cover image.
+
+        Lets callers reject a payload from the header of a cover image, before it is decoded. Only supported by
+        strategies whose validates_elements is True. Others are validated from the cover image, with validate.
+        :param elements: Number of elements of the cover image.
+        :param payload_size: Size of the payload in bytes.
+        :raises UnsupportedOperationException: If the strategy can not be validated from a number of elements.
+        """
+        raise UnsupportedOperationException(
+            f"{type(self).__name__} can not be validated from a number of elements"
+        )
+
+    def prepare(self, cover_image: np.ndarray):
+        """
+        Prepares a cover or stego image for several operations, such as validating, then embedding.
+
+        Strategies that scan an image before each operation override this, and accept the prepared image in place of
+        the image, so the image is scanned once.
+        :param cover_image: Image used as the carrier for hidden data.
+        :return: Image to pass to the operations of the strategy.
+        """
+        return cover_image
+
+    def probe(self, stego_image: np.ndarray, size: int) -> PayloadProbe:
+        """
+        Reads the header, payload size and leading bytes of a stego image, without extracting the payload.
+
+        Lets callers triage images without deriving a key. Strategies that record a header override this.
+        :param stego_image: Image used as the carrier for hidden data.
+        :param size: Maximum number of leading bytes of the payload to read.
+        :return: Probe of the embedded payload.
+        :raises UnsupportedOperationException: If the strategy can not probe a stego image.
+        """
+        raise UnsupportedOperationException(
+            f"{type(self).__name__} can not probe a stego image"
+        )
+
+    def extract_prefix(self, stego_image: np.ndarray, size: int) -> bytes:
+        """
+        Extract the leading bytes of a payload from a stego image.
+
+        Strategies that can gather part of a payload override this, so the prefix is available before the rest of the
+        payload is gathered.
+        :param stego_image: Image used as the carrier for hidden data.
+        :param size: Number of leading bytes to extract.
+        :return: Up to size leading bytes of the payload.
+        """
+        return self.extract(stego_image)[:size]
+
+    def reader(self, stego_image: np.ndarray) -> PayloadReader:
+        """
+        Opens the payload of a stego image for reading ranges of it.
+
+        Strategies that can gather part of a payload override this, so each range only gathers the elements that hold
+        it.
+        :param stego_image: Image used as the carrier for hidden data. Must outlive the reader.
+        :return: Reader of the payload.
+        """
+        payload = self.extract(stego_image)
+        return PayloadReader(len(payload), lambda start, stop: payload[start:stop])
+
+    def write(self, stego_image: np.ndarray, start: int, data: bytes) -> None:
+        """
+        Overwrites a range of the payload of a stego image in place, extending the payload if the range ends after it.
+
+        Strategies that can scatter part of a payload override this, so only the elements holding the range are
+        written to. Otherwise, the payload is embedded again whole.
+        :param stego_image: Image used as the carrier for hidden data.
+        :param start: Position of the first byte to overwrite. At most the size of the payload.
+        :param data: Bytes to write.
+        """
+        payload = self.extract(stego_image)
+        if not 0 <= start <= len(payload):
+            raise ValueError(
+                f"invalid start (expected 0 to {len(payload)}, got {start})"
+            )
+        self.embed(stego_image, payload[:start] + data + payload[start + len(data) :])
+
+
+@dataclass(frozen=True)
+class SeededContext:
+    """State of a single seeded embedding or extraction.
+
+    Kept separate from the strategy, so a single strategy can be shared by concurrent operations.
+    """
+
+    seed: int
+    permutation: IndexPermutation
+    engine: BaseEngine
+    payload_size_bytes: int
+
 
 class SeededSteganography(BaseLSBSteganography, ABC):
     """Abstract base class defining a seeded LSB image steganography algorithm."""
 
     SEED_SIZE_BYTES = 4
 
-    def __init__(self, lsb_depth: int):
+    def __init__(self, lsb_depth: int, index_mode: IndexMode = IndexMode.FEISTEL):
         """
         Creates an instance of the SeededSteganography class.
         :param lsb_depth: Least significant bit embedding depth of the algorithm.
+        :param index_mode: Method of generating randomised embedding positions.
         """
         super().__init__(lsb_depth)
-        self._seed = 0
+        self._index_mode = IndexMode(index_mode)
+
+    @property
+    def index_mode(self) -> IndexMode:
+        """
+        Gets the method used to generate randomised embedding positions.
+        :return: Index mode of the algorithm.
+        """
+        return self._index_mode
 
-    def _random_indices(self, pixels: np.ndarray) -> np.ndarray:
+    def _random_indices(
+        self,
+        seed: int,
+        pixels: np.ndarray,
+        offset: int,
+        index_mode: IndexMode = None,
+        positions: np.ndarray = None,
+    ) -> IndexPermutation:
         """
         Generates random indices for a NumPy array.
+        :param seed: Seed used to generate the random indices.
         :param pixels: NumPy array to generate random indices for.
-        :return: NumPy array of randomised indices.
+        :param offset: Number of leading elements to exclude from the random indices.
+        :param index_mode: Method of generating the random indices. Defaults to the index mode of the algorithm.
+        :param positions: Positions of the elements eligible for embedding. Defaults to every element.
+        :return: Permutation of randomised indices, which are generated as they are taken.
         """
-        return np.random.default_rng(self._seed).permutation(pixels.size)
+        if index_mode is None:
+            index_mode = self.index_mode
+        if positions is None:
+            return permutation(index_mode, seed, pixels.size, offset)
+        return MappedPermutation(
+            permutation(index_mode, seed, len(positions), offset), positions
+        )
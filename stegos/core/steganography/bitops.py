@@ -1,5 +1,8 @@
 """This module provides functions to manipulate bit values."""
 
+import threading
+from typing import Generator
+
 import numpy as np
 
 BITS_PER_BYTE = 8
@@ -80,6 +83,52 @@ def embed_bits(
     return carrier_array | (bit_array << bit_index)
 
 
+def bits_to_symbols(bits: np.ndarray, width: int) -> np.ndarray:
+    """
+    Convert a NumPy array of bits to symbols of multiple bits.
+    :param bits: NumPy array of bits. Length must be a multiple of the symbol width.
+    :param width: Number of bits per symbol (1 to 8).
+    :return: NumPy array of symbols, with the first bit of each symbol as its MSB.
+    """
+    weights = (1 << np.arange(width - 1, -1, -1)).astype(np.uint8)
+    return bits.reshape(-1, width).astype(np.uint8, copy=False) @ weights
+
+
+def symbols_to_bits(symbols: np.ndarray, width: int) -> np.ndarray:
+    """
+    Convert a NumPy array of symbols to bits.
+    :param symbols: NumPy array of symbols.
+    :param width: Number of bits per symbol (1 to 8).
+    :return: NumPy array of bits, with the MSB of each symbol first.
+    """
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint8)
+    return ((symbols.astype(np.uint8)[:, np.newaxis] >> shifts) & 1).ravel()
+
+
+def get_symbols(carrier_array: np.ndarray, width: int) -> np.ndarray:
+    """
+    Gets the symbols held in the least significant bits of a NumPy array.
+    :param carrier_array: NumPy integer array.
+    :param width: Number of least significant bits per symbol.
+    :return: NumPy array of symbols.
+    """
+    return carrier_array & ((1 << width) - 1)
+
+
+def embed_symbols(
+    carrier_array: np.ndarray, symbols: np.ndarray, width: int
+) -> np.ndarray:
+    """
+    Embed symbols in the least significant bits of a NumPy array.
+    :param carrier_array: NumPy integer array to embed symbols in.
+    :param symbols: NumPy array of symbols to embed.
+    :param width: Number of least significant bits per symbol.
+    :return: NumPy array of integers with the embedded symbols.
+    """
+    mask = np.array((1 << width) - 1, dtype=carrier_array.dtype)
+    return (carrier_array & ~mask) | symbols
+
+
 def has_msbs_set(nums: np.ndarray, lsb_depth: int) -> np.ndarray:
     """
     Checks if MSBs are set.
@@ -88,3 +137,108 @@ def has_msbs_set(nums: np.ndarray, lsb_depth: int) -> np.ndarray:
     :return: NumPy array of booleans indicating where the MSBs are set.
     """
     return (nums >> lsb_depth) != 0
+
+
+class BitStream:
+    """Stream of bits backed by one or more byte buffers.
+
+    Bits are unpacked from, and packed into, the buffers one chunk at a time, so the bits of the whole stream are never
+    held in memory at once. Buffers must be writable for bits to be written.
+    """
+
+    def __init__(self, *buffers: bytes | bytearray | memoryview):
+        """
+        Creates an instance of the BitStream class.
+        :param buffers: Byte buffers that make up the stream, in order.
+        """
+        self._buffers = [np.frombuffer(buffer, dtype=np.uint8) for buffer in buffers]
+        self._offsets = [0]
+        for buffer in self._buffers:
+            self._offsets.append(self._offsets[-1] + len(buffer))
+        self._lock = threading.Lock()  # guards bytes shared by unaligned writes
+
+    def __len__(self) -> int:
+        return self._offsets[-1] * BITS_PER_BYTE
+
+    def _get_bytes(self, start: int, stop: int) -> np.ndarray:
+        """
+        Gets a range of bytes from the buffers.
+        :param start: Position of the first byte.
+        :param stop: Position after the last byte.
+        :return: NumPy array of bytes. Only copied if the range spans multiple buffers.
+        """
+        pieces = [
+            buffer[max(start - offset, 0) : stop - offset]
+            for buffer, offset in zip(self._buffers, self._offsets)
+            if offset < stop and offset + len(buffer) > start
+        ]
+        if len(pieces) == 1:
+            return pieces[0]
+        return np.concatenate(pieces) if pieces else np.empty(0, dtype=np.uint8)
+
+    def _set_bytes(self, start: int, data: np.ndarray) -> None:
+        """
+        Sets a range of bytes in the buffers.
+        :param start: Position of the first byte.
+        :param data: NumPy array of bytes.
+        """
+        stop = start + len(data)
+        for buffer, offset in zip(self._buffers, self._offsets):
+            low, high = max(start, offset), min(stop, offset + len(buffer))
+            if low < high:
+                buffer[low - offset : high - offset] = data[low - start : high - start]
+
+    def _merge(self, start: int, bits: np.ndarray) -> None:
+        """
+        Writes bits within a single byte, keeping the other bits of the byte.
+        :param start: Position of the first bit.
+        :param bits: NumPy array of at most 8 bits, which must not cross a byte boundary.
+        """
+        byte, shift = start // BITS_PER_BYTE, BITS_PER_BYTE - start % BITS_PER_BYTE
+        shift -= len(bits)
+        mask = ((1 << len(bits)) - 1) << shift
+        value = int(np.packbits(bits)[0]) >> (BITS_PER_BYTE - len(bits)) << shift
+        with self._lock:
+            current = int(self._get_bytes(byte, byte + 1)[0])
+            self._set_bytes(byte, np.array([(current & ~mask) | value], np.uint8))
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """
+        Reads a range of bits.
+        :param start: Position of the first bit.
+        :param stop: Position after the last bit.
+        :return: NumPy array of bits.
+        """
+        stop = min(stop, len(self))
+        if start >= stop:
+            return np.empty(0, dtype=np.uint8)
+        data = self._get_bytes(start // BITS_PER_BYTE, -(-stop // BITS_PER_BYTE))
+        head = start % BITS_PER_BYTE
+        return np.unpackbits(data)[head : head + stop - start]
+
+    def write(self, start: int, bits: np.ndarray) -> None:
+        """
+        Writes a range of bits.
+        :param start: Position of the first bit.
+        :param bits: NumPy array of bits.
+        """
+        head = min(-start % BITS_PER_BYTE, len(bits))
+        if head:
+            self._merge(start, bits[:head])
+        aligned = (len(bits) - head) // BITS_PER_BYTE * BITS_PER_BYTE
+        if aligned:
+            self._set_bytes(
+                (start + head) // BITS_PER_BYTE,
+                np.packbits(bits[head : head + aligned]),
+            )
+        if head + aligned < len(bits):
+            self._merge(start + head + aligned, bits[head + aligned :])
+
+    def chunks(self, size: int) -> Generator[np.ndarray, None, None]:
+        """
+        Reads the stream in chunks of bits.
+        :param size: Number of bits per chunk.
+        :return: Yields NumPy arrays of bits. The final chunk may be smaller.
+        """
+        for start in range(0, len(self), size):
+            yield self.read(start, start + size)
@@ -2,34 +2,45 @@ from PIL.Image import Image
 
 from stegos.core.constants import ImageCompressionType, MixedFormat
 from stegos.core.exception import UnsupportedImageFormatException
-from stegos.core.steganography.algorithms.lossy import LossyLSBSteganography
+from stegos.core.steganography.algorithms.lossy import ComponentLossyLSBSteganography
 from stegos.core.steganography.algorithms.lsb import LSBSteganography
 from stegos.core.steganography.base import BaseLSBSteganography
 from stegos.core.steganography.decorators.encryption import EncryptionDecorator
 
 
+def validate_format(compression_type: ImageCompressionType, image: Image = None):
+    """
+    Checks whether an image format is supported.
+    :param compression_type: Compression type of the image.
+    :param image: Image used as a cover image or stego image. Only required for mixed formats.
+    :raises UnsupportedImageFormatException: If the image is of a mixed format with lossy compression.
+    """
+    if (
+        compression_type == ImageCompressionType.MIXED
+        and MixedFormat.type(image) == ImageCompressionType.LOSSY
+    ):
+        raise UnsupportedImageFormatException(
+            "mixed image formats with lossy compression are unsupported"
+        )
+
+
 def _get_base_strategy(
-    compression_type: ImageCompressionType, image: Image
+    compression_type: ImageCompressionType, image: Image = None
 ) -> BaseLSBSteganography:
     """
     Gets the appropriate image steganography strategy.
     :param compression_type: Compression type of the image.
-    :param image: Image used as a cover image or stego image.
+    :param image: Image used as a cover image or stego image. Only required for mixed formats.
     :return: Image steganography strategy configured based on compression type.
     """
-    match compression_type:
-        case ImageCompressionType.LOSSY:
-            return LossyLSBSteganography()
-        case ImageCompressionType.MIXED:
-            if MixedFormat.type(image) == ImageCompressionType.LOSSY:
-                raise UnsupportedImageFormatException(
-                    "mixed image formats with lossy compression are unsupported"
-                )
-    return LSBSteganography()
+    validate_format(compression_type, image)
+    if compression_type == ImageCompressionType.LOSSY:
+        return ComponentLossyLSBSteganography()
+    return LSBSteganography(max_lsb_depth=LSBSteganography.MAX_SAFE_DEPTH)
 
 
 class SteganographyStrategyBuilder:
-    def __init__(self, compression_type: ImageCompressionType, image: Image):
+    def __init__(self, compression_type: ImageCompressionType, image: Image = None):
         self._strategy: BaseLSBSteganography = _get_base_strategy(
             compression_type, image
         )
@@ -1,6 +1,10 @@
 import numpy as np
 
-from stegos.core.steganography.base import BaseLSBSteganography
+from stegos.core.steganography.base import (
+    BaseLSBSteganography,
+    PayloadProbe,
+    PayloadReader,
+)
 
 
 class BaseLSBSteganographyDecorator(BaseLSBSteganography):
@@ -24,3 +28,28 @@ class BaseLSBSteganographyDecorator(BaseLSBSteganography):
 
     def extract(self, stego_image: np.ndarray) -> bytes:
         return self.strategy.extract(stego_image)
+
+    def validate(self, cover_image: np.ndarray, payload_size: int) -> None:
+        self.strategy.validate(cover_image, payload_size)
+
+    @property
+    def validates_elements(self) -> bool:
+        return self.strategy.validates_elements
+
+    def validate_elements(self, elements: int, payload_size: int) -> None:
+        self.strategy.validate_elements(elements, payload_size)
+
+    def prepare(self, cover_image: np.ndarray):
+        return self.strategy.prepare(cover_image)
+
+    def probe(self, stego_image: np.ndarray, size: int) -> PayloadProbe:
+        return self.strategy.probe(stego_image, size)
+
+    def extract_prefix(self, stego_image: np.ndarray, size: int) -> bytes:
+        return self.strategy.extract_prefix(stego_image, size)
+
+    def reader(self, stego_image: np.ndarray) -> PayloadReader:
+        return self.strategy.reader(stego_image)
+
+    def write(self, stego_image: np.ndarray, start: int, data: bytes) -> None:
+        self.strategy.write(stego_image, start, data)
@@ -1,5 +1,6 @@
 import base64
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, TypeAlias
 
 import numpy as np
@@ -7,8 +8,11 @@ from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives.kdf import KeyDerivationFunction
 from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
 
+from stegos.core.steganography.base import PayloadReader
 from stegos.core.steganography.decorators.decorator import BaseLSBSteganographyDecorator
 
+ARGON2_MEMORY_COST = 2**21  # KiB
+
 
 def _default_argon2(salt: bytes) -> Argon2id:
     """
@@ -22,7 +26,7 @@ def _default_argon2(salt: bytes) -> Argon2id:
         length=32,
         iterations=1,
         lanes=4,
-        memory_cost=2**21,
+        memory_cost=ARGON2_MEMORY_COST,
         ad=None,
         secret=None,
     )
@@ -38,6 +42,13 @@ class EncryptionDecorator(BaseLSBSteganographyDecorator):
     """
 
     SALT_LENGTH = 16
+    # Fernet token: version, timestamp, IV, PKCS7 padded AES-128-CBC ciphertext and HMAC-SHA256, then base64 encoded
+    TOKEN_OVERHEAD_BYTES = 1 + 8 + 16 + 32
+    BLOCK_SIZE = 16
+    TOKEN_VERSION = 0x80
+    PREFIX_BYTES = (
+        SALT_LENGTH + 12
+    )  # salt, then the encoded version and timestamp of the token
 
     def __init__(self, strategy, password: bytes, kdf: KDF = None):
         super().__init__(strategy)
@@ -53,16 +64,193 @@ class EncryptionDecorator(BaseLSBSteganographyDecorator):
         key = self._kdf(salt).derive(self._password)
         return base64.urlsafe_b64encode(key)
 
-    def embed(self, cover_image: np.ndarray, payload: bytes):
-        salt = os.urandom(self.SALT_LENGTH)
-        key = self._derive_key(salt)
-        payload = salt + Fernet(key).encrypt(payload)
-        super().embed(cover_image, payload)
-
-    def extract(self, stego_image: np.ndarray) -> bytes:
-        payload = super().extract(stego_image)
-        salt, encrypted_payload = (
-            payload[: self.SALT_LENGTH],
-            payload[self.SALT_LENGTH :],
-        )
-        return Fernet(self._derive_key(salt)).decrypt(encrypted_payload)
+    @classmethod
+    def encrypted_size(cls, payload_size: int) -> int:
+        """
+        Gets the exact size of a payload once encrypted, including its salt.
+        :param payload_size: Size of the payload in bytes.
+        :return: Size of the salt and Fernet token in bytes.
+        """
+        padded = (payload_size // cls.BLOCK_SIZE + 1) * cls.BLOCK_SIZE
+        token = cls.TOKEN_OVERHEAD_BYTES + padded
+        return cls.SALT_LENGTH + -(-token // 3) * 4
+
+    @classmethod
+    def max_payload_size(cls, capacity: int) -> int:
+        """
+        Gets the size of the largest payload that fits in a capacity once encrypted.
+        :param capacity: Capacity in bytes.
+        :return: Size of the largest payload in bytes, or -1 if not even an empty payload fits.
+        """
+        low, high = -1, capacity
+        while low < high:
+            middle = (low + high + 1) // 2
+            if cls.encrypted_size(middle) <= capacity:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    @classmethod
+    def is_encrypted_size(cls, size: int) -> bool:
+        """
+        Checks whether a size is the size of an encrypted payload, including its salt.
+        :param size: Size in bytes.
+        :return: True if some payload encrypts to exactly this size, otherwise False.
+        """
+        token = size - cls.SALT_LENGTH
+        if token <= 0 or token % 4:
+            return False
+        # a token of n blocks encodes to ceil((overhead + 16n) / 3) * 4 bytes
+        blocks = (token // 4 * 3 - cls.TOKEN_OVERHEAD_BYTES) // cls.BLOCK_SIZE
+        return blocks >= 1 and cls.encrypted_size((blocks - 1) * cls.BLOCK_SIZE) == size
+
+    @classmethod
+    def token_timestamp(cls, prefix: bytes) -> int | None:
+        """
+        Reads the timestamp of the Fernet token of an encrypted payload, without decrypting it.
+        :param prefix: At least the first PREFIX_BYTES bytes of the encrypted payload.
+        :return: Time the payload was encrypted, in seconds since the epoch, or None if the token is malformed.
+        """
+        encoded = prefix[cls.SALT_LENGTH : cls.PREFIX_BYTES]
+        if len(encoded) < cls.PREFIX_BYTES - cls.SALT_LENGTH:
+            return None
+        try:
+            version_timestamp = base64.b64decode(encoded, altchars=b"-_", validate=True)
+        except ValueError:
+            return None
+        if version_timestamp[0] != cls.TOKEN_VERSION:
+            return None
+        return int.from_bytes(version_timestamp[1:], byteorder="big")
+
+    def validate(self, cover_image: np.ndarray, payload_size: int) -> None:
+        self.validate_sealed(cover_image, self.encrypted_size(payload_size))
+
+    def validate_elements(self, elements: int, payload_size: int) -> None:
+        self.validate_sealed_elements(elements, self.encrypted_size(payload_size))
+
+    def validate_sealed(self, cover_image: np.ndarray, size: int) -> None:
+        """
+        Validates that a sealed payload can be embedded in a cover image, without embedding it.
+        :param cover_image: Image used as the carrier for hidden data.
+        :param size: Size of the sealed payload in bytes, as embedded.
+        """
+        super().validate(cover_image, size)
+
+    def validate_sealed_elements(self, elements: int, size: int) -> None:
+        """
+        Validates that a sealed payload can be embedded in a cover image with a number of elements, without the cover
+        image.
+        :param elements: Number of elements of the cover image.
+        :param size: Size of the sealed payload in bytes, as embedded.
+        """
+        super().validate_elements(elements, size)
+
+    def new_key(self, salt: bytes = None) -> tuple[bytes, bytes]:
+        """
+        Derives a key for encryption from a fresh salt, or from the salt of a stego image.
+
+        Can be called ahead of embedding, e.g. on another thread while the cover image is decoded.
+        :param salt: Salt used for key derivation. Defaults to a fresh salt.
+        :return: Salt, and base64 encoded key.
+        """
+        salt = salt or os.urandom(self.SALT_LENGTH)
+        return salt, self._derive_key(salt)
+
+    def extract_salt(self, stego_image: np.ndarray) -> bytes:
+        """
+        Extracts the salt of a stego image, without deriving a key or decrypting the payload.
+        :param stego_image: Image used as the carrier for hidden data.
+        :return: Salt as bytes.
+        """
+        return super().extract_prefix(stego_image, self.SALT_LENGTH)
+
+    def embed(
+        self,
+        cover_image: np.ndarray,
+        payload: bytes,
+        key: tuple[bytes, bytes] = None,
+    ):
+        """
+        Encrypts a payload, then embeds it into a cover image.
+        :param cover_image: Image used as the carrier for hidden data.
+        :param payload: Binary data to hide in the cover image.
+        :param key: Salt and key returned by new_key. Defaults to deriving a new key.
+        """
+        self.embed_sealed(cover_image, self.seal(payload, key))
+
+    def seal(self, payload: bytes, key: tuple[bytes, bytes] = None) -> bytes:
+        """
+        Encrypts a payload as it is embedded, its salt followed by a Fernet token.
+        :param payload: Binary data to encrypt.
+        :param key: Salt and key returned by new_key. Defaults to deriving a new key.
+        :return: Sealed payload, encrypted_size(len(payload)) bytes long.
+        """
+        salt, key = key or self.new_key()
+        return salt + Fernet(key).encrypt(payload)
+
+    def embed_sealed(self, cover_image: np.ndarray, sealed: bytes) -> None:
+        """
+        Embeds a sealed payload into a cover image as is, without encrypting it again.
+
+        Payloads that encrypt their own contents behind the salt, such as indexed containers, are embedded this way.
+        :param cover_image: Image used as the carrier for hidden data.
+        :param sealed: Payload returned by seal, or starting with the salt of its key.
+        """
+        super().embed(cover_image, sealed)
+
+    def extract(
+        self, stego_image: np.ndarray, key: tuple[bytes, bytes] = None
+    ) -> bytes:
+        """
+        Extracts a payload from a stego image, then decrypts it.
+
+        The seed, header and eligible elements of the image are read once, for both the salt and the payload.
+        :param stego_image: Image used as the carrier for hidden data.
+        :param key: Salt and key returned by new_key. Used if its salt matches the salt of the image, otherwise a key
+        is derived.
+        :return: Decrypted payload as bytes.
+        """
+        return self.decrypt(self.reader(stego_image), key)
+
+    def decrypt(self, reader: PayloadReader, key: tuple[bytes, bytes] = None) -> bytes:
+        """
+        Reads an embedded payload through a reader opened by reader, then decrypts it.
+
+        The key is derived on another thread as soon as the salt is read, while the rest of the payload is read.
+        :param reader: Reader of the embedded payload.
+        :param key: Salt and key returned by new_key. Used if its salt matches the salt of the payload, otherwise a key
+        is derived.
+        :return: Decrypted payload as bytes.
+        """
+        salt = reader.read(0, self.SALT_LENGTH)
+        if key is not None and key[0] == salt:
+            return Fernet(key[1]).decrypt(reader.read(self.SALT_LENGTH, reader.size))
+        with ThreadPoolExecutor(1) as executor:
+            key = executor.submit(self._derive_key, salt)
+            encrypted_payload = reader.read(self.SALT_LENGTH, reader.size)
+            return Fernet(key.result()).decrypt(encrypted_payload)
+
+    def extract_prefix(self, stego_image: np.ndarray, size: int) -> bytes:
+        return self.extract(stego_image)[:size]  # decrypted as a whole
+
+    def reader(self, stego_image: np.ndarray) -> PayloadReader:
+        """
+        Opens the payload of a stego image as embedded, the salt followed by ciphertext, for reading ranges of it.
+
+        Ranges are not decrypted, as a range of a Fernet token can not be decrypted alone. Payloads made of many
+        tokens, such as indexed containers, decrypt each token they read.
+        :param stego_image: Image used as the carrier for hidden data. Must outlive the reader.
+        :return: Reader of the embedded payload.
+        """
+        return self.strategy.reader(stego_image)
+
+    def write(self, stego_image: np.ndarray, start: int, data: bytes) -> None:
+        """
+        Overwrites a range of the payload of a stego image as embedded, without encrypting it. Payloads made of many
+        tokens, such as indexed containers, encrypt each token they write.
+        :param stego_image: Image used as the carrier for hidden data.
+        :param start: Position of the first byte to overwrite. At most the size of the payload.
+        :param data: Bytes to write.
+        """
+        self.strategy.write(stego_image, start, data)
@@ -0,0 +1,326 @@
+"""This module provides engines that lay out a bit stream across the randomised embedding positions of an image."""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from typing import Callable
+
+import numpy as np
+
+from stegos.core.steganography import bitops
+from stegos.core.steganography.kernels import Backend, backend
+from stegos.core.steganography.permutation import IndexPermutation
+
+
+class EngineMode(IntEnum):
+    """Layouts of a bit stream across embedding positions."""
+
+    PLANES = 0
+    SYMBOLS = 1
+
+
+class BaseEngine(ABC):
+    """Abstract class defining how a bit stream is embedded in, and extracted from, embedding positions.
+
+    Embedding positions are processed in chunks. Each chunk gathers and scatters its positions once, and reads or
+    writes only its own bits of the stream, so memory is bounded by the chunk size. Chunks touch disjoint positions,
+    so they can be processed on a thread pool with the same result as processing them serially.
+    """
+
+    CHUNK_SIZE = 2**20
+
+    def __init__(self, lsb_depth: int, workers: int = 1, kernels: Backend = None):
+        """
+        Creates an instance of the BaseEngine class.
+        :param lsb_depth: Number of least significant bits available per embedding position.
+        :param workers: Number of threads used to process chunks.
+        :param kernels: Backend of the kernels that embed and extract bits. Defaults to the fastest available backend.
+        """
+        self._lsb_depth = lsb_depth
+        self._workers = workers
+        self._kernels = kernels or backend()
+
+    def capacity(self, available: int) -> int:
+        """
+        Gets the number of bits that can be embedded in a number of embedding positions.
+        :param available: Number of available embedding positions.
+        :return: Capacity in bits.
+        """
+        return available * self._lsb_depth
+
+    @abstractmethod
+    def _positions(self, length: int, available: int) -> int:
+        """
+        Gets the number of embedding positions used by a bit stream.
+        :param length: Number of bits in the stream.
+        :param available: Number of available embedding positions.
+        :return: Number of embedding positions used.
+        """
+        pass
+
+    @abstractmethod
+    def _embed_chunk(
+        self,
+        pixels: np.ndarray,
+        indices: np.ndarray,
+        stream: bitops.BitStream,
+        start: int,
+        available: int,
+    ) -> None:
+        """
+        Embeds the bits of a bit stream that belong to a chunk of embedding positions.
+        :param pixels: Flattened image to embed the bits in.
+        :param indices: Indices of the chunk of embedding positions.
+        :param stream: Bit stream to embed.
+        :param start: Position of the first embedding position of the chunk.
+        :param available: Number of available embedding positions.
+        """
+        pass
+
+    @abstractmethod
+    def _extract_chunk(
+        self,
+        pixels: np.ndarray,
+        indices: np.ndarray,
+        stream: bitops.BitStream,
+        start: int,
+        available: int,
+    ) -> None:
+        """
+        Extracts the bits of a bit stream that belong to a chunk of embedding positions.
+        :param pixels: Flattened image to extract the bits from.
+        :param indices: Indices of the chunk of embedding positions.
+        :param stream: Bit stream to write the extracted bits to.
+        :param start: Position of the first embedding position of the chunk.
+        :param available: Number of available embedding positions.
+        """
+        pass
+
+    def _map(self, process: Callable[[int], None], length: int, available: int) -> None:
+        """
+        Processes each chunk of embedding positions used by a bit stream.
+        :param process: Function that processes the chunk starting at the given embedding position.
+        :param length: Number of bits in the stream.
+        :param available: Number of available embedding positions.
+        """
+        starts = range(0, self._positions(length, available), self.CHUNK_SIZE)
+        if self._workers > 1 and len(starts) > 1:
+            with ThreadPoolExecutor(self._workers) as executor:
+                list(executor.map(process, starts))  # raises the first exception
+        else:
+            for start in starts:
+                process(start)
+
+    def embed(
+        self,
+        pixels: np.ndarray,
+        permutation: IndexPermutation,
+        stream: bitops.BitStream,
+    ) -> None:
+        """
+        Embeds a bit stream.
+        :param pixels: Flattened image to embed the bits in.
+        :param permutation: Randomised embedding positions.
+        :param stream: Bit stream to embed.
+        """
+        positions = self._positions(len(stream), len(permutation))
+
+        def process(start: int) -> None:
+            indices = permutation.take(start, min(start + self.CHUNK_SIZE, positions))
+            self._embed_chunk(pixels, indices, stream, start, len(permutation))
+
+        self._map(process, len(stream), len(permutation))
+
+    def extract(
+        self,
+        pixels: np.ndarray,
+        permutation: IndexPermutation,
+        stream: bitops.BitStream,
+    ) -> None:
+        """
+        Extracts a bit stream.
+        :param pixels: Flattened image to extract the bits from.
+        :param permutation: Randomised embedding positions.
+        :param stream: Bit stream to write the extracted bits to. Its length determines how many bits are extracted.
+        """
+        positions = self._positions(len(stream), len(permutation))
+
+        def process(start: int) -> None:
+            indices = permutation.take(start, min(start + self.CHUNK_SIZE, positions))
+            self._extract_chunk(pixels, indices, stream, start, len(permutation))
+
+        self._map(process, len(stream), len(permutation))
+
+    @abstractmethod
+    def extract_range(
+        self,
+        pixels: np.ndarray,
+        permutation: IndexPermutation,
+        stream: bitops.BitStream,
+        start: int,
+    ) -> None:
+        """
+        Extracts a range of an embedded bit stream, reading only the embedding positions that hold the range.
+        :param pixels: Flattened image to extract the bits from.
+        :param permutation: Randomised embedding positions.
+        :param stream: Bit stream to write the extracted bits to. Its length determines how many bits are extracted.
+        :param start: Position in the embedded stream of the first bit to extract.
+        """
+        pass
+
+    @abstractmethod
+    def embed_range(
+        self,
+        pixels: np.ndarray,
+        permutation: IndexPermutation,
+        stream: bitops.BitStream,
+        start: int,
+    ) -> None:
+        """
+        Overwrites a range of an embedded bit stream, writing only the embedding positions that hold the range.
+        :param pixels: Flattened image to embed the bits in.
+        :param permutation: Randomised embedding positions.
+        :param stream: Bit stream of the range to embed.
+        :param start: Position in the embedded stream of the first bit to overwrite.
+        """
+        pass
+
+
+class PlaneEngine(BaseEngine):
+    """Engine that fills one bit plane of every embedding position before moving on to the next bit plane.
+
+    Bit k of the stream is embedded in bit plane k // available of embedding position k % available.
+    """
+
+    def _positions(self, length, available):
+        return min(length, available)
+
+    def _stream_starts(self, length: int, start: int, available: int) -> range:
+        """
+        Gets the position in the stream of the first bit of each bit plane of a chunk.
+        :param length: Number of bits in the stream.
+        :param start: Position of the first embedding position of the chunk.
+        :param available: Number of available embedding positions.
+        :return: Range of stream positions, one per bit plane used.
+        """
+        return range(start, min(length, self._lsb_depth * available), available)
+
+    def _embed_chunk(self, pixels, indices, stream, start, available):
+        planes = tuple(
+            stream.read(first, first + len(indices))
+            for first in self._stream_starts(len(stream), start, available)
+        )
+        self._kernels.embed_planes(pixels, indices, planes)
+
+    def _extract_chunk(self, pixels, indices, stream, start, available):
+        firsts = self._stream_starts(len(stream), start, available)
+        planes = tuple(
+            np.empty(min(len(indices), len(stream) - first), dtype=np.uint8)
+            for first in firsts
+        )
+        self._kernels.extract_planes(pixels, indices, planes)
+        for first, bits in zip(firsts, planes):
+            stream.write(first, bits)
+
+    def _runs(self, start: int, stop: int, available: int):
+        """
+        Splits a range of the stream into runs of consecutive embedding positions within one bit plane.
+        :param start: Position in the stream of the first bit.
+        :param stop: Position in the stream after the last bit.
+        :param available: Number of available embedding positions.
+        :return: Yields the bit plane, first embedding position and position after the last embedding position of each
+        run, in chunks.
+        """
+        while start < stop:
+            plane, first = divmod(start, available)
+            last = first + min(stop - start, available - first, self.CHUNK_SIZE)
+            yield plane, first, last
+            start += last - first
+
+    def extract_range(self, pixels, permutation, stream, start):
+        available = len(permutation)
+        for plane, first, last in self._runs(start, start + len(stream), available):
+            bits = bitops.get_bit(pixels[permutation.take(first, last)], plane)
+            stream.write(plane * available + first - start, bits.astype(np.uint8))
+
+    def embed_range(self, pixels, permutation, stream, start):
+        available = len(permutation)
+        for plane, first, last in self._runs(start, start + len(stream), available):
+            indices = permutation.take(first, last)
+            offset = plane * available + first - start
+            bits = stream.read(offset, offset + last - first).astype(pixels.dtype)
+            pixels[indices] = bitops.embed_bits(pixels[indices], bits, plane)
+
+
+class SymbolEngine(BaseEngine):
+    """Engine that packs the bit stream into symbols of lsb_depth bits, one symbol per embedding position.
+
+    Each embedding position is gathered and scattered exactly once, regardless of depth.
+    """
+
+    def _positions(self, length, available):
+        return min(-(-length // self._lsb_depth), available)
+
+    def _embed_chunk(self, pixels, indices, stream, start, available):
+        first, width = start * self._lsb_depth, len(indices) * self._lsb_depth
+        bits = stream.read(first, first + width)
+        symbols = bitops.bits_to_symbols(
+            np.pad(bits, (0, width - len(bits))), self._lsb_depth
+        )
+        self._kernels.embed_symbols(pixels, indices, symbols, self._lsb_depth)
+
+    def _extract_chunk(self, pixels, indices, stream, start, available):
+        symbols = np.empty(len(indices), dtype=np.uint8)
+        self._kernels.extract_symbols(pixels, indices, symbols, self._lsb_depth)
+        first = start * self._lsb_depth
+        bits = bitops.symbols_to_bits(symbols, self._lsb_depth)
+        stream.write(first, bits[: len(stream) - first])
+
+    def extract_range(self, pixels, permutation, stream, start):
+        depth, stop = self._lsb_depth, start + len(stream)
+        positions = range(start // depth, -(-stop // depth))
+        for first in range(positions.start, positions.stop, self.CHUNK_SIZE):
+            last = min(first + self.CHUNK_SIZE, positions.stop)
+            values = pixels[permutation.take(first, last)]
+            bits = bitops.symbols_to_bits(bitops.get_symbols(values, depth), depth)
+            low = max(start, first * depth)
+            stream.write(low - start, bits[low - first * depth : stop - first * depth])
+
+    def embed_range(self, pixels, permutation, stream, start):
+        depth, stop = self._lsb_depth, start + len(stream)
+        positions = range(start // depth, -(-stop // depth))
+        for first in range(positions.start, positions.stop, self.CHUNK_SIZE):
+            last = min(first + self.CHUNK_SIZE, positions.stop)
+            indices = permutation.take(first, last)
+            values = pixels[indices]
+            # symbols at either end of the range keep the bits outside it
+            bits = bitops.symbols_to_bits(bitops.get_symbols(values, depth), depth)
+            low, high = max(start, first * depth), min(stop, last * depth)
+            bits[low - first * depth : high - first * depth] = stream.read(
+                low - start, high - start
+            )
+            symbols = bitops.bits_to_symbols(bits, depth).astype(values.dtype)
+            pixels[indices] = bitops.embed_symbols(values, symbols, depth)
+
+
+_ENGINES: dict[EngineMode, type[BaseEngine]] = {
+    EngineMode.PLANES: PlaneEngine,
+    EngineMode.SYMBOLS: SymbolEngine,
+}
+
+
+def engine(
+    engine_mode: EngineMode,
+    lsb_depth: int,
+    workers: int = 1,
+    kernels: Backend = None,
+) -> BaseEngine:
+    """
+    Creates an engine.
+    :param engine_mode: Layout of the bit stream across embedding positions.
+    :param lsb_depth: Number of least significant bits available per embedding position.
+    :param workers: Number of threads used to process chunks.
+    :param kernels: Backend of the kernels that embed and extract bits. Defaults to the fastest available backend.
+    :return: Engine for the given layout.
+    """
+    return _ENGINES[EngineMode(engine_mode)](lsb_depth, workers, kernels)
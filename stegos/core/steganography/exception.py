@@ -22,3 +22,15 @@ class InvalidCoverImageException(Exception):
     """Exception raised when a cover image can not be used as a carrier for a payload."""
 
     pass
+
+
+class UnsupportedOperationException(Exception):
+    """Exception raised when a steganography strategy does not support an operation."""
+
+    pass
+
+
+class UnsupportedHeaderException(Exception):
+    """Exception raised when a stego image contains a header that is not supported."""
+
+    pass
@@ -0,0 +1,107 @@
+"""This module provides the versioned header embedded after the seed of a stego image."""
+
+import hashlib
+from dataclasses import dataclass
+
+from stegos.core.steganography.engine import EngineMode
+from stegos.core.steganography.exception import UnsupportedHeaderException
+from stegos.core.steganography.permutation import IndexMode
+
+
+@dataclass(frozen=True)
+class Header:
+    """Header describing how a payload was embedded.
+
+    The header is masked using the seed, so it does not appear as a fixed pattern in the image. Images embedded before
+    the header was introduced do not have one, and are identified by an invalid check value.
+
+    Version 1 stores the payload size in 32 bits. Version 2 stores the payload size in 64 bits.
+
+    Payloads split across the components of an image record the components that carry a segment as a bit mask. A
+    mask of 0 means the payload is embedded in a single component.
+    """
+
+    VERSION = 2
+    SIZE_BYTES = 8
+    CHECK_SIZE_BYTES = 3
+    PAYLOAD_SIZE_BYTES = {1: 4, 2: 8}
+
+    index_mode: IndexMode = IndexMode.FEISTEL
+    engine_mode: EngineMode = EngineMode.PLANES
+    lsb_depth: int = 0  # unspecified
+    version: int = VERSION
+    components: int = 0  # single component
+
+    @property
+    def payload_size_bytes(self) -> int:
+        """
+        Gets the number of bytes used to store the payload size.
+        :return: Payload size length in bytes.
+        """
+        return self.PAYLOAD_SIZE_BYTES[self.version]
+
+    @classmethod
+    def _mask(cls, seed: int) -> bytes:
+        """
+        Gets the mask applied to the header.
+        :param seed: Seed embedded alongside the header.
+        :return: Mask as bytes.
+        """
+        return hashlib.blake2b(
+            seed.to_bytes(8, byteorder="big"),
+            digest_size=cls.SIZE_BYTES,
+            person=b"stegos.header",
+        ).digest()
+
+    @staticmethod
+    def _xor(data: bytes, mask: bytes) -> bytes:
+        return bytes(a ^ b for a, b in zip(data, mask))
+
+    def to_bytes(self, seed: int) -> bytes:
+        """
+        Converts the header to bytes.
+        :param seed: Seed embedded alongside the header.
+        :return: Masked header as bytes.
+        """
+        header = bytes(self.CHECK_SIZE_BYTES) + bytes(
+            [
+                self.version,
+                self.index_mode,
+                self.engine_mode,
+                self.lsb_depth,
+                self.components,
+            ]
+        )
+        return self._xor(header, self._mask(seed))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, seed: int) -> "Header | None":
+        """
+        Reads a header from bytes.
+        :param data: Masked header as bytes.
+        :param seed: Seed embedded alongside the header.
+        :return: Header, or None if the bytes do not contain a header.
+        """
+        if len(data) < cls.SIZE_BYTES:
+            return None
+        header = cls._xor(data, cls._mask(seed))
+        if any(header[: cls.CHECK_SIZE_BYTES]):
+            return None
+
+        version, index_mode, engine_mode, lsb_depth, components = header[
+            cls.CHECK_SIZE_BYTES : cls.SIZE_BYTES
+        ]
+        if not (1 <= version <= cls.VERSION):
+            raise UnsupportedHeaderException(f"unsupported header version {version}")
+        try:
+            return cls(
+                IndexMode(index_mode),
+                EngineMode(engine_mode),
+                lsb_depth,
+                version,
+                components,
+            )
+        except ValueError as e:
+            raise UnsupportedHeaderException(
+                f"unsupported index mode {index_mode} or engine mode {engine_mode}"
+            ) from e
@@ -0,0 +1,186 @@
+"""This module provides backends for the kernels that embed bits in, and extract bits from, embedding positions.
+
+The NumPy backend is always available. The Numba backend fuses each kernel into a single compiled loop, and is only
+available if the optional Numba dependency is installed.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from stegos.core.steganography import bitops
+
+try:
+    import numba
+except ImportError:  # optional dependency
+    numba = None
+
+
+class Backend(ABC):
+    """Abstract class defining the kernels used by engines.
+
+    Kernels modify the image in place at the given indices.
+    """
+
+    @abstractmethod
+    def embed_planes(
+        self, pixels: np.ndarray, indices: np.ndarray, planes: tuple[np.ndarray, ...]
+    ) -> None:
+        """
+        Embeds bits in the bit planes of embedding positions.
+        :param pixels: Flattened image to embed the bits in.
+        :param indices: Embedding positions.
+        :param planes: NumPy array of bits per bit plane, starting at the LSB. Each array covers the first positions.
+        """
+        pass
+
+    @abstractmethod
+    def extract_planes(
+        self, pixels: np.ndarray, indices: np.ndarray, planes: tuple[np.ndarray, ...]
+    ) -> None:
+        """
+        Extracts bits from the bit planes of embedding positions.
+        :param pixels: Flattened image to extract the bits from.
+        :param indices: Embedding positions.
+        :param planes: NumPy array to fill with bits per bit plane, starting at the LSB. Each array covers the first
+        positions.
+        """
+        pass
+
+    @abstractmethod
+    def embed_symbols(
+        self, pixels: np.ndarray, indices: np.ndarray, symbols: np.ndarray, width: int
+    ) -> None:
+        """
+        Embeds symbols in the least significant bits of embedding positions.
+        :param pixels: Flattened image to embed the symbols in.
+        :param indices: Embedding positions.
+        :param symbols: NumPy array of symbols, one per position.
+        :param width: Number of least significant bits per symbol.
+        """
+        pass
+
+    @abstractmethod
+    def extract_symbols(
+        self, pixels: np.ndarray, indices: np.ndarray, symbols: np.ndarray, width: int
+    ) -> None:
+        """
+        Extracts symbols from the least significant bits of embedding positions.
+        :param pixels: Flattened image to extract the symbols from.
+        :param indices: Embedding positions.
+        :param symbols: NumPy array to fill with symbols, one per position.
+        :param width: Number of least significant bits per symbol.
+        """
+        pass
+
+
+class NumPyBackend(Backend):
+    """Backend built from the bitops functions. Each position is gathered and scattered once per kernel."""
+
+    def embed_planes(self, pixels, indices, planes):
+        values = pixels[indices]
+        for bit_index, bits in enumerate(planes):
+            values[: len(bits)] = bitops.embed_bits(
+                values[: len(bits)], bits, bit_index
+            )
+        pixels[indices] = values
+
+    def extract_planes(self, pixels, indices, planes):
+        values = pixels[indices[: len(planes[0])]]
+        for bit_index, bits in enumerate(planes):
+            bits[:] = bitops.get_bit(values[: len(bits)], bit_index)
+
+    def embed_symbols(self, pixels, indices, symbols, width):
+        pixels[indices] = bitops.embed_symbols(pixels[indices], symbols, width)
+
+    def extract_symbols(self, pixels, indices, symbols, width):
+        symbols[:] = bitops.get_symbols(pixels[indices], width)
+
+
+if numba is not None:
+
+    @numba.njit(nogil=True, cache=True)
+    def _embed_plane(pixels, indices, bits, bit_index):
+        mask = ~(1 << bit_index)
+        for i in range(bits.size):
+            pixels[indices[i]] = (pixels[indices[i]] & mask) | (bits[i] << bit_index)
+
+    @numba.njit(nogil=True, cache=True)
+    def _extract_plane(pixels, indices, bits, bit_index):
+        for i in range(bits.size):
+            bits[i] = (pixels[indices[i]] >> bit_index) & 1
+
+    @numba.njit(nogil=True, cache=True)
+    def _embed_symbols(pixels, indices, symbols, width):
+        mask = (1 << width) - 1
+        for i in range(indices.size):
+            pixels[indices[i]] = (pixels[indices[i]] & ~mask) | symbols[i]
+
+    @numba.njit(nogil=True, cache=True)
+    def _extract_symbols(pixels, indices, symbols, width):
+        mask = (1 << width) - 1
+        for i in range(indices.size):
+            symbols[i] = pixels[indices[i]] & mask
+
+
+class NumbaBackend(Backend):
+    """Backend that fuses each kernel into a single compiled loop, without temporary arrays.
+
+    Kernels release the GIL, so they run in parallel when chunks are processed on a thread pool.
+    """
+
+    def __init__(self):
+        """Creates an instance of NumbaBackend."""
+        if numba is None:
+            raise ImportError("the Numba backend requires numba to be installed")
+
+    def embed_planes(self, pixels, indices, planes):
+        for bit_index, bits in enumerate(planes):
+            _embed_plane(pixels, indices, bits, bit_index)
+
+    def extract_planes(self, pixels, indices, planes):
+        for bit_index, bits in enumerate(planes):
+            _extract_plane(pixels, indices, bits, bit_index)
+
+    def embed_symbols(self, pixels, indices, symbols, width):
+        _embed_symbols(pixels, indices, symbols, width)
+
+    def extract_symbols(self, pixels, indices, symbols, width):
+        _extract_symbols(pixels, indices, symbols, width)
+
+
+_BACKENDS: dict[str, type[Backend]] = {"numpy": NumPyBackend}
+if numba is not None:
+    _BACKENDS["numba"] = NumbaBackend
+
+
+def register_backend(name: str, backend: type[Backend]) -> None:
+    """
+    Registers a backend, so it can be selected by name.
+    :param name: Name of the backend.
+    :param backend: Backend class.
+    """
+    _BACKENDS[name] = backend
+
+
+def available_backends() -> list[str]:
+    """
+    Gets the names of the registered backends.
+    :return: Names of the backends, in order of registration.
+    """
+    return list(_BACKENDS)
+
+
+def backend(name: str = None) -> Backend:
+    """
+    Creates a backend.
+    :param name: Name of the backend. Defaults to Numba if it is installed, otherwise NumPy.
+    :return: Backend for the given name.
+    """
+    if name is None:
+        name = "numba" if "numba" in _BACKENDS else "numpy"
+    if name not in _BACKENDS:
+        raise ValueError(
+            f"unknown backend {name!r} (expected one of {available_backends()})"
+        )
+    return _BACKENDS[name]()
@@ -0,0 +1,340 @@
+"""This module provides keyed permutations of the embedding positions of an image."""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+
+import numpy as np
+
+
+class IndexMode(IntEnum):
+    """Methods of generating randomised embedding positions."""
+
+    SHUFFLE = 0
+    FEISTEL = 1
+    TILED = 2
+    PHILOX = 3
+
+
+def index_dtype(size: int) -> np.dtype:
+    """
+    Gets the narrowest data type that can hold every index of an array.
+    :param size: Number of elements in the array.
+    :return: Unsigned 32-bit integers if the array has at most 2^32 elements, otherwise signed 64-bit integers.
+    """
+    return np.dtype(np.uint32 if size <= 2**32 else np.int64)
+
+
+class IndexPermutation(ABC):
+    """Abstract class defining a seeded permutation of the embedding positions of an image.
+
+    Permutes the indices in the range [offset, size), allowing a leading region of the image to be reserved. Indices
+    are unsigned 32-bit integers unless the image has more than 2^32 elements.
+    """
+
+    def __init__(self, seed: int, size: int, offset: int = 0):
+        """
+        Creates an instance of the IndexPermutation class.
+        :param seed: Seed used to generate the permutation.
+        :param size: Number of elements in the image.
+        :param offset: Number of leading elements to exclude from the permutation.
+        """
+        self._seed = seed
+        self._size = size
+        self._offset = min(offset, size)
+        self._dtype = index_dtype(size)
+
+    def __len__(self) -> int:
+        return self._size - self._offset
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        Gets the data type of the indices.
+        :return: Narrowest data type that can hold every index of the image.
+        """
+        return self._dtype
+
+    @abstractmethod
+    def take(self, start: int, stop: int) -> np.ndarray:
+        """
+        Gets a range of the permuted indices.
+        :param start: Position of the first index to get.
+        :param stop: Position after the last index to get.
+        :return: NumPy array of permuted indices.
+        """
+        pass
+
+
+class ShuffledPermutation(IndexPermutation):
+    """Permutation generated by shuffling every index of the image.
+
+    Memory and time scale with the size of the image, regardless of how many indices are taken.
+    """
+
+    def __init__(self, seed, size, offset=0):
+        super().__init__(seed, size, offset)
+        self._indices = None
+        self._lock = threading.Lock()
+
+    def take(self, start, stop):
+        with self._lock:  # generated once, even if taken from multiple threads
+            if self._indices is None:
+                # same order as permutation(size), without an int64 copy of every index
+                indices = np.arange(self._size, dtype=self.dtype)
+                np.random.default_rng(self._seed).shuffle(indices)
+                self._indices = indices[indices >= self._offset]
+        return self._indices[start:stop]
+
+
+class _FeistelNetwork:
+    """Keyed Feistel network over the integers in the range [0, size), restricted using cycle walking."""
+
+    ROUNDS = 4
+
+    def __init__(self, seed: int, size: int):
+        """
+        Creates an instance of the _FeistelNetwork class.
+        :param seed: Seed used to generate the round keys.
+        :param size: Number of integers to permute.
+        """
+        self._size = np.uint64(size)
+        half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._half_bits = np.uint64(half_bits)
+        self._half_mask = np.uint64((1 << half_bits) - 1)
+        self._keys = np.random.SeedSequence(seed).generate_state(self.ROUNDS, np.uint64)
+
+    @staticmethod
+    def mix(values: np.ndarray) -> np.ndarray:
+        """
+        Mixes the bits of integers (SplitMix64 finaliser).
+        :param values: NumPy array of unsigned 64-bit integers.
+        :return: NumPy array of mixed integers.
+        """
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+    def _encrypt(self, values: np.ndarray, tweak) -> np.ndarray:
+        """
+        Applies the Feistel network to integers.
+        :param values: NumPy array of unsigned 64-bit integers within the domain of the network.
+        :param tweak: Value(s) combined with the round keys, giving a different permutation per tweak.
+        :return: NumPy array of permuted integers within the domain of the network.
+        """
+        left, right = values >> self._half_bits, values & self._half_mask
+        for key in self._keys:
+            left, right = right, left ^ (
+                self.mix(right ^ key ^ tweak) & self._half_mask
+            )
+        return (left << self._half_bits) | right
+
+    def permute(self, values: np.ndarray, tweak=np.uint64(0)) -> np.ndarray:
+        """
+        Permutes integers.
+        :param values: NumPy array of unsigned 64-bit integers in the range [0, size).
+        :param tweak: Value, or NumPy array of values per integer, giving a different permutation per tweak.
+        :return: NumPy array of permuted integers in the range [0, size).
+        """
+        values = self._encrypt(values, tweak)
+        walking = np.flatnonzero(values >= self._size)
+        while walking.size:  # cycle walk until every integer is within the range
+            tweaks = tweak if np.ndim(tweak) == 0 else tweak[walking]
+            values[walking] = self._encrypt(values[walking], tweaks)
+            walking = walking[values[walking] >= self._size]
+        return values
+
+
+class FeistelPermutation(IndexPermutation):
+    """Permutation generated by a keyed Feistel network, restricted to the image using cycle walking.
+
+    Indices are computed independently of each other, so memory and time scale with the number of indices taken.
+    """
+
+    def __init__(self, seed, size, offset=0):
+        super().__init__(seed, size, offset)
+        self._network = _FeistelNetwork(seed, len(self))
+
+    def take(self, start, stop):
+        stop = min(stop, len(self))
+        if start >= stop:
+            return np.empty(0, dtype=self.dtype)
+
+        indices = self._network.permute(np.arange(start, stop, dtype=np.uint64))
+        return (indices + np.uint64(self._offset)).astype(self.dtype)
+
+
+class TiledPermutation(IndexPermutation):
+    """Two-level permutation that shuffles fixed-size tiles of the image, then shuffles the indices within each tile.
+
+    Consecutive indices stay within the same tile, keeping accesses within cache-sized regions of the image. The
+    partial tile at the end of the image, if any, is always the last tile.
+    """
+
+    TILE_SIZE = 2**16
+
+    def __init__(self, seed, size, offset=0):
+        super().__init__(seed, size, offset)
+        self._full_tiles, remainder = divmod(len(self), self.TILE_SIZE)
+        self._tiles = (
+            np.random.default_rng(seed).permutation(self._full_tiles).astype(np.uint64)
+        )
+        self._network = _FeistelNetwork(seed, self.TILE_SIZE)
+        self._remainder_network = _FeistelNetwork(seed, max(remainder, 1))
+
+    def take(self, start, stop):
+        stop = min(stop, len(self))
+        if start >= stop:
+            return np.empty(0, dtype=self.dtype)
+
+        tile_size = np.uint64(self.TILE_SIZE)
+        ranks, positions = np.divmod(np.arange(start, stop, dtype=np.uint64), tile_size)
+        full = ranks < self._full_tiles
+        indices = np.empty_like(positions)
+
+        tiles = self._tiles[ranks[full]]
+        indices[full] = tiles * tile_size + self._network.permute(
+            positions[full], _FeistelNetwork.mix(tiles)
+        )
+        indices[~full] = self._full_tiles * tile_size + self._remainder_network.permute(
+            positions[~full]
+        )
+        return (indices + np.uint64(self._offset)).astype(self.dtype)
+
+
+class PhiloxPermutation(IndexPermutation):
+    """Permutation generated in parallel using the counter-based Philox generator.
+
+    Every index is assigned to a random bucket, and each bucket is then shuffled. Each chunk of bucket assignments and
+    each bucket shuffle uses its own jumped Philox stream, so they are generated independently on a thread pool. The
+    permutation is the same regardless of the number of threads.
+    """
+
+    CHUNK_SIZE = 2**20
+    BUCKET_SIZE = 2**20
+    MAX_BUCKETS = 2**16
+
+    def __init__(self, seed, size, offset=0, workers: int = None):
+        """
+        Creates an instance of the PhiloxPermutation class.
+        :param seed: Seed used to generate the permutation.
+        :param size: Number of elements in the image.
+        :param offset: Number of leading elements to exclude from the permutation.
+        :param workers: Number of threads used to generate the permutation. Defaults to the number of CPUs.
+        """
+        super().__init__(seed, size, offset)
+        self._workers = workers or os.cpu_count()
+        self._key = np.random.SeedSequence(seed).generate_state(2, np.uint64)
+        self._indices = None
+        self._lock = threading.Lock()
+
+    def _generator(self, stream: int) -> np.random.Generator:
+        """
+        Gets an independent random number generator.
+        :param stream: Position of the stream.
+        :return: Random number generator for the stream.
+        """
+        return np.random.Generator(np.random.Philox(key=self._key).jumped(stream))
+
+    def _generate(self) -> np.ndarray:
+        """
+        Generates every permuted index.
+
+        Bucket assignments are grouped by bucket chunk by chunk, so each chunk is sorted on its own thread and written
+        straight into its place in the permutation, in the data type of the indices.
+        :return: NumPy array of permuted indices.
+        """
+        size = len(self)
+        buckets = min(max(size // self.BUCKET_SIZE, 1), self.MAX_BUCKETS)
+        chunks = range(0, size, self.CHUNK_SIZE)
+        keys = np.empty(size, dtype=np.uint16)
+        counts = np.empty((len(chunks), buckets), dtype=np.int64)
+
+        def assign(chunk: int) -> None:
+            start = chunk * self.CHUNK_SIZE
+            assigned = keys[start : start + self.CHUNK_SIZE]
+            assigned[:] = self._generator(chunk).integers(
+                buckets, size=len(assigned), dtype=np.uint16
+            )
+            counts[chunk] = np.bincount(assigned, minlength=buckets)
+
+        with ThreadPoolExecutor(self._workers) as executor:
+            list(executor.map(assign, range(len(chunks))))
+            totals = counts.sum(axis=0)
+            bounds = np.cumsum(totals)
+            # position in the permutation of the first index of each chunk in each bucket
+            firsts = np.cumsum(counts, axis=0) - counts
+            firsts += bounds - totals
+            indices = np.empty(size, dtype=self.dtype)
+
+            def group(chunk: int) -> None:
+                start = chunk * self.CHUNK_SIZE
+                order = np.argsort(keys[start : start + self.CHUNK_SIZE], kind="stable")
+                order += start + self._offset
+                ends = np.cumsum(counts[chunk])
+                for first, end, count in zip(firsts[chunk], ends, counts[chunk]):
+                    indices[first : first + count] = order[end - count : end]
+
+            list(executor.map(group, range(len(chunks))))
+            del keys
+
+            def shuffle(bucket: int) -> None:
+                start = bounds[bucket - 1] if bucket else 0
+                self._generator(len(chunks) + bucket).shuffle(
+                    indices[start : bounds[bucket]]
+                )
+
+            list(executor.map(shuffle, range(buckets)))
+        return indices
+
+    def take(self, start, stop):
+        with self._lock:  # generated once, even if taken from multiple threads
+            if self._indices is None:
+                self._indices = self._generate()
+        return self._indices[start:stop]
+
+
+class MappedPermutation(IndexPermutation):
+    """Permutation of a subset of the elements of an image, given by their positions.
+
+    Permutes the positions of the subset instead of a copy of its elements, so embedding only writes to the elements
+    it changes.
+    """
+
+    def __init__(self, permutation: IndexPermutation, positions: np.ndarray):
+        """
+        Creates an instance of the MappedPermutation class.
+        :param permutation: Permutation of the indices of the subset.
+        :param positions: NumPy array of the positions of the subset in the image.
+        """
+        super().__init__(permutation._seed, permutation._size, permutation._offset)
+        self._permutation = permutation
+        self._positions = positions
+        self._dtype = positions.dtype
+
+    def take(self, start, stop):
+        return self._positions[self._permutation.take(start, stop)]
+
+
+_PERMUTATIONS: dict[IndexMode, type[IndexPermutation]] = {
+    IndexMode.SHUFFLE: ShuffledPermutation,
+    IndexMode.FEISTEL: FeistelPermutation,
+    IndexMode.TILED: TiledPermutation,
+    IndexMode.PHILOX: PhiloxPermutation,
+}
+
+
+def permutation(
+    index_mode: IndexMode, seed: int, size: int, offset: int = 0
+) -> IndexPermutation:
+    """
+    Creates a permutation of the embedding positions of an image.
+    :param index_mode: Method of generating the permutation.
+    :param seed: Seed used to generate the permutation.
+    :param size: Number of elements in the image.
+    :param offset: Number of leading elements to exclude from the permutation.
+    :return: Permutation of the embedding positions.
+    """
+    return _PERMUTATIONS[IndexMode(index_mode)](seed, size, offset)
@@ -1,9 +1,18 @@
 import io
+import os
 import zipfile
 
 import pytest
 
-from stegos.core.compression.file import ZipCompressor
+from stegos.core.compression import file as file_module
+from stegos.core.compression.exception import DecompressionLimitException
+from stegos.core.compression.file import (
+    DecompressionLimits,
+    SizeCounter,
+    ZipCompressor,
+    copy_limited,
+    unique_name,
+)
 
 
 @pytest.fixture
@@ -70,3 +79,123 @@ class TestZipCompressor:
         compressed = compressor.compress([file1, file2])
         contents = [content for _, content in compressor.decompress(compressed)]
         assert contents == [file_content, file_content2]
+
+    def test_decompress_to(self, compressor, tmp_path):
+        """Decompressing to a directory should write each file under its basename."""
+        files = [tmp_path / f"file{i}" for i in range(5)]
+        for i, file in enumerate(files):
+            file.write_bytes(os.urandom(i * 1000))
+        output = tmp_path / "output"
+        output.mkdir()
+
+        paths = compressor.decompress_to(compressor.compress(files), output, workers=3)
+        assert paths == [output / file.name for file in files]
+        for file, path in zip(files, paths):
+            assert path.read_bytes() == file.read_bytes()
+
+    def test_decompress_to_chunks(self, compressor, tmp_path, monkeypatch):
+        """Files larger than a chunk should be written in multiple chunks."""
+        monkeypatch.setattr(file_module, "CHUNK_SIZE", 100)
+        file = tmp_path / "file"
+        file.write_bytes(os.urandom(1050))
+        output = tmp_path / "output"
+        output.mkdir()
+
+        (path,) = compressor.decompress_to(compressor.compress(file), output)
+        assert path.read_bytes() == file.read_bytes()
+
+    @pytest.mark.filterwarnings("ignore::UserWarning:zipfile")  # intended warning
+    def test_decompress_to_duplicates(self, compressor, tmp_path):
+        """Files with the same name should be numbered, not overwritten."""
+        file1, file2 = tmp_path / "file.txt", tmp_path / "dir" / "file.txt"
+        file1.write_bytes(b"File Content")
+        file2.parent.mkdir()
+        file2.write_bytes(b"File Content (Duplicated)")
+        output = tmp_path / "output"
+        output.mkdir()
+
+        paths = compressor.decompress_to(compressor.compress([file1, file2]), output)
+        assert [path.name for path in paths] == ["file.txt", "file (1).txt"]
+        assert [path.read_bytes() for path in paths] == [
+            file1.read_bytes(),
+            file2.read_bytes(),
+        ]
+
+    def test_decompress_to_existing(self, compressor, tmp_path):
+        """Existing files should only be overwritten if allowed."""
+        file = tmp_path / "file"
+        file.write_bytes(b"File Content")
+        archive = compressor.compress(file)
+        with pytest.raises(FileExistsError):
+            compressor.decompress_to(archive, tmp_path)
+        (tmp_path / "file").write_bytes(b"Other Content")
+        compressor.decompress_to(archive, tmp_path, overwrite=True)
+        assert file.read_bytes() == b"File Content"
+
+    def test_decompress_to_unsafe_name(self, compressor, tmp_path):
+        """Files should not be written outside the directory."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            zf.writestr("../../escaped", b"File Content")
+        output = tmp_path / "a" / "b"
+        output.mkdir(parents=True)
+
+        (path,) = compressor.decompress_to(buffer.getvalue(), output)
+        assert path == output / "escaped"
+
+    @pytest.mark.parametrize(
+        "limits",
+        [DecompressionLimits(max_size=10**5), DecompressionLimits(max_ratio=100)],
+    )
+    def test_decompress_to_limits(self, compressor, tmp_path, limits):
+        """Archives exceeding the limits should be rejected before anything is written."""
+        file = tmp_path / "file"
+        file.write_bytes(bytes(10**6))
+        output = tmp_path / "output"
+        output.mkdir()
+
+        with pytest.raises(DecompressionLimitException):
+            compressor.decompress_to(compressor.compress(file), output, limits)
+        assert not any(output.iterdir())
+
+    def test_decompress_to_understated_size(self, compressor, tmp_path):
+        """Files decompressing past the limit should be removed, even if their declared size is within it."""
+        limits = DecompressionLimits(max_size=1000)
+        output = tmp_path / "output"
+        output.mkdir()
+        counter = SizeCounter(limits, 10)
+
+        with pytest.raises(DecompressionLimitException):
+            copy_limited(io.BytesIO(bytes(2000)), output / "file", counter)
+        assert not any(output.iterdir())
+
+
+class TestDecompressionLimits:
+    """Tests for DecompressionLimits."""
+
+    def test_check(self):
+        """Sizes within the limits should be accepted."""
+        DecompressionLimits(max_size=100, max_ratio=10).check(100, 10)
+        DecompressionLimits(max_size=None, max_ratio=None).check(2**40, 1)
+
+    @pytest.mark.parametrize("size, compressed_size", [(101, 100), (11, 1)])
+    def test_check_exceeded(self, size, compressed_size):
+        """Sizes exceeding either limit should raise an exception."""
+        with pytest.raises(DecompressionLimitException):
+            DecompressionLimits(max_size=100, max_ratio=10).check(size, compressed_size)
+
+
+class TestUniqueName:
+    """Tests for unique_name."""
+
+    def test_unique_name(self):
+        """Repeated names should be numbered in order."""
+        used = set()
+        names = [unique_name(name, used) for name in ["a.txt", "a.txt", "b", "a.txt"]]
+        assert names == ["a.txt", "a (1).txt", "b", "a (2).txt"]
+
+    @pytest.mark.parametrize("name", ["", ".", ".."])
+    def test_unique_name_invalid(self, name):
+        """Names that are not files should raise an exception."""
+        with pytest.raises(ValueError):
+            unique_name(name, set())
@@ -0,0 +1,23 @@
+import pytest
+
+from stegos.core.service import LSBSteganographyService
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+from tests.core.steganography.decorators.test_encryption import _lightweight_argon2
+
+
+class _LightweightService(LSBSteganographyService):
+    """Service using a lightweight key derivation function, for testing purposes."""
+
+    def _strategy(self, comp_type, image, password):
+        strategy = super()._strategy(comp_type, image, password)
+        return EncryptionDecorator(strategy.strategy, password, _lightweight_argon2)
+
+
+@pytest.fixture
+def lightweight_kdf():
+    return _lightweight_argon2
+
+
+@pytest.fixture
+def lightweight_service() -> LSBSteganographyService:
+    return _LightweightService()
@@ -0,0 +1,249 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from stegos.core.steganography import bitops
+from stegos.core.steganography.algorithms.lossy import (
+    ComponentLossyLSBSteganography,
+    LossyLSBSteganography,
+)
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
+from stegos.core.steganography.engine import EngineMode
+from stegos.core.steganography.exception import (
+    InsufficientCapacityException,
+    InvalidCoverImageException,
+    UnsupportedOperationException,
+)
+
+
+def create_coefficients(size: int = 4096) -> np.ndarray:
+    """
+    Creates sample DCT coefficients, most of which are zero or small.
+    :param size: Number of coefficients.
+    :return: NumPy array of coefficients.
+    """
+    rng = np.random.default_rng(seed=1)
+    return np.round(rng.laplace(scale=4, size=(size // 64, 64))).astype(np.int16)
+
+
+@pytest.fixture()
+def steg():
+    return LossyLSBSteganography()
+
+
+class TestLossyLSBSteganography:
+    """Tests for LossyLSBSteganography."""
+
+    @pytest.mark.parametrize("engine_mode", list(EngineMode))
+    def test_embed_extract(self, steg, engine_mode):
+        """Embedding and extracting a payload should return the original payload."""
+        coefs, payload = create_coefficients(), b"Embedded Payload"
+        LossyLSBSteganography(engine_mode=engine_mode).embed(coefs, payload)
+        assert steg.extract(coefs) == payload
+
+    def test_embed_eligible_coefficients(self, steg):
+        """Only the LSBs of coefficients with bits set above the LSB depth should change."""
+        coefs = create_coefficients()
+        original = coefs.copy()
+        steg.embed(coefs, b"Embedded Payload")
+        eligible = bitops.has_msbs_set(original, steg.lsb_depth)
+        assert np.array_equal(coefs[~eligible], original[~eligible])
+        assert np.array_equal(coefs >> steg.lsb_depth, original >> steg.lsb_depth)
+
+    def test_extract_masked_copy(self, steg):
+        """Payloads embedded in a copy of the eligible coefficients should be extractable."""
+        coefs, payload = create_coefficients(), b"Embedded Payload"
+        mask = bitops.has_msbs_set(coefs, steg.lsb_depth)
+        masked = coefs[mask]
+        LSBSteganography().embed(masked, payload)
+        coefs[mask] = masked
+        assert steg.extract(coefs) == payload
+
+    def test_eligible_positions(self, monkeypatch, steg):
+        """Eligible positions should match the mask of eligible coefficients, across chunks."""
+        monkeypatch.setattr(LossyLSBSteganography, "CHUNK_SIZE", 100)
+        coefs = create_coefficients().ravel()
+        positions = steg._eligible_positions(coefs)
+        assert positions.dtype == np.uint32
+        assert np.array_equal(
+            positions, np.flatnonzero(bitops.has_msbs_set(coefs, steg.lsb_depth))
+        )
+
+    def test_validate_elements_unsupported(self, steg):
+        """Validating from the number of coefficients should raise an exception, as capacity depends on their values."""
+        assert not steg.validates_elements
+        with pytest.raises(UnsupportedOperationException):
+            steg.validate_elements(4096, 1)
+
+    def test_max_lsb_depth_unsupported(self):
+        """Creating an instance with a maximum depth should raise an exception, as the depth is fixed."""
+        with pytest.raises(ValueError):
+            LossyLSBSteganography(max_lsb_depth=4)
+
+
+def create_components() -> list[np.ndarray]:
+    """
+    Creates sample DCT coefficients of a luminance component and two subsampled chrominance components.
+    :return: List of NumPy arrays of coefficients, one per component.
+    """
+    return [
+        create_coefficients(4096),
+        create_coefficients(1024),
+        create_coefficients(1024),
+    ]
+
+
+@pytest.fixture()
+def component_steg():
+    return ComponentLossyLSBSteganography()
+
+
+class TestComponentLossyLSBSteganography:
+    """Tests for ComponentLossyLSBSteganography."""
+
+    @pytest.mark.parametrize("size", [1, 16, 500])
+    def test_embed_extract(self, component_steg, size):
+        """Embedding and extracting a payload split across components should return the original payload."""
+        components = create_components()
+        payload = np.random.default_rng(seed=1).bytes(size)
+        component_steg.embed(components, payload)
+        assert component_steg.extract(components) == payload
+
+    def test_embed_every_component(self, component_steg):
+        """Payloads should be split across every component with capacity."""
+        components = create_components()
+        originals = [coefs.copy() for coefs in components]
+        component_steg.embed(components, bytes(100))
+        assert all(
+            not np.array_equal(coefs, original)
+            for coefs, original in zip(components, originals)
+        )
+
+    def test_embed_extract_capacity(self, component_steg):
+        """Payloads larger than the first component should fit in the combined capacity of the components."""
+        components = create_components()
+        capacities = [
+            component_steg._payload_capacity(
+                component_steg._eligible_positions(coefs.ravel())
+            )
+            for coefs in components
+        ]
+        payload = np.random.default_rng(seed=1).bytes(sum(capacities))
+        component_steg.embed(components, payload)
+        assert component_steg.extract(components) == payload
+        with pytest.raises(InsufficientCapacityException):
+            component_steg.embed(create_components(), payload + b"E")
+
+    def test_extract_single_component(self, component_steg):
+        """Payloads embedded in the first component only should be extractable."""
+        components, payload = create_components(), b"Embedded Payload"
+        LossyLSBSteganography().embed(components[0], payload)
+        assert component_steg.extract(components) == payload
+
+    def test_extract_missing_component(self, component_steg):
+        """Extracting a payload from an image missing a component should raise an exception."""
+        components = create_components()
+        component_steg.embed(components, bytes(100))
+        with pytest.raises(InvalidCoverImageException):
+            component_steg.extract(components[:2])
+
+    @pytest.mark.parametrize("size", [1, 16, 500])
+    def test_extract_prefix(self, component_steg, size):
+        """Extracting a prefix should return the leading bytes, even if they span multiple segments."""
+        components = create_components()
+        payload = np.random.default_rng(seed=1).bytes(500)
+        component_steg.embed(components, payload)
+        assert component_steg.extract_prefix(components, size) == payload[:size]
+
+    def test_validate(self, component_steg):
+        """Validation should accept payloads up to the combined capacity of the components."""
+        components = create_components()
+        capacity = sum(
+            component_steg._payload_capacity(
+                component_steg._eligible_positions(coefs.ravel())
+            )
+            for coefs in components
+        )
+        component_steg.validate(components, capacity)
+        with pytest.raises(InsufficientCapacityException):
+            component_steg.validate(components, capacity + 1)
+
+    def test_segment_sizes(self):
+        """Segments should be proportional to capacity, never exceed capacity and always include the first."""
+        segment_sizes = ComponentLossyLSBSteganography._segment_sizes
+        assert segment_sizes(100, [50, 25, 25]) == [50, 25, 25]
+        assert segment_sizes(1, [10, 1000, 0]) == [1, 0, 0]
+        assert segment_sizes(1010, [10, 1000, -5]) == [10, 1000, 0]
+
+    def test_probe(self, component_steg):
+        """Probing should read the start of the payload from the first component."""
+        coefs, payload = create_components(), bytes(range(200))
+        component_steg.embed(coefs, payload)
+        probe = component_steg.probe(coefs, 16)
+        assert probe.header.components > 1
+        assert 0 < probe.payload_size < len(payload)
+        assert probe.prefix == payload[:16]
+
+    @pytest.mark.parametrize("start, stop", [(0, 16), (100, 400), (490, 600)])
+    def test_reader(self, component_steg, start, stop):
+        """Reading a range should return the same bytes as extraction, even if the range spans multiple segments."""
+        components = create_components()
+        payload = np.random.default_rng(seed=1).bytes(500)
+        component_steg.embed(components, payload)
+        reader = component_steg.reader(components)
+        assert reader.size == len(payload)
+        assert reader.read(start, stop) == payload[start:stop]
+
+    def test_write(self, component_steg):
+        """Writing a range should overwrite each segment it overlaps, and extend the last segment."""
+        components = create_components()
+        payload = bytearray(np.random.default_rng(seed=1).bytes(500))
+        component_steg.embed(components, bytes(payload))
+        component_steg.write(components, 100, bytes(300))
+        component_steg.write(components, 500, b"Extended Payload")
+        payload[100:400] = bytes(300)
+        payload += b"Extended Payload"
+        assert component_steg.extract(components) == payload
+
+    def test_prepare(self, monkeypatch, component_steg):
+        """Operations on prepared coefficients should find the eligible coefficients of each component once."""
+        components, payload = create_components(), b"Embedded Payload" * 20
+        scanned = []
+        find = component_steg._eligible_positions
+        monkeypatch.setattr(
+            component_steg,
+            "_eligible_positions",
+            lambda coefs: scanned.append(coefs.size) or find(coefs),
+        )
+        prepared = component_steg.prepare(components)
+        component_steg.validate(prepared, len(payload))
+        component_steg.embed(prepared, payload)
+        assert component_steg.extract(prepared) == payload
+        assert sorted(scanned) == sorted(c.size for c in components)
+        assert ComponentLossyLSBSteganography().extract(components) == payload
+
+    def test_prepare_other_depth(self, component_steg):
+        """Coefficients prepared at another depth should be scanned again at the depth of the strategy."""
+        components, payload = create_components(), b"Embedded Payload"
+        prepared = ComponentLossyLSBSteganography(lsb_depth=1).prepare(components)
+        component_steg.embed(prepared, payload)
+        assert component_steg.extract(components) == payload
+
+    def test_invalid_component_workers(self):
+        """Creating an instance with no component workers should raise an exception."""
+        with pytest.raises(ValueError):
+            ComponentLossyLSBSteganography(component_workers=0)
+
+    @pytest.mark.integration
+    def test_embed_extract_jpeg(self, tmp_path, component_steg):
+        """Payloads embedded across the components of a JPEG should survive saving it."""
+        jio = pytest.importorskip("jpegio")
+        path = tmp_path / "cover.jpg"
+        Image.fromarray(
+            np.random.default_rng(seed=1).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        ).save(path, quality=90)
+        jpeg, payload = jio.read(str(path)), b"Embedded Payload" * 4
+        component_steg.embed(jpeg.coef_arrays, payload)
+        jio.write(jpeg, str(path))
+        stego = jio.read(str(path))  # owns the memory of its coefficients
+        assert component_steg.extract(stego.coef_arrays) == payload
@@ -1,14 +1,21 @@
+import secrets
+from dataclasses import dataclass
 from io import BytesIO
 
 import numpy as np
 import pytest
 from PIL import Image
 
+from stegos.core.steganography import bitops
+from stegos.core.steganography.algorithms import lsb
 from stegos.core.steganography.algorithms.lsb import LSBSteganography
 from stegos.core.steganography.exception import (
     InsufficientCapacityException,
     InvalidCoverImageException,
 )
+from stegos.core.steganography.engine import BaseEngine, EngineMode
+from stegos.core.steganography.header import Header
+from stegos.core.steganography.permutation import IndexMode
 from tests.core.steganography.util import create_image
 
 
@@ -23,6 +30,27 @@ def lossless_compression(stego_image: np.ndarray) -> np.ndarray:
     return np.array(Image.open(buf))
 
 
+def original_embed(cover_image: np.ndarray, payload: bytes, seed: int) -> None:
+    """
+    Embeds a payload using the original format, which has no header and shuffles every index.
+    :param cover_image: Cover image used as the carrier of the payload.
+    :param payload: Payload to embed inside the cover image.
+    :param seed: Seed used to randomise embedding positions.
+    """
+    pixels = cover_image.ravel()
+    seed_bits = bitops.int_to_bits(seed, 4)
+    pixels[:32] = bitops.embed_bits(pixels[:32], seed_bits, 0)
+    indices = np.random.default_rng(seed).permutation(pixels.size)
+    indices = indices[indices >= 32]
+    payload_bits = bitops.bytes_to_bits(payload)
+    payload_bits = np.concatenate(
+        [bitops.int_to_bits(len(payload_bits), 4), payload_bits]
+    )
+    pixels[indices[: len(payload_bits)]] = bitops.embed_bits(
+        pixels[indices[: len(payload_bits)]], payload_bits, 0
+    )
+
+
 @pytest.fixture()
 def steg():
     return LSBSteganography()
@@ -59,6 +87,13 @@ class TestLSBSteganography:
         steg.embed(cover_image, payload)
         assert steg.extract(cover_image) == payload
 
+    @pytest.mark.parametrize("size", [0, 1, 16, 100])
+    def test_extract_prefix(self, steg, size):
+        """Extracting a prefix should return up to the given number of leading bytes of the payload."""
+        cover_image, payload = create_image(), b"Embedded Payload"
+        steg.embed(cover_image, payload)
+        assert steg.extract_prefix(cover_image, size) == payload[:size]
+
     def test_extract_different_instances(self, steg):
         """Extraction should be instance-independent, as long as the instance has sufficient depth."""
         cover_image, payload = create_image(), b"Embedded Payload"
@@ -66,6 +101,144 @@ class TestLSBSteganography:
         assert LSBSteganography().extract(cover_image) == payload
         assert LSBSteganography(steg.lsb_depth + 1).extract(cover_image) == payload
 
+    @pytest.mark.parametrize("index_mode", list(IndexMode))
+    def test_embed_extract_index_modes(self, index_mode):
+        """Extraction should use the index mode recorded in the header, regardless of the instance."""
+        cover_image, payload = create_image(), b"Embedded Payload"
+        LSBSteganography(index_mode=index_mode).embed(cover_image, payload)
+        assert LSBSteganography().extract(cover_image) == payload
+
+    @pytest.mark.parametrize("engine_mode", list(EngineMode))
+    @pytest.mark.parametrize("lsb_depth", range(1, 8))
+    def test_embed_extract_engine_modes(self, engine_mode, lsb_depth):
+        """Extraction should use the engine mode and depth recorded in the header, regardless of the instance."""
+        cover_image = create_image()
+        steg = LSBSteganography(lsb_depth, engine_mode=engine_mode)
+        payload = np.random.default_rng(seed=1).bytes(
+            steg._payload_capacity(cover_image.ravel())
+        )
+        steg.embed(cover_image, payload)
+        assert LSBSteganography().extract(cover_image) == payload
+
+    @pytest.mark.parametrize("engine_mode", list(EngineMode))
+    def test_embed_extract_chunks(self, monkeypatch, engine_mode):
+        """Embedding and extracting should work when the payload spans many unaligned chunks."""
+        monkeypatch.setattr(BaseEngine, "CHUNK_SIZE", 7)
+        cover_image = create_image()
+        steg = LSBSteganography(3, engine_mode=engine_mode)
+        payload = np.random.default_rng(seed=1).bytes(
+            steg._payload_capacity(cover_image.ravel())
+        )
+        steg.embed(cover_image, payload)
+        assert steg.extract(cover_image) == payload
+
+    @pytest.mark.parametrize("engine_mode", list(EngineMode))
+    @pytest.mark.parametrize("index_mode", list(IndexMode))
+    def test_embed_extract_workers(self, monkeypatch, engine_mode, index_mode):
+        """Embedding chunks on multiple threads should give the same image as embedding them serially."""
+        monkeypatch.setattr(BaseEngine, "CHUNK_SIZE", 7)
+        monkeypatch.setattr(secrets, "randbits", lambda k: 1)
+        payload = b"Embedded Payload"
+        serial, threaded = create_image(), create_image()
+        LSBSteganography(3, index_mode, engine_mode).embed(serial, payload)
+        LSBSteganography(3, index_mode, engine_mode, workers=4).embed(threaded, payload)
+        assert np.array_equal(serial, threaded)
+        assert LSBSteganography(workers=4).extract(threaded) == payload
+
+    @pytest.mark.parametrize("engine_mode", list(EngineMode))
+    @pytest.mark.parametrize("lsb_depth", range(1, 5))
+    def test_embed_extract_max_lsb_depth(self, engine_mode, lsb_depth):
+        """Payloads should be embedded at the smallest depth that fits them, which extraction reads from the header."""
+        cover_image = create_image()
+        original = cover_image.copy()
+        steg = LSBSteganography(engine_mode=engine_mode, max_lsb_depth=4)
+        payload = np.random.default_rng(seed=1).bytes(
+            steg._payload_capacity(cover_image.ravel(), lsb_depth)
+        )
+        steg.embed(cover_image, payload)
+        assert np.array_equal(cover_image >> lsb_depth, original >> lsb_depth)
+        assert LSBSteganography(1).extract(cover_image) == payload
+
+    def test_embed_max_lsb_depth_exceeds_capacity(self):
+        """Embedding a payload that does not fit at the maximum depth should raise an exception."""
+        cover_image = create_image()
+        steg = LSBSteganography(max_lsb_depth=3)
+        with pytest.raises(InsufficientCapacityException):
+            steg.embed(
+                cover_image, bytes(steg._payload_capacity(cover_image.ravel()) + 1)
+            )
+
+    def test_invalid_max_lsb_depth(self):
+        """Creating an instance with an invalid maximum depth should raise an exception."""
+        with pytest.raises(ValueError):
+            LSBSteganography(max_lsb_depth=8)
+
+    @pytest.mark.parametrize("max_lsb_depth", [2, 3])
+    def test_max_lsb_depth_ignores_lsb_depth(self, max_lsb_depth):
+        """Payloads should be embedded at the smallest depth from 1 that fits them, whatever the depth of the algorithm."""
+        cover_image = create_image(32, 32)
+        original = cover_image.copy()
+        steg = LSBSteganography(lsb_depth=3, max_lsb_depth=max_lsb_depth)
+        steg.embed(cover_image, b"Payload")
+        assert np.array_equal(cover_image >> 1, original >> 1)
+        assert LSBSteganography(1).extract(cover_image) == b"Payload"
+
+    def test_invalid_min_max_lsb_depth(self):
+        """Creating an instance with a maximum depth below 1 should raise an exception."""
+        with pytest.raises(ValueError):
+            LSBSteganography(max_lsb_depth=0)
+
+    def test_invalid_workers(self):
+        """Creating an instance with no workers should raise an exception."""
+        with pytest.raises(ValueError):
+            LSBSteganography(workers=0)
+
+    def test_extract_header_version_1(self, monkeypatch, steg):
+        """Images with a version 1 header, which has a 32-bit payload size, should still be extractable."""
+
+        @dataclass(frozen=True)
+        class Version1Header(Header):
+            version: int = 1
+
+        cover_image, payload = create_image(), b"Embedded Payload"
+        monkeypatch.setattr(lsb, "Header", Version1Header)
+        steg.embed(cover_image, payload)
+        monkeypatch.undo()
+        assert steg.extract(cover_image) == payload
+
+    @pytest.mark.parametrize("seed", range(8))
+    def test_extract_original_format(self, steg, seed):
+        """Images embedded before the header was introduced should still be extractable."""
+        cover_image, payload = create_image(), b"Embedded Payload"
+        original_embed(cover_image, payload, seed)
+        assert steg.extract(cover_image) == payload
+
+    @pytest.mark.parametrize("seed", range(8))
+    def test_extract_not_stego(self, steg, seed):
+        """Extracting from an image that holds no payload should raise an exception, not allocate its random size."""
+        image = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), np.uint8)
+        with pytest.raises(InvalidCoverImageException):
+            steg.extract(image)
+        with pytest.raises(InvalidCoverImageException):
+            steg.reader(image)
+
+    def test_extract_size_exceeds_capacity(self, steg):
+        """Extracting a payload whose size exceeds the capacity of the image should raise an exception."""
+        image = create_image(32, 32)
+        steg.embed(image, b"Embedded Payload")
+        pixels = image.ravel()
+        context = steg._read_context(pixels)
+        size = context.engine.capacity(len(context.permutation)) + 1
+        size -= context.payload_size_bytes * 8
+        context.engine.embed_range(
+            pixels,
+            context.permutation,
+            bitops.BitStream(size.to_bytes(context.payload_size_bytes, "big")),
+            0,
+        )
+        with pytest.raises(InvalidCoverImageException):
+            steg.extract(image)
+
     def test_embed_empty(self, steg):
         """Embedding an empty payload should raise an exception."""
         with pytest.raises(ValueError):
@@ -77,6 +250,91 @@ class TestLSBSteganography:
         with pytest.raises(InsufficientCapacityException):
             steg.embed(create_image(), b"Em")
 
+    def test_probe(self, steg):
+        """Probing should read the header, payload size and prefix without extracting the payload."""
+        payload, image = b"Embedded Payload", create_image(32, 32)
+        steg.embed(image, payload)
+        probe = steg.probe(image, 8)
+        assert probe.header == Header(steg.index_mode, steg.engine_mode, steg.lsb_depth)
+        assert probe.payload_bits == len(payload) * 8
+        assert probe.payload_size == len(payload)
+        assert probe.capacity == steg.capacity(image.size)
+        assert probe.prefix == payload[:8]
+
+    def test_probe_no_header(self, steg):
+        """Probing an image without a header should not read its payload."""
+        image = create_image(32, 32)
+        original_embed(image, b"Embedded Payload", 1)
+        probe = steg.probe(image, 8)
+        assert probe.header is None and probe.prefix == b""
+
+    @pytest.mark.parametrize("engine_mode", list(EngineMode))
+    @pytest.mark.parametrize("lsb_depth", [1, 3])
+    @pytest.mark.parametrize("start, stop", [(0, 16), (5, 900), (1000, 1500)])
+    def test_reader(self, engine_mode, lsb_depth, start, stop):
+        """Reading a range should return the same bytes as extracting the whole payload, across bit planes."""
+        steg = LSBSteganography(lsb_depth, engine_mode=engine_mode)
+        cover_image = create_image(32, 32)
+        payload = np.random.default_rng(seed=1).bytes(steg.capacity(cover_image.size))
+        steg.embed(cover_image, payload)
+        reader = steg.reader(cover_image)
+        assert reader.size == len(payload)
+        assert reader.read(start, stop) == payload[start:stop]
+
+    @pytest.mark.parametrize("engine_mode", list(EngineMode))
+    @pytest.mark.parametrize("lsb_depth", [1, 3])
+    def test_write(self, engine_mode, lsb_depth):
+        """Writing a range should overwrite the payload in place, and extend it past its end."""
+        steg = LSBSteganography(lsb_depth, engine_mode=engine_mode)
+        cover_image = create_image(64, 64)
+        payload = bytearray(np.random.default_rng(seed=1).bytes(1000))
+        steg.embed(cover_image, bytes(payload))
+        steg.write(cover_image, 101, b"Overwritten")
+        steg.write(cover_image, 995, b"Extended Payload")
+        payload[101:112], payload[995:] = b"Overwritten", b"Extended Payload"
+        assert steg.extract(cover_image) == payload
+
+    def test_write_grows_depth(self):
+        """Payloads outgrowing their depth should be given a larger depth, up to the maximum depth."""
+        steg, cover_image = LSBSteganography(max_lsb_depth=3), create_image(32, 32)
+        payload = b"Embedded Payload"
+        steg.embed(cover_image, payload)
+        assert steg.probe(cover_image, 0).header.lsb_depth == 1
+        extension = bytes(steg.capacity(cover_image.size, 2) - len(payload))
+        steg.write(cover_image, len(payload), extension)
+        assert steg.probe(cover_image, 0).header.lsb_depth == 2
+        assert steg.extract(cover_image) == payload + extension
+        with pytest.raises(InsufficientCapacityException):
+            steg.write(cover_image, 0, bytes(steg.capacity(cover_image.size) + 1))
+
+    def test_write_invalid_start(self, steg):
+        """Writing a range starting after the end of the payload should raise an exception."""
+        cover_image = create_image()
+        steg.embed(cover_image, b"Embedded Payload")
+        with pytest.raises(ValueError):
+            steg.write(cover_image, 17, b"Gap")
+
+    def test_validate(self, steg):
+        """Validation should only accept payloads that fit, using the shape of the cover image."""
+        cover_image = create_image()
+        capacity = steg._payload_capacity(cover_image)
+        steg.validate(np.broadcast_to(np.uint8(0), cover_image.shape), capacity)
+        with pytest.raises(InsufficientCapacityException):
+            steg.validate(cover_image, capacity + 1)
+        with pytest.raises(InvalidCoverImageException):
+            steg.validate(create_image(1, 1), 1)
+
+    def test_validate_elements(self, steg):
+        """Validation from the number of elements should match validation of the cover image."""
+        assert steg.validates_elements
+        cover_image = create_image()
+        capacity = steg._payload_capacity(cover_image)
+        steg.validate_elements(cover_image.size, capacity)
+        with pytest.raises(InsufficientCapacityException):
+            steg.validate_elements(cover_image.size, capacity + 1)
+        with pytest.raises(InvalidCoverImageException):
+            steg.validate_elements(3, 1)
+
     def test_embed_invalid_cover_image(self, steg):
         """Embedding in an image that is too small should raise an exception."""
         with pytest.raises(InvalidCoverImageException):
@@ -1,8 +1,16 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from cryptography.fernet import InvalidToken
 from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
 
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
 from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+from stegos.core.steganography.exception import (
+    InsufficientCapacityException,
+    UnsupportedOperationException,
+)
 from tests.core.steganography.util import create_image, Dummy
 
 
@@ -48,6 +56,154 @@ class TestEncryptionDecorator:
         ciphertext2 = steg.strategy._payload
         assert ciphertext1 != ciphertext2
 
+    def test_embed_new_key(self, steg):
+        """Embedding with a key derived ahead of time should use its salt."""
+        payload, image = b"Embedded Payload", create_image()
+        salt, key = steg.new_key()
+        steg.embed(image, payload, (salt, key))
+        assert steg.strategy._payload.startswith(salt)
+        assert steg.extract(image) == payload
+
+    def test_embed_sealed(self, steg):
+        """Sealed payloads should be embedded as is, and decrypted on extraction."""
+        payload, image = b"Embedded Payload", create_image()
+        key = steg.new_key()
+        sealed = steg.seal(payload, key)
+        assert len(sealed) == EncryptionDecorator.encrypted_size(len(payload))
+        steg.validate_sealed(image, len(sealed))
+        steg.embed_sealed(image, sealed)
+        assert steg.strategy._payload == sealed
+        assert steg.extract(image, key) == payload
+
+    def test_extract_salt_prefix(self, monkeypatch):
+        """The key should be derived from the salt extracted ahead of the rest of the payload."""
+        steg = EncryptionDecorator(LSBSteganography(), b"password", _lightweight_argon2)
+        payload, image = b"Embedded Payload", create_image(16, 16)
+        steg.embed(image, payload)
+        salts = []
+        derive_key = steg._derive_key
+        monkeypatch.setattr(
+            steg, "_derive_key", lambda salt: salts.append(salt) or derive_key(salt)
+        )
+        assert steg.extract_prefix(image, 4) == payload[:4]
+        assert steg.extract(image) == payload
+        assert len(salts) == 2 and salts[0] == salts[1]
+
+    def test_extract_single_context(self, monkeypatch):
+        """The seed and header should be read once, for both the salt and the payload."""
+        steg = EncryptionDecorator(LSBSteganography(), b"password", _lightweight_argon2)
+        payload, image = b"Embedded Payload", create_image(16, 16)
+        steg.embed(image, payload)
+        contexts = []
+        read_context = LSBSteganography._read_context
+        monkeypatch.setattr(
+            LSBSteganography,
+            "_read_context",
+            lambda self, *args: contexts.append(args) or read_context(self, *args),
+        )
+        assert steg.extract(image) == payload
+        assert len(contexts) == 1
+
+    def test_extract_key(self, monkeypatch):
+        """Extracting with the key of the embedded salt should not derive a key."""
+        steg = EncryptionDecorator(LSBSteganography(), b"password", _lightweight_argon2)
+        payload, image = b"Embedded Payload", create_image(16, 16)
+        key = steg.new_key()
+        steg.embed(image, payload, key)
+        assert steg.extract_salt(image) == key[0]
+        assert steg.new_key(key[0]) == key
+
+        monkeypatch.setattr(steg, "_derive_key", pytest.fail)
+        assert steg.extract(image, key) == payload
+
+    def test_extract_other_key(self):
+        """Extracting with the key of another salt should derive a key."""
+        steg = EncryptionDecorator(LSBSteganography(), b"password", _lightweight_argon2)
+        payload, image = b"Embedded Payload", create_image(16, 16)
+        steg.embed(image, payload)
+        assert steg.extract(image, steg.new_key()) == payload
+
+    @pytest.mark.parametrize("size", [0, 1, 15, 16, 17, 100, 1000])
+    def test_encrypted_size(self, steg, size):
+        """The encrypted size should match the size of the embedded salt and token exactly."""
+        steg.embed(create_image(), bytes(size))
+        assert len(steg.strategy._payload) == EncryptionDecorator.encrypted_size(size)
+
+    @pytest.mark.parametrize("capacity", [116, 150, 1000, 12345])
+    def test_max_payload_size(self, capacity):
+        """The maximum payload size should be the largest payload whose encrypted size fits the capacity."""
+        size = EncryptionDecorator.max_payload_size(capacity)
+        assert EncryptionDecorator.encrypted_size(size) <= capacity
+        assert EncryptionDecorator.encrypted_size(size + 1) > capacity
+
+    def test_max_payload_size_insufficient(self):
+        """The maximum payload size should be negative if even an empty payload does not fit."""
+        capacity = EncryptionDecorator.encrypted_size(0) - 1
+        assert EncryptionDecorator.max_payload_size(capacity) < 0
+
+    def test_is_encrypted_size(self):
+        """Only sizes of encrypted payloads should be recognised as encrypted sizes."""
+        sizes = {EncryptionDecorator.encrypted_size(size) for size in range(1000)}
+        for size in range(max(sizes)):
+            assert EncryptionDecorator.is_encrypted_size(size) == (size in sizes)
+
+    def test_token_timestamp(self, steg):
+        """The timestamp of the token should be read without decrypting it."""
+        start = int(time.time())
+        steg.embed(create_image(), b"Embedded Payload")
+        timestamp = EncryptionDecorator.token_timestamp(steg.strategy._payload)
+        assert start <= timestamp <= time.time()
+
+    @pytest.mark.parametrize("prefix", [b"", bytes(16) + b"gAAA", bytes(32)])
+    def test_token_timestamp_malformed(self, prefix):
+        """Prefixes that are not a salt and token should not have a timestamp."""
+        assert EncryptionDecorator.token_timestamp(prefix) is None
+
+    def test_validate_before_key_derivation(self):
+        """Validating a payload that does not fit once encrypted should raise an exception without deriving a key."""
+        derived = []
+        steg = EncryptionDecorator(
+            LSBSteganography(),
+            b"password",
+            lambda salt: derived.append(salt) or _lightweight_argon2(salt),
+        )
+        cover_image = create_image(16, 16)
+        capacity = steg.strategy._payload_capacity(cover_image)
+        with pytest.raises(InsufficientCapacityException):
+            steg.validate(cover_image, capacity)
+        steg.validate(
+            cover_image, capacity - EncryptionDecorator.encrypted_size(0) - 16
+        )
+        assert not derived
+
+    def test_probe(self):
+        """Probing should read the salt and token of the decorated strategy, without deriving a key."""
+        steg = EncryptionDecorator(LSBSteganography(), b"password", pytest.fail)
+        cover_image = create_image(64, 64)
+        steg.embed_sealed(cover_image, bytes(16) + b"Token")
+        result = steg.probe(cover_image, EncryptionDecorator.PREFIX_BYTES)
+        assert result == steg.strategy.probe(
+            cover_image, EncryptionDecorator.PREFIX_BYTES
+        )
+        assert result.prefix == bytes(16) + b"Token"
+
+    def test_probe_unsupported(self, steg):
+        """Probing a strategy without a header should raise an exception."""
+        with pytest.raises(UnsupportedOperationException):
+            steg.probe(create_image(), EncryptionDecorator.PREFIX_BYTES)
+
+    def test_validate_elements(self):
+        """Validation from the number of elements should account for encryption."""
+        steg = EncryptionDecorator(LSBSteganography(), b"password", pytest.fail)
+        assert steg.validates_elements
+        cover_image = create_image(16, 16)
+        capacity = steg.strategy._payload_capacity(cover_image)
+        with pytest.raises(InsufficientCapacityException):
+            steg.validate_elements(cover_image.size, capacity)
+        steg.validate_elements(
+            cover_image.size, EncryptionDecorator.max_payload_size(capacity)
+        )
+
     def test_key_failure(self, steg):
         """Decryption should be key-dependent."""
         payload, image = b"Embedded Payload", create_image()
@@ -55,3 +211,15 @@ class TestEncryptionDecorator:
         steg2 = EncryptionDecorator(steg.strategy, b"wrong_password")
         with pytest.raises(InvalidToken):
             steg2.extract(image)
+
+    def test_concurrent_shared_strategy(self):
+        """A single strategy chain should be reusable by concurrent embeddings and extractions."""
+        steg = EncryptionDecorator(LSBSteganography(), b"password", _lightweight_argon2)
+
+        def embed_extract(i: int) -> bool:
+            image, payload = create_image(16, 16), f"Embedded Payload {i}".encode()
+            steg.embed(image, payload)
+            return steg.extract(image) == payload
+
+        with ThreadPoolExecutor(8) as executor:
+            assert all(executor.map(embed_extract, range(200)))
@@ -127,3 +127,61 @@ class TestBitops:
         assert np.array_equal(
             bitops.has_msbs_set(test_array, lsb_depth), expected_results
         )
+
+    @pytest.mark.parametrize(
+        ("bits", "width", "expected_symbols"),
+        [
+            (np.array([1, 0, 1, 1, 1, 0]), 3, np.array([5, 6])),
+            (np.array([1, 0, 1, 1]), 1, np.array([1, 0, 1, 1])),
+            (np.array([1, 1, 1, 1, 1, 1, 1, 0]), 8, np.array([254])),
+        ],
+    )
+    def test_bits_symbols_conversion(self, bits, width, expected_symbols):
+        """Bits should be convertible to multi-bit symbols and back to bits again."""
+        symbols = bitops.bits_to_symbols(bits, width)
+        assert np.array_equal(symbols, expected_symbols)
+        assert np.array_equal(bitops.symbols_to_bits(symbols, width), bits)
+
+    @pytest.mark.parametrize(
+        ("carrier_array", "symbols", "width", "expected_bytes"),
+        [
+            (np.array([0xFF, 0x00]), np.array([0, 3]), 2, np.array([0xFC, 0x03])),
+            (np.array([10, -2]), np.array([5, 1]), 3, np.array([13, -7])),
+        ],
+    )
+    def test_embed_get_symbols(self, carrier_array, symbols, width, expected_bytes):
+        """Symbols should be embedded in, and retrieved from, the LSBs of a NumPy integer array."""
+        embedded = bitops.embed_symbols(carrier_array, symbols, width)
+        assert np.array_equal(embedded, expected_bytes)
+        assert np.array_equal(bitops.get_symbols(embedded, width), symbols)
+
+
+@pytest.fixture
+def data() -> bytes:
+    return np.random.default_rng(seed=1).bytes(16)
+
+
+class TestBitStream:
+    """Tests for BitStream."""
+
+    @pytest.mark.parametrize(("start", "stop"), [(0, 128), (3, 77), (39, 41), (5, 6)])
+    def test_read(self, data, start, stop):
+        """Ranges of bits should be readable across buffers."""
+        stream = bitops.BitStream(data[:5], data[5:])
+        assert np.array_equal(
+            stream.read(start, stop), bitops.bytes_to_bits(data)[start:stop]
+        )
+
+    def test_write(self, data):
+        """Unaligned ranges of bits should be writable across buffers, in any order."""
+        bits, buffers = bitops.bytes_to_bits(data), (bytearray(5), bytearray(11))
+        stream = bitops.BitStream(*buffers)
+        for start, stop in [(100, 128), (41, 100), (3, 41), (0, 3)]:
+            stream.write(start, bits[start:stop])
+        assert bytes(buffers[0] + buffers[1]) == data
+
+    def test_chunks(self, data):
+        """Chunks of bits should make up the whole stream."""
+        chunks = list(bitops.BitStream(data).chunks(20))
+        assert max(len(chunk) for chunk in chunks) == 20
+        assert np.array_equal(np.concatenate(chunks), bitops.bytes_to_bits(data))
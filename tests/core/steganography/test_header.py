@@ -0,0 +1,45 @@
+import pytest
+
+from stegos.core.steganography.exception import UnsupportedHeaderException
+from stegos.core.steganography.header import Header
+from stegos.core.steganography.permutation import IndexMode
+
+
+class TestHeader:
+    """Tests for Header."""
+
+    @pytest.mark.parametrize("index_mode", list(IndexMode))
+    def test_to_from_bytes(self, index_mode):
+        """Headers should be convertible to bytes and back again."""
+        header = Header(index_mode)
+        assert Header.from_bytes(header.to_bytes(1), 1) == header
+
+    @pytest.mark.parametrize(("version", "payload_size_bytes"), [(1, 4), (2, 8)])
+    def test_payload_size_bytes(self, version, payload_size_bytes):
+        """Version 1 headers should have a 32-bit payload size, and later versions a 64-bit payload size."""
+        header = Header(version=version)
+        assert Header.from_bytes(header.to_bytes(1), 1) == header
+        assert header.payload_size_bytes == payload_size_bytes
+
+    @pytest.mark.parametrize("components", [0, 0b1, 0b111, 0xFF])
+    def test_components(self, components):
+        """The components carrying a payload should be stored in the header."""
+        header = Header(lsb_depth=2, components=components)
+        assert Header.from_bytes(header.to_bytes(1), 1) == header
+
+    def test_masked(self):
+        """Headers should be masked using the seed."""
+        header = Header()
+        assert header.to_bytes(1) != header.to_bytes(2)
+        assert Header.from_bytes(header.to_bytes(1), 2) is None
+
+    @pytest.mark.parametrize("data", [b"", bytes(Header.SIZE_BYTES)])
+    def test_from_bytes_missing(self, data):
+        """Bytes without a header should not be read as a header."""
+        assert Header.from_bytes(data, 1) is None
+
+    def test_from_bytes_unsupported(self):
+        """Headers from unsupported versions should raise an exception."""
+        header = Header(version=Header.VERSION + 1)
+        with pytest.raises(UnsupportedHeaderException):
+            Header.from_bytes(header.to_bytes(1), 1)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from stegos.core.steganography import kernels
+
+
+@pytest.fixture(params=[np.uint8, np.int32])
+def pixels(request) -> np.ndarray:
+    rng = np.random.default_rng(seed=1)
+    return rng.integers(-128 if request.param == np.int32 else 0, 128, 64).astype(
+        request.param
+    )
+
+
+@pytest.fixture
+def indices() -> np.ndarray:
+    return np.random.default_rng(seed=1).permutation(64)[:40]
+
+
+@pytest.mark.parametrize("name", kernels.available_backends())
+class TestBackend:
+    """Tests for the kernel backends, which should match the NumPy backend."""
+
+    def test_embed_extract_planes(self, name, pixels, indices):
+        """Bits should be embedded in, and extracted from, bit planes."""
+        rng = np.random.default_rng(seed=1)
+        planes = tuple(rng.integers(0, 2, n, dtype=np.uint8) for n in (40, 40, 7))
+        expected = pixels.copy()
+        kernels.NumPyBackend().embed_planes(expected, indices, planes)
+
+        kernels.backend(name).embed_planes(pixels, indices, planes)
+        assert np.array_equal(pixels, expected)
+
+        extracted = tuple(np.empty_like(bits) for bits in planes)
+        kernels.backend(name).extract_planes(pixels, indices, extracted)
+        assert all(map(np.array_equal, extracted, planes))
+
+    @pytest.mark.parametrize("width", [1, 3, 7])
+    def test_embed_extract_symbols(self, name, pixels, indices, width):
+        """Symbols should be embedded in, and extracted from, the LSBs."""
+        symbols = np.random.default_rng(seed=1).integers(
+            0, 1 << width, 40, dtype=np.uint8
+        )
+        expected = pixels.copy()
+        kernels.NumPyBackend().embed_symbols(expected, indices, symbols, width)
+
+        kernels.backend(name).embed_symbols(pixels, indices, symbols, width)
+        assert np.array_equal(pixels, expected)
+
+        extracted = np.empty_like(symbols)
+        kernels.backend(name).extract_symbols(pixels, indices, extracted, width)
+        assert np.array_equal(extracted, symbols)
+
+
+def test_unknown_backend():
+    """Selecting an unknown backend should raise an exception."""
+    with pytest.raises(ValueError):
+        kernels.backend("unknown")
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from stegos.core.steganography.permutation import (
+    IndexMode,
+    MappedPermutation,
+    PhiloxPermutation,
+    TiledPermutation,
+    permutation,
+)
+
+
+class TestIndexPermutation:
+    """Tests for the index permutations."""
+
+    @pytest.mark.parametrize("index_mode", list(IndexMode))
+    @pytest.mark.parametrize(("size", "offset"), [(1, 0), (2, 1), (192, 96), (1000, 0)])
+    def test_permutation(self, index_mode, size, offset):
+        """Every index after the offset should be taken exactly once."""
+        indices = permutation(index_mode, 1, size, offset).take(0, size)
+        assert np.array_equal(np.sort(indices), np.arange(offset, size))
+
+    def test_tiled_permutation(self):
+        """Tiled permutations should take every index exactly once, one tile at a time."""
+        tile_size = TiledPermutation.TILE_SIZE
+        size = 3 * tile_size + 123
+        indices = permutation(IndexMode.TILED, 1, size).take(0, size)
+        assert np.array_equal(np.sort(indices), np.arange(size))
+        tiles = indices // tile_size
+        assert all(
+            len(np.unique(tiles[i : i + tile_size])) == 1
+            for i in range(0, size, tile_size)
+        )
+
+    def test_philox_workers(self):
+        """Philox permutations should not depend on the number of threads."""
+        size = 2 * PhiloxPermutation.BUCKET_SIZE + 123
+        indices = PhiloxPermutation(1, size, workers=1).take(0, size)
+        assert np.array_equal(np.sort(indices), np.arange(size))
+        assert np.array_equal(
+            PhiloxPermutation(1, size, workers=4).take(0, size), indices
+        )
+
+    def test_philox_chunks(self, monkeypatch):
+        """Philox permutations spanning several chunks and buckets should be unchanged, in the narrowest data type."""
+        monkeypatch.setattr(PhiloxPermutation, "CHUNK_SIZE", 100)
+        monkeypatch.setattr(PhiloxPermutation, "BUCKET_SIZE", 300)
+        indices = PhiloxPermutation(1, 1234, 7, workers=3).take(0, 1234)
+        assert indices.dtype == np.uint32
+        assert np.array_equal(np.sort(indices), np.arange(7, 1234))
+        assert list(indices[:8]) == [86, 286, 1039, 398, 1051, 559, 749, 583]
+
+    @pytest.mark.parametrize("index_mode", list(IndexMode))
+    def test_take_range(self, index_mode):
+        """Taking a range of indices should match the same range of the full permutation."""
+        indices = permutation(index_mode, 1, 1000).take(0, 1000)
+        assert np.array_equal(
+            permutation(index_mode, 1, 1000).take(100, 200), indices[100:200]
+        )
+
+    @pytest.mark.parametrize("index_mode", list(IndexMode))
+    def test_seeded(self, index_mode):
+        """Permutations should be reproducible from the same seed, and differ between seeds."""
+        indices = permutation(index_mode, 1, 1000).take(0, 1000)
+        assert np.array_equal(permutation(index_mode, 1, 1000).take(0, 1000), indices)
+        assert not np.array_equal(
+            permutation(index_mode, 2, 1000).take(0, 1000), indices
+        )
+
+    @pytest.mark.parametrize("index_mode", list(IndexMode))
+    def test_dtype(self, index_mode):
+        """Indices should be unsigned 32-bit integers for images with fewer than 2^32 elements."""
+        indices = permutation(index_mode, 1, 1000).take(0, 1000)
+        assert indices.dtype == np.uint32
+
+    def test_mapped_permutation(self):
+        """Mapped permutations should take the positions of the subset in the order of the inner permutation."""
+        positions = np.arange(0, 3000, 3, dtype=np.uint32)
+        inner = permutation(IndexMode.FEISTEL, 1, len(positions), 96)
+        mapped = MappedPermutation(inner, positions)
+        assert len(mapped) == len(inner)
+        assert mapped.dtype == np.uint32
+        assert np.array_equal(mapped.take(10, 500), positions[inner.take(10, 500)])
+
+    def test_shuffle_original_format(self):
+        """Shuffled permutations should match the original full-image shuffle."""
+        indices = np.random.default_rng(1).permutation(1000)
+        assert np.array_equal(
+            permutation(IndexMode.SHUFFLE, 1, 1000, 32).take(0, 1000),
+            indices[indices >= 32],
+        )
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from stegos.core.async_service import AsyncSteganographyService
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+from stegos.core.steganography.exception import InsufficientCapacityException
+
+
+@pytest.fixture
+def cover(tmp_path):
+    path = tmp_path / "cover.jpg"
+    pixels = np.random.default_rng(0).integers(0, 256, (128, 128, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path, quality=95)
+    return path
+
+
+@pytest.fixture
+def service(lightweight_service):
+    with ThreadPoolExecutor(2) as executor:
+        yield AsyncSteganographyService(lightweight_service, executor)
+
+
+class TestAsyncSteganographyService:
+    """Tests for AsyncSteganographyService."""
+
+    def test_embed_extract(self, service, cover, tmp_path):
+        """Payloads embedded asynchronously should be extracted asynchronously."""
+        stego = tmp_path / "stego.jpg"
+
+        async def run():
+            image = await service.embed(str(cover), b"Embedded Payload", b"password")
+            image.save(stego)
+            return await service.extract(str(stego), b"password")
+
+        (item,) = asyncio.run(run())
+        assert not item.is_file and item.content == b"Embedded Payload"
+
+    def test_process_kdf_executor(self, lightweight_service, cover, tmp_path):
+        """Keys should be derivable on a process executor."""
+        stego = tmp_path / "stego.jpg"
+
+        async def run(service: AsyncSteganographyService):
+            (await service.embed(str(cover), b"Payload", b"password")).save(stego)
+            return await service.extract(str(stego), b"password")
+
+        with ProcessPoolExecutor(1) as kdf_executor:
+            service = AsyncSteganographyService(
+                lightweight_service, kdf_executor=kdf_executor
+            )
+            (item,) = asyncio.run(run(service))
+        assert item.content == b"Payload"
+
+    def test_extract_items(self, service, cover, tmp_path):
+        """Extracted files should be yielded by an async iterator."""
+        files = [tmp_path / "file1", tmp_path / "file2"]
+        for file in files:
+            file.write_bytes(file.name.encode())
+        stego = tmp_path / "stego.jpg"
+
+        async def run():
+            image = await service.embed(str(cover), list(map(str, files)), b"pw")
+            image.save(stego)
+            return [item async for item in service.extract_items(str(stego), b"pw")]
+
+        items = asyncio.run(run())
+        assert [(item.name, item.content) for item in items] == [
+            ("file1", b"file1"),
+            ("file2", b"file2"),
+        ]
+
+    def test_key_derived_while_reading(
+        self, monkeypatch, lightweight_service, service, cover, tmp_path
+    ):
+        """Keys should be derived as soon as the salt is read, while the rest of the payload is read."""
+        stego, deriving, overlapped = tmp_path / "stego.jpg", threading.Event(), []
+        read_payload, new_key = (
+            lightweight_service.read_payload,
+            EncryptionDecorator.new_key,
+        )
+
+        def reading(embedded):
+            overlapped.append(deriving.wait(10))
+            return read_payload(embedded)
+
+        def deriving_key(self, *args):
+            deriving.set()
+            return new_key(self, *args)
+
+        async def run():
+            (await service.embed(str(cover), b"Payload", b"password")).save(stego)
+            monkeypatch.setattr(lightweight_service, "read_payload", reading)
+            monkeypatch.setattr(EncryptionDecorator, "new_key", deriving_key)
+            return await service.extract(str(stego), b"password")
+
+        (item,) = asyncio.run(run())
+        assert item.content == b"Payload"
+        assert overlapped == [True]
+
+    def test_concurrent(self, service, cover, tmp_path):
+        """One event loop should drive many operations concurrently."""
+        payloads = [f"Payload {i}".encode() for i in range(4)]
+
+        async def embed_extract(i: int, payload: bytes):
+            stego = tmp_path / f"stego{i}.jpg"
+            (await service.embed(str(cover), payload, b"password")).save(stego)
+            (item,) = await service.extract(str(stego), b"password")
+            return item.content
+
+        async def run():
+            return await asyncio.gather(
+                *(embed_extract(i, payload) for i, payload in enumerate(payloads))
+            )
+
+        assert asyncio.run(run()) == payloads
+
+    def test_embed_insufficient_capacity(self, service, cover):
+        """Payloads that do not fit should raise an exception without deriving a key."""
+        derived = []
+
+        async def run():
+            original = service._service._strategy
+
+            def strategy(*args):
+                steg = original(*args)
+                steg.new_key = lambda *a: derived.append(a)
+                return steg
+
+            service._service._strategy = strategy
+            await service.embed(str(cover), np.random.bytes(10**6), b"password")
+
+        with pytest.raises(InsufficientCapacityException):
+            asyncio.run(run())
+        assert not derived
+
+    def test_cancel(self, service, cover):
+        """Cancelled operations should raise CancelledError without finishing."""
+
+        async def run():
+            task = asyncio.ensure_future(
+                service.embed(str(cover), b"Embedded Payload", b"password")
+            )
+            await asyncio.sleep(0)
+            task.cancel()
+            await task
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(run())
@@ -0,0 +1,100 @@
+import lzma
+from pathlib import Path
+
+import pytest
+from cryptography.fernet import InvalidToken
+
+from stegos.core.batch import (
+    BatchReport,
+    BatchResult,
+    batch_images,
+    batch_workers,
+    extract_batch,
+)
+from stegos.core.service import LSBSteganographyService
+from stegos.core.steganography.decorators.encryption import ARGON2_MEMORY_COST
+
+
+class FakeService(LSBSteganographyService):
+    """Service whose images hold their message as is, so extraction needs no key derivation."""
+
+    def _extract_payload(self, stego_image, password):
+        if password != b"password":
+            raise InvalidToken
+        return lzma.compress(Path(stego_image).read_bytes())
+
+
+@pytest.fixture
+def images(tmp_path):
+    directory = tmp_path / "images"
+    directory.mkdir()
+    for name in ["a.png", "a.jpg", "b.bmp", "c.PNG"]:
+        (directory / name).write_bytes(f"Message {name}".encode())
+    (directory / "notes.txt").write_bytes(b"Not an image")
+    return directory
+
+
+class TestBatch:
+    """Tests for batch extraction."""
+
+    def test_batch_images_directory(self, images):
+        """Only images should be taken from a directory, sorted."""
+        names = [path.name for path in batch_images(images)]
+        assert names == ["a.jpg", "a.png", "b.bmp", "c.PNG"]
+
+    def test_batch_images_glob(self, images):
+        """Images should be taken from a glob pattern, sorted."""
+        names = [path.name for path in batch_images(images / "a.*")]
+        assert names == ["a.jpg", "a.png"]
+
+    @pytest.mark.parametrize("workers", [1, 2, 1000])
+    def test_batch_workers(self, workers):
+        """The number of processes should be at least 1 and at most the number requested."""
+        assert 1 <= batch_workers(workers) <= workers
+
+    def test_batch_workers_available_memory(self, monkeypatch):
+        """The number of processes should be limited by the memory available, not the physical memory."""
+        sysconf = {
+            "SC_AVPHYS_PAGES": 3,
+            "SC_PHYS_PAGES": 1000,
+            "SC_PAGE_SIZE": ARGON2_MEMORY_COST * 2**10,  # one key derivation per page
+        }
+        monkeypatch.setattr("os.sysconf", sysconf.__getitem__)
+        assert batch_workers(8) == 3
+
+    def test_extract_batch(self, images, tmp_path):
+        """Each image should be extracted to its own directory, named after the image."""
+        output = tmp_path / "output"
+        results = list(
+            extract_batch(images, b"password", output, 2, service=FakeService())
+        )
+        assert sorted(result.image.name for result in results) == [
+            "a.jpg",
+            "a.png",
+            "b.bmp",
+            "c.PNG",
+        ]
+        for result in results:
+            assert result.error is None
+            (path,) = result.paths
+            assert path.parent.parent == output
+            assert path.read_bytes() == result.image.read_bytes()
+            assert result.size == len(result.image.read_bytes())
+        assert len({result.paths[0].parent for result in results}) == len(results)
+
+    def test_extract_batch_errors(self, images, tmp_path):
+        """Failures should be yielded as results, without stopping the batch."""
+        results = list(
+            extract_batch(images, b"wrong", tmp_path / "output", service=FakeService())
+        )
+        assert len(results) == 4
+        assert all(isinstance(result.error, InvalidToken) for result in results)
+
+    def test_report(self):
+        """The report should aggregate the results of a batch."""
+        report = BatchReport(seconds=2)
+        report.add(BatchResult(Path("a.png"), size=100))
+        report.add(BatchResult(Path("b.png"), error=InvalidToken()))
+        assert (report.images, report.failures, report.size) == (2, 1, 100)
+        assert report.images_per_second == 1
+        assert report.bytes_per_second == 50
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from stegos.core.constants import is_jpeg
+
+
+class TestIsJpeg:
+    """Tests for is_jpeg."""
+
+    @pytest.mark.parametrize(
+        ("frmt", "expected"), [("JPEG", True), ("PNG", False), ("BMP", False)]
+    )
+    def test_is_jpeg(self, tmp_path, frmt, expected):
+        """JPEGs should be detected from their leading bytes, regardless of extension."""
+        path = tmp_path / "image"
+        Image.fromarray(np.zeros((8, 8, 3), dtype=np.uint8)).save(path, format=frmt)
+        assert is_jpeg(path) == expected
+
+    def test_is_jpeg_empty(self, tmp_path):
+        """Empty files should not be detected as JPEGs."""
+        path = tmp_path / "image"
+        path.write_bytes(b"")
+        assert not is_jpeg(path)
@@ -0,0 +1,326 @@
+import os
+
+import numpy as np
+import pytest
+from cryptography.fernet import Fernet, InvalidToken
+from PIL import Image
+
+from stegos.core import container
+from stegos.core.compression.exception import DecompressionLimitException
+from stegos.core.compression.file import DecompressionLimits
+from stegos.core.container import IndexedContainer
+from stegos.core.exception import InvalidContainerException
+from stegos.core.planner import plan
+from stegos.core.steganography.base import PayloadReader
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+
+
+def new_key(salt: bytes) -> tuple[bytes, bytes]:
+    """
+    Derives a key for testing purposes, the same for every salt.
+    :param salt: Salt used for key derivation.
+    :return: Salt, and base64 encoded key.
+    """
+    return salt, b"0" * 43 + b"="
+
+
+class RecordingReader(PayloadReader):
+    """Reader of a payload held in memory, recording the ranges read."""
+
+    def __init__(self, payload: bytes):
+        super().__init__(len(payload), lambda start, stop: payload[start:stop])
+        self.ranges = []
+
+    def read(self, start, stop):
+        self.ranges.append((start, stop))
+        return super().read(start, stop)
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name, content in [
+        ("a.txt", b"First file"),
+        ("b.bin", os.urandom(3 * 2**10)),
+        ("empty", b""),
+    ]:
+        path = tmp_path / name
+        path.write_bytes(content)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def packed(files):
+    members = container.compress_members(files)
+    return members, container.pack(members, new_key(os.urandom(16)))
+
+
+class TestContainer:
+    """Tests for packing and reading indexed containers."""
+
+    def test_packed_size(self, packed):
+        """The packed size should be known exactly before encryption."""
+        members, payload = packed
+        assert container.packed_size(members) == len(payload)
+        assert container.is_container(payload)
+
+    def test_read_members(self, files, packed):
+        """Each member should be read back as written."""
+        opened = IndexedContainer.open(RecordingReader(packed[1]), new_key)
+        assert [m.name for m in opened.members] == [f.name for f in files]
+        for file in files:
+            assert opened.read(file.name) == file.read_bytes()
+            assert opened.member(file.name).size == file.stat().st_size
+
+    def test_list_reads_toc_only(self, packed):
+        """Opening a container should only read its header and table of contents."""
+        reader = RecordingReader(packed[1])
+        opened = IndexedContainer.open(reader, new_key)
+        data_start = container.PREFIX_BYTES + opened._toc_capacity
+        assert all(stop <= data_start for _, stop in reader.ranges)
+
+    def test_read_member_ranges(self, files, packed):
+        """Reading a member should only read the ranges of its own chunks."""
+        reader = RecordingReader(packed[1])
+        opened = IndexedContainer.open(reader, new_key)
+        reader.ranges.clear()
+        member = opened.member("a.txt")
+        assert opened.read("a.txt") == files[0].read_bytes()
+        start = container.PREFIX_BYTES + opened._toc_capacity + member.offset
+        assert reader.ranges == [(start, start + member.stored_size)]
+
+    def test_chunks(self, tmp_path, monkeypatch):
+        """Large members should be split into chunks that are decrypted one at a time."""
+        monkeypatch.setattr(container, "CHUNK_SIZE", 256)
+        path = tmp_path / "large.bin"
+        path.write_bytes(os.urandom(2000))
+        members = container.compress_members([path])
+        assert len(members[0].chunks) > 1
+        payload = container.pack(members, new_key(os.urandom(16)))
+        opened = IndexedContainer.open(RecordingReader(payload), new_key)
+        assert opened.read("large.bin") == path.read_bytes()
+
+    def test_swapped_chunks(self, tmp_path, monkeypatch):
+        """Chunks swapped within a member should be rejected, rather than decrypted out of order."""
+        monkeypatch.setattr(container, "CHUNK_SIZE", 256)
+        path = tmp_path / "large.bin"
+        path.write_bytes(os.urandom(2000))
+        members = container.compress_members([path])
+        payload = bytearray(container.pack(members, new_key(os.urandom(16))))
+        opened = IndexedContainer.open(RecordingReader(bytes(payload)), new_key)
+        member = opened.member("large.bin")
+        assert member.chunks[0] == member.chunks[1]
+        first = container.PREFIX_BYTES + opened._toc_capacity + member.offset
+        second = first + member.chunks[0]
+        end = second + member.chunks[1]
+        payload[first:end] = payload[second:end] + payload[first:second]
+        opened = IndexedContainer.open(RecordingReader(bytes(payload)), new_key)
+        with pytest.raises(InvalidContainerException):
+            opened.read("large.bin")
+
+    def test_replayed_chunk(self, tmp_path):
+        """A chunk of one member copied over a chunk of another should be rejected."""
+        paths = [tmp_path / "a.bin", tmp_path / "b.bin"]
+        for path in paths:
+            path.write_bytes(os.urandom(100))
+        members = container.compress_members(paths)
+        payload = bytearray(container.pack(members, new_key(os.urandom(16))))
+        opened = IndexedContainer.open(RecordingReader(bytes(payload)), new_key)
+        a, b = opened.member("a.bin"), opened.member("b.bin")
+        assert a.chunks == b.chunks
+        start = container.PREFIX_BYTES + opened._toc_capacity
+        payload[start + b.offset : start + b.offset + b.stored_size] = payload[
+            start + a.offset : start + a.offset + a.stored_size
+        ]
+        opened = IndexedContainer.open(RecordingReader(bytes(payload)), new_key)
+        assert opened.read("a.bin") == paths[0].read_bytes()
+        with pytest.raises(InvalidContainerException):
+            opened.read("b.bin")
+
+    def test_unique_names(self, tmp_path):
+        """Repeated file names should be numbered, so every member can be named."""
+        (tmp_path / "dir").mkdir()
+        paths = [tmp_path / "a.txt", tmp_path / "dir" / "a.txt"]
+        for path in paths:
+            path.write_bytes(b"File")
+        names = [m.name for m in container.compress_members(paths)]
+        assert names == ["a.txt", "a (1).txt"]
+
+    def test_missing_member(self, packed):
+        """Reading a member that does not exist should raise an exception."""
+        opened = IndexedContainer.open(RecordingReader(packed[1]), new_key)
+        with pytest.raises(KeyError):
+            opened.read("missing")
+
+    def test_not_container(self):
+        """Payloads without a container header should raise an exception."""
+        payload = os.urandom(16) + Fernet(new_key(b"")[1]).encrypt(b"Payload")
+        assert not container.is_container(payload)
+        with pytest.raises(InvalidContainerException):
+            IndexedContainer.open(RecordingReader(payload), new_key)
+
+    def test_wrong_key(self, packed):
+        """Opening a container with the wrong key should raise an exception."""
+        with pytest.raises(InvalidToken):
+            IndexedContainer.open(
+                RecordingReader(packed[1]), lambda salt: (salt, Fernet.generate_key())
+            )
+
+    def test_update(self, files, packed, tmp_path):
+        """Updating should add members and replace members of the same name, writing only after the payload."""
+        payload, writes = bytearray(packed[1]), []
+
+        def write(start: int, data: bytes) -> None:
+            writes.append((start, len(data)))
+            payload[start : start + len(data)] = data
+
+        opened = IndexedContainer.open(RecordingReader(packed[1]), new_key)
+        (tmp_path / "new").mkdir()
+        added = [tmp_path / "new" / "a.txt", tmp_path / "new" / "c.txt"]
+        for path in added:
+            path.write_bytes(b"Added " + path.name.encode())
+        opened.update(container.compress_members(added), write)
+
+        toc_end = container.PREFIX_BYTES + opened._toc_capacity
+        assert writes[0][0] == len(packed[1])  # new chunks, after the payload
+        assert all(start < toc_end for start, _ in writes[1:])
+        reopened = IndexedContainer.open(RecordingReader(bytes(payload)), new_key)
+        assert [m.name for m in reopened.members] == [
+            "a.txt",
+            "b.bin",
+            "empty",
+            "c.txt",
+        ]
+        assert reopened.read("a.txt") == b"Added a.txt"
+        assert reopened.read("b.bin") == files[1].read_bytes()
+        assert reopened.read("c.txt") == b"Added c.txt"
+
+    def test_update_toc_capacity(self, files, tmp_path):
+        """Updates whose table of contents outgrows its capacity should not write anything."""
+        members = container.compress_members(files)
+        payload = container.pack(members, new_key(os.urandom(16)), toc_reserve=0)
+        opened = IndexedContainer.open(RecordingReader(payload), new_key)
+        writes = []
+        with pytest.raises(InvalidContainerException):
+            opened.update(
+                container.compress_members(files, {f.name for f in files}),
+                lambda start, data: writes.append(start),
+            )
+        assert not writes
+
+    def test_extract_to(self, files, packed, tmp_path):
+        """Extracting to a directory should write every member under its basename."""
+        output = tmp_path / "output"
+        output.mkdir()
+        opened = IndexedContainer.open(RecordingReader(packed[1]), new_key)
+        paths = opened.extract_to(output, workers=2)
+        assert [path.read_bytes() for path in paths] == [f.read_bytes() for f in files]
+
+    def test_extract_to_limits(self, packed, tmp_path):
+        """Members exceeding the decompression limits should not be written."""
+        output = tmp_path / "output"
+        output.mkdir()
+        opened = IndexedContainer.open(RecordingReader(packed[1]), new_key)
+        with pytest.raises(DecompressionLimitException):
+            opened.extract_to(output, DecompressionLimits(max_size=100))
+        assert not any(output.iterdir())
+
+
+@pytest.fixture(params=["cover.jpg", "cover.png"])
+def cover(request, tmp_path):
+    path = tmp_path / request.param
+    pixels = np.random.default_rng(0).integers(0, 256, (256, 256, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path, quality=95)
+    return path
+
+
+class TestServiceContainer:
+    """Tests for embedding and extracting indexed containers through the service."""
+
+    def test_embed_list_extract_member(
+        self, lightweight_service, cover, files, tmp_path
+    ):
+        """Files embedded as a container should be listed, and extracted one at a time."""
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed_indexed(str(cover), files, b"password").save(stego)
+        members = service.list_members(str(stego), b"password")
+        assert [m.name for m in members] == [f.name for f in files]
+        item = service.extract_member(str(stego), b"password", "b.bin")
+        assert item.is_file and item.name == "b.bin"
+        assert item.content == files[1].read_bytes()
+
+    def test_extract(self, lightweight_service, cover, files, tmp_path):
+        """Extracting a container should yield every member, and write them to a directory."""
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed_indexed(str(cover), files, b"password").save(stego)
+        items = list(service.extract(str(stego), b"password"))
+        assert [(i.name, i.content) for i in items] == [
+            (f.name, f.read_bytes()) for f in files
+        ]
+        output = tmp_path / "output"
+        output.mkdir()
+        paths = service.extract_to(str(stego), b"password", output)
+        assert [path.read_bytes() for path in paths] == [f.read_bytes() for f in files]
+        with pytest.raises(ValueError):
+            service.extract_to(str(stego), b"password", output, raw=True)
+
+    def test_extract_single_reader(
+        self, lightweight_service, monkeypatch, cover, files, tmp_path
+    ):
+        """The salt and container magic should be read through the reader that reads the container."""
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed_indexed(str(cover), files, b"password").save(stego)
+        readers = []
+        reader = EncryptionDecorator.reader
+        monkeypatch.setattr(
+            EncryptionDecorator,
+            "reader",
+            lambda self, image: readers.append(image) or reader(self, image),
+        )
+        monkeypatch.setattr(EncryptionDecorator, "extract_prefix", pytest.fail)
+        assert len(list(service.extract(str(stego), b"password"))) == len(files)
+        assert len(readers) == 1
+
+    def test_update(self, lightweight_service, cover, files, tmp_path):
+        """Files added to a container in place should be extracted along with the files already held."""
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed_indexed(str(cover), files[:2], b"password").save(stego)
+        service.update_indexed(str(stego), files[2:], b"password").save(stego)
+        members = service.list_members(str(stego), b"password")
+        assert [m.name for m in members] == [f.name for f in files]
+        for file in files:
+            item = service.extract_member(str(stego), b"password", file.name)
+            assert item.content == file.read_bytes()
+
+    def test_update_replace(self, lightweight_service, cover, files, tmp_path):
+        """Files replaced in place should be extracted with their new contents."""
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed_indexed(str(cover), files, b"password").save(stego)
+        (tmp_path / "new").mkdir()
+        replaced = tmp_path / "new" / files[0].name
+        replaced.write_bytes(b"Replaced contents")
+        service.update_indexed(str(stego), [str(replaced)], b"password").save(stego)
+        members = service.list_members(str(stego), b"password")
+        assert [m.name for m in members] == [f.name for f in files]
+        item = service.extract_member(str(stego), b"password", replaced.name)
+        assert item.content == b"Replaced contents"
+
+    def test_update_depth_growth(self, lightweight_service, cover, files, tmp_path):
+        """Updates outgrowing the depth of a lossless image should be embedded at a larger depth."""
+        if cover.suffix == ".jpg":
+            pytest.skip("JPEGs are embedded at a fixed depth")
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed_indexed(str(cover), files, b"password").save(stego)
+        large = tmp_path / "large.bin"
+        large.write_bytes(os.urandom(plan(cover).capacities[1]))
+        service.update_indexed(str(stego), [str(large)], b"password").save(stego)
+        item = service.extract_member(str(stego), b"password", large.name)
+        assert item.content == large.read_bytes()
+
+    def test_toc_reserve(self, lightweight_service, cover, files, tmp_path):
+        """Containers embedded without a reserve should reject updates that grow their table of contents."""
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed_indexed(str(cover), files[:2], b"password", 0).save(stego)
+        with pytest.raises(InvalidContainerException):
+            service.update_indexed(str(stego), files[2:], b"password")
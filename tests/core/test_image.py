@@ -0,0 +1,92 @@
+import os
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from stegos.core.image import LosslessImage
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
+from tests.core.steganography.util import create_image
+
+
+def save_image(path, mode: str = "RGB", width: int = 64, height: int = 48) -> None:
+    """
+    Saves a sample image as a PNG.
+    :param path: Filename to save the image as.
+    :param mode: The mode of the image.
+    :param width: The width of the image.
+    :param height: The height of the image.
+    """
+    Image.fromarray(create_image(width, height)).convert(mode).save(path, format="PNG")
+
+
+def peak_rss() -> int:
+    """
+    Reads the peak resident set size of the process, which counts the native buffers of PIL.
+    :return: Peak resident set size in bytes.
+    """
+    with open("/proc/self/status") as status:
+        line = next(line for line in status if line.startswith("VmHWM:"))
+    return int(line.split()[1]) * 2**10
+
+
+class TestLosslessImage:
+    """Tests for LosslessImage."""
+
+    @pytest.mark.parametrize("mode", ["1", "L", "P", "RGB", "RGBA", "I;16"])
+    def test_open(self, monkeypatch, tmp_path, mode):
+        """Decoding an image in strips should give the same pixels as decoding it at once."""
+        monkeypatch.setattr(LosslessImage, "STRIP_BYTES", 100)
+        path = tmp_path / "image.png"
+        save_image(path, mode)
+        pixels = LosslessImage.open(Image.open(path)).pixels
+        assert pixels.flags.writeable
+        assert np.array_equal(pixels, np.array(Image.open(path)))
+
+    @pytest.mark.parametrize("mode", ["1", "L", "P", "RGB", "RGBA", "I;16"])
+    def test_size(self, tmp_path, mode):
+        """The number of elements should be read from the header, and match the decoded pixels."""
+        path = tmp_path / "image.png"
+        save_image(path, mode)
+        assert LosslessImage.size(Image.open(path)) == np.array(Image.open(path)).size
+
+    def test_save(self, tmp_path):
+        """Saving an image should encode its modified pixels."""
+        path, output = tmp_path / "image.png", tmp_path / "output.png"
+        save_image(path)
+        image = LosslessImage.open(Image.open(path))
+        image.pixels[0, 0] = [1, 2, 3]
+        image.save(output)
+        assert np.array_equal(np.array(Image.open(output)), image.pixels)
+
+    def test_embed_peak_memory(self, tmp_path):
+        """Decoding, embedding and saving should hold the decoded pixels and one buffer of PIL at most.
+
+        The traced allocations, which count the buffers NumPy owns but not those of PIL, should stay at the decoded
+        pixels, so a copy of the array is caught even if the allocator hides it from the resident set size.
+        """
+        clear_refs = Path("/proc/self/clear_refs")
+        if not os.access(clear_refs, os.W_OK):
+            pytest.skip("the peak resident set size can not be reset")
+        path, output = tmp_path / "image.png", tmp_path / "output.png"
+        save_image(path, width=2048, height=2048)
+        LSBSteganography().embed(create_image(), b"E")  # load the kernels beforehand
+
+        clear_refs.write_text("5")  # resets the peak to the current resident set size
+        before = peak_rss()
+        tracemalloc.start()
+        try:
+            image = LosslessImage.open(Image.open(path))
+            LSBSteganography().embed(image.pixels, b"Embedded Payload")
+            image.save(output)
+            _, traced = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # 3 bytes per pixel of the array, and 4 of PIL, rather than another bytes copy
+        assert peak_rss() - before < 2.6 * 2048 * 2048 * 3
+        assert traced < 1.1 * 2048 * 2048 * 3
+        assert LSBSteganography().extract(np.array(Image.open(output))) == (
+            b"Embedded Payload"
+        )
@@ -0,0 +1,124 @@
+import jpegio as jio
+import numpy as np
+import pytest
+from PIL import Image
+
+from stegos.core.constants import ImageCompressionType
+from stegos.core.exception import UnsupportedImageFormatException
+from stegos.core.planner import DEPTHS, CostModel, Plan, StageCost, _lossless_plan, plan
+from stegos.core.steganography import builder
+from stegos.core.steganography.algorithms.lossy import ComponentLossyLSBSteganography
+from stegos.core.steganography.algorithms.lsb import LSBSteganography
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+from stegos.core.steganography.exception import InsufficientCapacityException
+
+STAGES = ["decode", "compress", "kdf", "embed", "encode"]
+
+
+@pytest.fixture
+def jpeg(tmp_path):
+    path = tmp_path / "image.jpg"
+    pixels = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path, quality=95)
+    return path
+
+
+class TestPlan:
+    """Tests for the planner."""
+
+    @pytest.mark.parametrize("mode, bands", [("L", 1), ("RGB", 3), ("RGBA", 4)])
+    def test_lossless_capacity(self, tmp_path, mode, bands):
+        """Lossless capacity should be read from the header and match the capacity of the algorithm."""
+        path = tmp_path / "image.png"
+        Image.new(mode, (40, 30)).save(path)
+        with Image.open(path) as image:
+            elements, capacities, stages = _lossless_plan(image, CostModel())
+        assert elements == 40 * 30 * bands
+        steg = LSBSteganography()
+        for depth in DEPTHS:
+            assert capacities[depth] == steg.capacity(elements, depth)
+        assert set(stages) == {"decode", "encode"}
+
+    def test_jpeg_capacity(self, jpeg):
+        """JPEG capacity should be the largest encrypted payload the components can hold."""
+        result = plan(jpeg)
+        assert result.compression_type == ImageCompressionType.LOSSY
+        assert result.lsb_depth == LSBSteganography.SAFE_DEPTH
+        assert list(result.capacities) == [result.lsb_depth]
+
+        decoded = jio.read(str(jpeg))
+        steg = ComponentLossyLSBSteganography()
+        size = EncryptionDecorator.encrypted_size(result.capacity)
+        steg.validate(decoded.coef_arrays, size)
+        with pytest.raises(InsufficientCapacityException):
+            steg.validate(
+                decoded.coef_arrays,
+                EncryptionDecorator.encrypted_size(result.capacity + 1),
+            )
+
+    def test_depth_from_strategy(self, monkeypatch, tmp_path, jpeg):
+        """The planned depth should be the largest depth of the strategy the service builds."""
+        path = tmp_path / "image.png"
+        Image.new("RGB", (40, 30)).save(path)
+        strategies = {
+            ImageCompressionType.LOSSLESS: LSBSteganography(max_lsb_depth=3),
+            ImageCompressionType.LOSSY: ComponentLossyLSBSteganography(1),
+        }
+        monkeypatch.setattr(
+            builder,
+            "_get_base_strategy",
+            lambda comp_type, image=None: strategies[comp_type],
+        )
+        assert plan(path).lsb_depth == 3
+        assert plan(jpeg).lsb_depth == 1
+
+    def test_fits(self, jpeg):
+        """Payloads should fit up to the capacity."""
+        result = plan(jpeg)
+        assert result.fits(1)
+        assert result.fits(result.capacity)
+        assert not result.fits(result.capacity + 1)
+        assert not result.fits(0)
+
+    def test_unsupported_format(self, tmp_path):
+        """Mixed format images with lossy compression should be rejected, as the service rejects them."""
+        path = tmp_path / "image.tiff"
+        Image.new("RGB", (16, 16)).save(path, compression="jpeg")
+        with pytest.raises(UnsupportedImageFormatException):
+            plan(path)
+
+    def test_stages(self, jpeg):
+        """Every stage should have a positive predicted cost."""
+        result = plan(jpeg, 1000)
+        assert list(result.stages) == STAGES
+        for stage in result.stages.values():
+            assert stage.memory > 0 and stage.time > 0
+        assert result.time < sum(stage.time for stage in result.stages.values())
+        assert result.memory > result.stages["decode"].memory
+
+    def test_payload_scaling(self, jpeg):
+        """Larger payloads should take longer to compress and embed."""
+        small, large = plan(jpeg, 100), plan(jpeg, 10000)
+        for stage in ["compress", "embed"]:
+            assert large.stages[stage].time > small.stages[stage].time
+        assert large.stages["decode"] == small.stages["decode"]
+
+    def test_lossless_time_overlaps_kdf(self):
+        """Key derivation should overlap decoding for lossless images, but not for lossy images."""
+        times = {
+            "decode": 3.0,
+            "compress": 1.0,
+            "kdf": 2.0,
+            "embed": 1.0,
+            "encode": 1.0,
+        }
+        stages = {stage: StageCost(1, time) for stage, time in times.items()}
+        lossless = Plan(ImageCompressionType.LOSSLESS, 1, {1: 1}, 1, stages)
+        lossy = Plan(ImageCompressionType.LOSSY, 1, {1: 1}, 1, stages)
+        assert lossless.time == 5.0
+        assert lossy.time == 7.0
+
+    def test_calibrate(self, lightweight_kdf):
+        """Calibration should measure a positive cost for every stage."""
+        cost_model = CostModel.calibrate(0.05, lightweight_kdf)
+        assert all(cost > 0 for cost in vars(cost_model).values())
@@ -0,0 +1,118 @@
+import base64
+import time
+
+import jpegio as jio
+import numpy as np
+import pytest
+from PIL import Image
+
+from stegos.core import container
+from stegos.core.probe import _implausible, probe, probe_images
+from stegos.core.steganography.algorithms.lossy import ComponentLossyLSBSteganography
+from stegos.core.steganography.base import PayloadProbe
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+from stegos.core.steganography.header import Header
+
+
+@pytest.fixture
+def images(tmp_path):
+    directory = tmp_path / "images"
+    directory.mkdir()
+    for i in range(3):
+        pixels = np.random.default_rng(i).integers(0, 256, (128, 128, 3), np.uint8)
+        Image.fromarray(pixels).save(directory / f"image{i}.jpg", quality=95)
+    return directory
+
+
+@pytest.fixture
+def embed(lightweight_kdf):
+    def embed(path, payload: bytes, encrypted: bool = True) -> None:
+        """
+        Embeds a payload in a JPEG in place.
+        :param path: Path of the JPEG.
+        :param payload: Payload to embed.
+        :param encrypted: Whether to encrypt the payload, as the service does.
+        """
+        steg = ComponentLossyLSBSteganography()
+        if encrypted:
+            steg = EncryptionDecorator(steg, b"password", lightweight_kdf)
+        jpeg = jio.read(str(path))
+        steg.embed(jpeg.coef_arrays, payload)
+        jio.write(jpeg, str(path))
+
+    return embed
+
+
+class TestProbe:
+    """Tests for the header-probe scanner."""
+
+    @pytest.mark.parametrize("size", [10, 2000])
+    def test_candidate(self, embed, images, size):
+        """Images with an encrypted payload should be candidates."""
+        embed(images / "image0.jpg", bytes(size))
+        result = probe(images / "image0.jpg")
+        assert result.error is None
+        assert result.candidate, result.reason
+
+    def test_candidate_lossless(self, lightweight_service, tmp_path):
+        """Lossless images with a payload embedded by the service should be candidates."""
+        path, stego = tmp_path / "cover.png", tmp_path / "stego.png"
+        pixels = np.random.default_rng(0).integers(0, 256, (128, 128, 3), np.uint8)
+        Image.fromarray(pixels).save(path)
+        lightweight_service.embed(str(path), b"Embedded Payload", b"pw").save(stego)
+        result = probe(stego)
+        assert result.error is None
+        assert result.candidate, result.reason
+
+    def test_clean(self, images):
+        """Images without a payload should not be candidates."""
+        result = probe(images / "image1.jpg")
+        assert not result.candidate and result.reason == "no header"
+
+    def test_unencrypted(self, embed, images):
+        """Images with a payload that is not encrypted should not be candidates."""
+        embed(images / "image0.jpg", bytes(100), encrypted=False)
+        result = probe(images / "image0.jpg")
+        assert not result.candidate and result.error is None
+
+    def test_unreadable(self, images):
+        """Images that can not be read should be reported, not raised."""
+        (images / "broken.png").write_bytes(b"Not an image")
+        result = probe(images / "broken.png")
+        assert not result.candidate and result.error is not None
+
+    def test_probe_images(self, embed, images):
+        """Every image of a directory should be probed in parallel."""
+        embed(images / "image2.jpg", b"Embedded Payload")
+        results = {result.image.name: result for result in probe_images(images, 2)}
+        assert sorted(results) == ["image0.jpg", "image1.jpg", "image2.jpg"]
+        assert [name for name, r in results.items() if r.candidate] == ["image2.jpg"]
+
+    @pytest.mark.parametrize(
+        "payload_probe, reason",
+        [
+            (PayloadProbe(Header(), 12, 100), "whole bytes"),
+            (PayloadProbe(Header(), 8 * 200, 100), "exceeds capacity"),
+            (PayloadProbe(Header(), 8 * 117, 200), "encrypted size"),
+            (PayloadProbe(Header(), 8 * 116, 200, bytes(28)), "salt and token"),
+        ],
+    )
+    def test_implausible(self, payload_probe, reason):
+        """Payloads that can not have been embedded by the service should be rejected with a reason."""
+        assert reason in _implausible(payload_probe, time.time())
+
+    def test_implausible_timestamp(self):
+        """Tokens with a timestamp in the future should be rejected."""
+        token = EncryptionDecorator.TOKEN_VERSION.to_bytes(1, "big")
+        token += int(time.time() + 10**6).to_bytes(8, "big")
+        prefix = bytes(16) + base64.urlsafe_b64encode(token)
+        reason = _implausible(PayloadProbe(Header(), 8 * 116, 200, prefix), time.time())
+        assert "timestamp" in reason
+
+    def test_container(self):
+        """Payloads starting with the header of an indexed container should be candidates, whatever their size."""
+        prefix = bytes(16) + container.MAGIC + bytes(9)
+        assert (
+            _implausible(PayloadProbe(Header(), 8 * 150, 200, prefix), time.time())
+            is None
+        )
@@ -0,0 +1,200 @@
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from stegos.core.container import IndexedContainer
+from stegos.core.exception import InvalidShardException
+from stegos.core.planner import plan
+from stegos.core.steganography.decorators.encryption import EncryptionDecorator
+from stegos.core.steganography.exception import InsufficientCapacityException
+
+
+@pytest.fixture(params=["cover.jpg", "cover.png"])
+def cover(request, tmp_path):
+    path = tmp_path / request.param
+    pixels = np.random.default_rng(0).integers(0, 256, (128, 128, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path, quality=95)
+    return path
+
+
+class TestServiceStages:
+    """Tests for the stages of embedding and extraction, which the sync and async facades share."""
+
+    def test_stages(self, lightweight_service, cover, tmp_path):
+        """Running the stages one at a time should embed and extract a payload."""
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        opened = service.open_image(str(cover), b"password")
+        decoded, carrier = service.decode(opened)
+        pending = service.compress(b"Embedded Payload")
+        service.validate(opened, pending.size, carrier)
+        service.embed_payload(opened, carrier, pending, opened.strategy.new_key())
+        decoded.save(stego)
+
+        opened = service.open_image(str(stego), b"password")
+        decoded, carrier = service.decode(opened)
+        embedded = service.open_payload(opened, carrier)
+        key = opened.strategy.new_key(embedded.salt)
+        (item,) = service.items(service.unseal(opened, embedded, key, decoded))
+        assert not item.is_file and item.content == b"Embedded Payload"
+
+    def test_read_payload(self, lightweight_service, cover, tmp_path):
+        """A payload read into memory should read as its carrier does, and unseal without the carrier."""
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed(str(cover), b"Embedded Payload", b"password").save(stego)
+
+        opened = service.open_image(str(stego), b"password")
+        decoded, carrier = service.decode(opened)
+        embedded = service.open_payload(opened, carrier)
+        read = service.read_payload(embedded)
+        size = embedded.reader.size
+        for start, stop in [(0, 16), (0, size), (8, 24), (16, size), (20, size + 8)]:
+            assert read.reader.read(start, stop) == embedded.reader.read(start, stop)
+        del decoded, carrier, embedded
+        key = opened.strategy.new_key(read.salt)
+        (item,) = service.items(service.unseal(opened, read, key))
+        assert item.content == b"Embedded Payload"
+
+    def test_validate_header_only(self, lightweight_service, cover):
+        """Lossless images should be validated from their header, without a carrier."""
+        service = lightweight_service
+        opened = service.open_image(str(cover), b"password")
+        if not opened.validates_from_header:
+            pytest.skip("JPEG capacity depends on the coefficients")
+        with pytest.raises(InsufficientCapacityException):
+            service.validate(opened, opened.elements)
+        service.validate(opened, 100)
+        opened.close()
+
+    def test_unseal_container(self, lightweight_service, cover, tmp_path):
+        """Unsealing an indexed container should open it with the key of its salt."""
+        file = tmp_path / "file.txt"
+        file.write_bytes(b"Contents")
+        service, stego = lightweight_service, tmp_path / f"stego{cover.suffix}"
+        service.embed_indexed(str(cover), [str(file)], b"password").save(stego)
+
+        opened = service.open_image(str(stego), b"password")
+        decoded, carrier = service.decode(opened)
+        embedded = service.open_payload(opened, carrier)
+        assert service.read_payload(embedded) is embedded
+        key = opened.strategy.new_key(embedded.salt)
+        opened.strategy.new_key = pytest.fail
+        extracted = service.unseal(opened, embedded, key, decoded)
+        assert isinstance(extracted, IndexedContainer)
+        assert extracted.read("file.txt") == b"Contents"
+
+
+class TestServiceBroadcast:
+    """Tests for embedding one payload into many images."""
+
+    def test_embed_broadcast(self, monkeypatch, lightweight_service, cover, tmp_path):
+        """Every image should hold the payload, embedded under a single key derivation."""
+        covers = [tmp_path / f"cover{i}{cover.suffix}" for i in range(3)]
+        for path in covers:
+            path.write_bytes(cover.read_bytes())
+        output = tmp_path / "output"
+        output.mkdir()
+        derived = []
+        new_key = EncryptionDecorator.new_key
+        monkeypatch.setattr(
+            EncryptionDecorator,
+            "new_key",
+            lambda self, *args: derived.append(args) or new_key(self, *args),
+        )
+        stego_images = lightweight_service.embed_broadcast(
+            covers, b"Embedded Payload", b"password", output, workers=2
+        )
+        assert stego_images == [output / path.name for path in covers]
+        assert len(derived) == 1
+        for stego in stego_images:
+            (item,) = lightweight_service.extract(str(stego), b"password")
+            assert item.content == b"Embedded Payload"
+
+
+class TestServiceSharded:
+    """Tests for splitting one payload across many images."""
+
+    @pytest.fixture
+    def covers(self, cover, tmp_path):
+        covers = [tmp_path / f"cover{i}{cover.suffix}" for i in range(3)]
+        for path in covers:
+            path.write_bytes(cover.read_bytes())
+        return covers
+
+    @pytest.fixture
+    def payload(self, cover):
+        return np.random.default_rng(1).bytes(plan(cover).capacity * 3 // 2)
+
+    @pytest.fixture
+    def output(self, tmp_path):
+        output = tmp_path / "output"
+        output.mkdir()
+        return output
+
+    def test_embed_extract_any_order(
+        self, lightweight_service, covers, payload, output
+    ):
+        """A payload too large for one image should be extracted from its shards, in any order."""
+        stego_images = lightweight_service.embed_sharded(
+            covers, payload, b"password", output
+        )
+        assert stego_images == [output / path.name for path in covers]
+        stego_images = [str(stego) for stego in reversed(stego_images)]
+        (item,) = lightweight_service.extract_sharded(stego_images, b"password")
+        assert item.content == payload
+
+    def test_extract_missing_shard(self, lightweight_service, covers, payload, output):
+        """Extracting without every shard should raise an exception."""
+        stego_images = lightweight_service.embed_sharded(
+            covers, payload, b"password", output
+        )
+        with pytest.raises(InvalidShardException):
+            list(lightweight_service.extract_sharded(stego_images[1:], b"password"))
+
+    def test_embed_skips_small_cover(
+        self, lightweight_service, cover, covers, payload, output
+    ):
+        """Images too small to hold a shard header should be skipped before deriving a key."""
+        small = covers[0].with_name(f"small{cover.suffix}")
+        Image.new("RGB", (8, 8)).save(small, quality=95)
+        stego_images = lightweight_service.embed_sharded(
+            [small, *covers], payload, b"password", output
+        )
+        assert stego_images == [output / path.name for path in covers]
+        assert not (output / small.name).exists()
+        (item,) = lightweight_service.extract_sharded(stego_images, b"password")
+        assert item.content == payload
+
+
+class TestServiceOverlap:
+    """Tests for overlapping key derivation with compression."""
+
+    @pytest.mark.parametrize("size", [0, 1, 2**16 + 1, 2**20])
+    def test_sealed_bound(self, lightweight_service, size):
+        """The bound of an incompressible payload should not be smaller than its sealed size."""
+        payload = np.random.default_rng(size).bytes(size)
+        pending = lightweight_service.compress(payload)
+        assert pending.size <= lightweight_service.sealed_bound(payload)
+        assert lightweight_service.sealed_bound(["file.txt"]) is None
+
+    def test_key_derived_while_compressing(
+        self, monkeypatch, lightweight_service, cover
+    ):
+        """Keys should be derived while the payload is compressed, if a bound of the payload fits the header."""
+        lossless, deriving, overlapped = cover.suffix == ".png", threading.Event(), []
+        compress, new_key = lightweight_service.compress, EncryptionDecorator.new_key
+
+        def compressing(payload):
+            overlapped.append(lossless and deriving.wait(10))
+            return compress(payload)
+
+        def deriving_key(self, *args):
+            deriving.set()
+            return new_key(self, *args)
+
+        monkeypatch.setattr(lightweight_service, "compress", compressing)
+        monkeypatch.setattr(EncryptionDecorator, "new_key", deriving_key)
+        lightweight_service.embed(str(cover), b"Payload", b"password")
+        assert overlapped == [lossless]  # JPEG capacity is only known once decoded
+        assert deriving.is_set()
@@ -0,0 +1,76 @@
+import os
+import random
+
+import pytest
+
+from stegos.core.exception import InvalidShardException
+from stegos.core.shard import ShardHeader, join, split, split_sizes
+
+
+class TestShardHeader:
+    """Tests for ShardHeader."""
+
+    def test_to_from_bytes(self):
+        """A header should be read back as written."""
+        header = ShardHeader(2, 5, os.urandom(ShardHeader.SET_ID_BYTES))
+        data = header.to_bytes()
+        assert len(data) == ShardHeader.SIZE_BYTES
+        assert ShardHeader.is_shard(data + b"Shard")
+        assert ShardHeader.from_bytes(data + b"Shard") == header
+
+    @pytest.mark.parametrize("payload", [b"", b"Not a shard", ShardHeader.MAGIC])
+    def test_not_shard(self, payload):
+        """Payloads without a complete header should not be read as shards."""
+        with pytest.raises(InvalidShardException):
+            ShardHeader.from_bytes(payload)
+
+    def test_invalid_index(self):
+        """Headers with an index outside the number of shards should raise an exception."""
+        data = ShardHeader(5, 5, bytes(ShardHeader.SET_ID_BYTES)).to_bytes()
+        with pytest.raises(InvalidShardException):
+            ShardHeader.from_bytes(data)
+
+
+class TestShard:
+    """Tests for splitting and joining shards."""
+
+    @pytest.mark.parametrize(
+        "payload_size, capacities",
+        [(100, [10, 30, 60]), (3, [1, 1, 1]), (1000, [500, 0, 500]), (0, [5, 5])],
+    )
+    def test_split_sizes(self, payload_size, capacities):
+        """Shards should be proportional to capacity and cover the payload."""
+        sizes = split_sizes(payload_size, capacities)
+        assert sum(sizes) == payload_size
+        assert all(size <= capacity for size, capacity in zip(sizes, capacities))
+
+    def test_split_join(self):
+        """Joining shards in any order should reassemble the payload."""
+        payload = os.urandom(1000)
+        shards = split(payload, split_sizes(len(payload), [100, 300, 600, 50]))
+        assert len({ShardHeader.from_bytes(shard).set_id for shard in shards}) == 1
+        random.Random(1).shuffle(shards)
+        assert join(shards) == payload
+
+    def test_join_missing(self):
+        """Joining without every shard should raise an exception."""
+        shards = split(b"Payload", [3, 4])
+        with pytest.raises(InvalidShardException):
+            join(shards[1:])
+
+    def test_join_duplicate(self):
+        """Joining a shard more than once should raise an exception."""
+        shards = split(b"Payload", [3, 4])
+        with pytest.raises(InvalidShardException):
+            join([shards[0], shards[0], shards[1]])
+
+    def test_join_different_payloads(self):
+        """Joining shards of different payloads should raise an exception."""
+        first, second = split(b"Payload", [3, 4]), split(b"Payload", [3, 4])
+        with pytest.raises(InvalidShardException):
+            join([first[0], second[1]])
+
+    def test_join_empty(self):
+        """Joining no shards should raise an exception."""
+        with pytest.raises(InvalidShardException):
+            join([])
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import pytest
+
+from stegos import cli
+from stegos.core.batch import BatchResult
+
+
+class TestCli:
+    """Tests for the command line interface."""
+
+    @pytest.mark.parametrize("error, status", [(None, 0), (ValueError("error"), 1)])
+    def test_extract_batch(self, monkeypatch, capsys, error, status):
+        """Extracting a batch should print each result and the throughput."""
+        calls = []
+
+        def extract_batch(*args):
+            calls.append(args)
+            yield BatchResult(Path("a.png"), [Path("a/file")], 10, error)
+
+        monkeypatch.setattr(cli, "extract_batch", extract_batch)
+        monkeypatch.setattr(cli.getpass, "getpass", lambda: "password")
+        assert cli.main(["extract-batch", "images", "-o", "out", "--raw"]) == status
+        assert calls == [("images", b"password", "out", None, True, False)]
+        out, err = capsys.readouterr()
+        assert "a.png" in (out if error is None else err)
+        assert "1 image(s)" in out